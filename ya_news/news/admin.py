@@ -1,15 +1,131 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.forms.models import BaseInlineFormSet
 
 from .models import Comment, News
+from .purge import soft_delete_news, soft_delete_users
 
+User = get_user_model()
 
-class CommentInline(admin.StackedInline):
+
+class LabelFreeRawIdWidget(ForeignKeyRawIdWidget):
+    """Поле для id без отдельного запроса к базе ради подписи."""
+
+    def label_and_url_for_value(self, value):
+        return '', ''
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Набор форм, который загружает только одну страницу объектов."""
+    per_page = 20
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+        return self.page.object_list
+
+
+class CommentInline(admin.TabularInline):
     model = Comment
     extra = 0
+    formset = PaginatedInlineFormSet
+    template = 'admin/news/paginated_tabular.html'
+    fields = ('author', 'author_username', 'text', 'created')
+    readonly_fields = ('author_username', 'created')
+    raw_id_fields = ('author',)
+    per_page = 20
+    page_param = 'comments_page'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_number = request.GET.get(self.page_param, 1)
+        formset.page_param = self.page_param
+        return formset
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'author':
+            kwargs['widget'] = LabelFreeRawIdWidget(
+                db_field.remote_field, self.admin_site
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    @admin.display(description='Автор')
+    def author_username(self, obj):
+        return obj.author.username
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    Удаление только скрывает объекты, см. news.purge.
+
+    Страница подтверждения не собирает зависимые объекты: их удалит
+    команда purge_deleted.
+    """
+    soft_delete = None
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        model_count = {self.opts.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, set(), []
+
+    def delete_model(self, request, obj):
+        self.soft_delete(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(queryset)
 
 
 @admin.register(News)
-class NewsAdmin(admin.ModelAdmin):
+class NewsAdmin(SoftDeleteAdmin):
     inlines = [
         CommentInline,
     ]
+    list_display = ('title', 'date', 'views', 'comment_count')
+    readonly_fields = ('views',)
+    date_hierarchy = 'date'
+    soft_delete = staticmethod(soft_delete_news)
+
+    def get_queryset(self, request):
+        """Число комментариев считается подзапросом только для страницы."""
+        comment_count = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            count=Count('pk')
+        ).values('count')
+        return super().get_queryset(request).alive().annotate(
+            comment_count=Coalesce(Subquery(comment_count), 0)
+        )
+
+    @admin.display(description='Комментариев', ordering='comment_count')
+    def comment_count(self, obj):
+        return obj.comment_count
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'news', 'author', 'created')
+    list_select_related = ('news', 'author')
+    raw_id_fields = ('news', 'author')
+    date_hierarchy = 'created'
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class SoftDeleteUserAdmin(SoftDeleteAdmin, UserAdmin):
+    soft_delete = staticmethod(soft_delete_users)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(deletion__isnull=True)
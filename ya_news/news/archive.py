@@ -0,0 +1,188 @@
+"""
+Архив старых новостей.
+
+Новости старше ARCHIVE_AFTER_DAYS дней вместе с комментариями переносятся
+в отдельную базу ARCHIVE_DATABASE, и основная база, её индексы и
+резервные копии перестают расти с годами. Перенос идёт пачками по
+ARCHIVE_BATCH_SIZE новостей: пачка записывается в архив, затем удаляется
+из основной базы. Ключи сохраняются, поэтому если процесс упадёт между
+этими шагами, повторный запуск запишет пачку в архив ещё раз без дублей.
+
+Таблиц пользователей в архиве нет (см. news.routers.ArchiveRouter),
+поэтому внешние ключи в нём не проверяются, а авторы архивных
+комментариев читаются из основной базы. Архив доступен только для
+чтения.
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .front_page import news_removed
+from .models import Comment, News, raw_delete
+
+COPY_CHUNK_SIZE = 1000
+
+
+def disable_foreign_keys(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+@receiver(connection_created)
+def archive_connected(sender, connection, **kwargs):
+    # Django включает проверку внешних ключей при каждом подключении.
+    if connection.alias == settings.ARCHIVE_DATABASE:
+        disable_foreign_keys(connection)
+
+
+@receiver(post_migrate)
+def archive_migrated(sender, using, **kwargs):
+    # Миграции SQLite тоже включают проверку заново по завершении.
+    if using == settings.ARCHIVE_DATABASE:
+        disable_foreign_keys(connections[using])
+
+
+def is_archived(obj):
+    return obj._state.db == settings.ARCHIVE_DATABASE
+
+
+def get_news(pk):
+    """Новость из основной базы, а если её там нет, то из архива."""
+    return get_archived(News, pk)
+
+
+def get_comment(pk):
+    """Комментарий из основной базы, а если его там нет, то из архива."""
+    return get_archived(Comment, pk)
+
+
+def get_archived(model, pk):
+    obj = model.objects.filter(pk=pk).first()
+    if obj is None:
+        obj = model.objects.using(
+            settings.ARCHIVE_DATABASE
+        ).filter(pk=pk).first()
+    return obj
+
+
+def archive_cutoff(days=None):
+    """Дата, раньше которой новости уходят в архив."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    return timezone.localdate() - timedelta(days=days)
+
+
+def write_archive(news_list, comments):
+    """Записывает новости и комментарии в архив без дублей."""
+    archive = settings.ARCHIVE_DATABASE
+    comments = iter(comments)
+    copied = 0
+    with transaction.atomic(using=archive):
+        News.objects.using(archive).bulk_create(
+            news_list, ignore_conflicts=True
+        )
+        while True:
+            chunk = list(islice(comments, COPY_CHUNK_SIZE))
+            if not chunk:
+                return copied
+            Comment.objects.using(archive).bulk_create(
+                chunk, ignore_conflicts=True
+            )
+            copied += len(chunk)
+
+
+def archive_batch(news_list):
+    """Переносит новости с комментариями; возвращает число комментариев."""
+    pks = [news.pk for news in news_list]
+    comments = Comment.objects.filter(news__in=pks).order_by('pk')
+    last_pk = comments.values_list('pk', flat=True).last() or 0
+    moved = write_archive(
+        news_list,
+        comments.filter(pk__lte=last_pk).iterator(chunk_size=COPY_CHUNK_SIZE),
+    )
+    with transaction.atomic():
+        # Первый же DELETE берёт блокировку записи: комментарии, добавленные
+        # после копирования, больше не появятся и дописываются в архив здесь.
+        raw_delete(Comment.objects.using(DEFAULT_DB_ALIAS).filter(
+            news__in=pks, pk__lte=last_pk
+        ))
+        late = list(Comment.objects.filter(news__in=pks))
+        if late:
+            moved += write_archive([], late)
+            raw_delete(
+                Comment.objects.using(DEFAULT_DB_ALIAS).filter(news__in=pks)
+            )
+        raw_delete(News.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=pks))
+        news_removed(pks)
+    return moved
+
+
+def archive_news(days=None, batch_size=None, progress=None):
+    """
+    Переносит в архив новости старше days дней.
+
+    progress(новостей, комментариев) вызывается после каждой пачки;
+    возвращает те же два числа. Удалённые через soft delete новости
+    остаются в основной базе до purge_deleted.
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    queryset = News.objects.alive().filter(
+        date__lt=archive_cutoff(days)
+    ).order_by('pk')
+    news_count = comment_count = 0
+    while True:
+        batch = list(queryset[:batch_size])
+        if not batch:
+            return news_count, comment_count
+        comment_count += archive_batch(batch)
+        news_count += len(batch)
+        if progress is not None:
+            progress(news_count, comment_count)
+
+
+def database_stats(using=DEFAULT_DB_ALIAS):
+    """Размер файла SQLite в страницах, число свободных страниц и режим."""
+    stats = {}
+    with connections[using].cursor() as cursor:
+        for pragma in ('page_count', 'page_size', 'freelist_count',
+                       'auto_vacuum'):
+            cursor.execute(f'PRAGMA {pragma}')
+            stats[pragma] = cursor.fetchone()[0]
+    return stats
+
+
+def vacuum(using=DEFAULT_DB_ALIAS):
+    """Полностью пересобирает файл базы; вне транзакции."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('VACUUM')
+
+
+def incremental_vacuum(pages=0, using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает системе до pages свободных страниц (0 — все).
+
+    Работает, только если база в режиме auto_vacuum = INCREMENTAL, см.
+    enable_incremental_vacuum. В отличие от VACUUM не переписывает
+    файл целиком и держит блокировку недолго.
+    """
+    connection = connections[using]
+    connection.ensure_connection()
+    # Прагма освобождает по странице на каждый шаг выполнения, а
+    # cursor.execute() модуля sqlite3 делает только первый шаг;
+    # executescript() выполняет её до конца.
+    connection.connection.executescript(
+        f'PRAGMA incremental_vacuum({int(pages)});'
+    )
+
+
+def enable_incremental_vacuum(using=DEFAULT_DB_ALIAS):
+    """Переводит базу в режим auto_vacuum = INCREMENTAL."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        # Для существующей базы режим вступает в силу только после VACUUM.
+        cursor.execute('VACUUM')
@@ -0,0 +1,890 @@
+"""
+Сценарии замеров производительности.
+
+Каждый сценарий регистрируется декоратором benchmark и запускается
+командой ``python manage.py benchmark <имя>`` на временной тестовой базе.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import tracemalloc
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.template import engines
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .ingest import get_comment_queue
+from .memprofile import clear as clear_memory_samples
+from .memprofile import read_samples
+from .metrics import Counter, collect, registry, render
+from .models import Comment, News
+from .page_views import get_view_counter
+from .purge import purge_news
+from .fixture_loader import load_fixtures
+from .querylog import instrument, stats
+from .archive import (
+    archive_news, database_stats, enable_incremental_vacuum,
+    incremental_vacuum
+)
+from .compression import GzipCompressor, compress_stream
+from .throttling import LocalMemoryBackend, parse_rate, throttle
+from .trending import (
+    add_events, fetch_scores, get_trending, log_weight, top_scores
+)
+from .views import NewsDetail
+from .warmup import warm_cache, warm_templates, warmup_urls
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Регистрирует сценарий замера под указанным именем."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+@benchmark('sessions')
+def sessions_queries(write):
+    """Запросы к базе на одну загрузку news:detail для режимов сессий."""
+    author = get_user_model().objects.create(username='bench-sessions')
+    news = News.objects.create(title='Заголовок', text='Текст')
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(10)
+    )
+    url = reverse('news:detail', args=(news.pk,))
+    for mode, engine in settings.SESSION_ENGINES.items():
+        with override_settings(SESSION_ENGINE=engine):
+            client = Client()
+            client.force_login(author)
+            client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+        session_queries = [
+            query for query in queries.captured_queries
+            if 'django_session' in query['sql']
+        ]
+        write(
+            f'{mode:>15}: запросов {len(queries)}, '
+            f'из них к django_session {len(session_queries)}'
+        )
+
+
+@benchmark('template_warmup')
+def template_warmup(write):
+    """Время до первого ответа news:home с прогревом шаблонов и без."""
+    from yanews.settings_production import TEMPLATES
+
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст новости. ' * 50)
+        for index in range(settings.NEWS_COUNT_ON_HOME_PAGE)
+    )
+    url = reverse('news:home')
+    Client().get(url)
+    for warmup in (False, True):
+        with override_settings(TEMPLATES=TEMPLATES):
+            started = perf_counter()
+            if warmup:
+                warm_templates()
+            warmed = perf_counter()
+            Client().get(url)
+            finished = perf_counter()
+        write(
+            f'{"с прогревом" if warmup else "без прогрева":>13}: '
+            f'прогрев {(warmed - started) * 1000:.2f} мс, '
+            f'первый ответ {(finished - warmed) * 1000:.2f} мс'
+        )
+
+
+COLD_START_SCRIPT = """
+from time import perf_counter
+started = perf_counter()
+from {wsgi} import application
+ready = perf_counter()
+environ = {{
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '{path}', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.url_scheme': 'http',
+    'wsgi.input': __import__('io').BytesIO(),
+}}
+body = application(environ, lambda status, headers: None)
+next(iter(body))
+print((ready - started) * 1000, (perf_counter() - started) * 1000)
+"""
+
+
+@benchmark('cold_start')
+def cold_start(write, runs=9):
+    """Время до первого байта ответа в новом процессе для разных настроек."""
+    wsgi = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+    script = COLD_START_SCRIPT.format(
+        wsgi=wsgi, path=reverse('users:login')
+    )
+    modules = ('settings', 'settings_production', 'settings_lean')
+    timings = {module: [] for module in modules}
+    # Запуски чередуются, чтобы фоновая нагрузка делилась поровну.
+    for _ in range(runs):
+        for module in modules:
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': f'{wsgi.split(".")[0]}.{module}',
+            }
+            output = subprocess.run(
+                [sys.executable, '-c', script],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            timings[module].append([float(value) for value in output.split()])
+    for module, values in timings.items():
+        startup, first_byte = (
+            statistics.median(column) for column in zip(*values)
+        )
+        write(
+            f'{module:>20}: приложение готово за {startup:.1f} мс, '
+            f'первый байт через {first_byte:.1f} мс'
+        )
+
+
+@benchmark('comment_ingest')
+def comment_ingest(write, writers=8, comments_per_writer=50):
+    """Пропускная способность приёма комментариев: sync против queue."""
+    users = [
+        get_user_model().objects.create(username=f'bench-ingest-{index}')
+        for index in range(writers)
+    ]
+    news = News.objects.create(title='Горячая новость', text='Текст')
+    url = reverse('news:detail', args=(news.pk,))
+    clients = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+
+    def post_comments(client):
+        for index in range(comments_per_writer):
+            client.post(url, {'text': f'Комментарий {index}'})
+        connection.close()
+
+    for mode in ('sync', 'queue'):
+        with TemporaryDirectory() as spool_dir, override_settings(
+            COMMENT_INGEST_MODE=mode,
+            COMMENT_INGEST_SPOOL_DIR=spool_dir,
+            COMMENT_INGEST_FLUSH_INTERVAL=0.05,
+            THROTTLE_RATES={},
+        ):
+            before = Comment.objects.count()
+            threads = [
+                threading.Thread(target=post_comments, args=(client,))
+                for client in clients
+            ]
+            started = perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            answered = perf_counter()
+            if mode == 'queue':
+                get_comment_queue().flush_all()
+            finished = perf_counter()
+            saved = Comment.objects.count() - before
+        write(
+            f'{mode:>6}: сохранено {saved} комментариев, '
+            f'{saved / (finished - started):.0f} в секунду, '
+            f'среднее время ответа '
+            f'{(answered - started) / saved * writers * 1000:.2f} мс'
+        )
+
+
+@benchmark('throttling')
+def throttling(write, calls=100000):
+    """Накладные расходы проверки частоты на один запрос."""
+    capacity, per_second = parse_rate('1000000/s')
+    backend = LocalMemoryBackend()
+    started = perf_counter()
+    for index in range(calls):
+        backend.consume(f'user:{index % 1000}', capacity, per_second)
+    consume = (perf_counter() - started) / calls * 1e6
+
+    request = RequestFactory().post('/')
+    request.user = get_user_model()(pk=1)
+    rates = {'bench': {'user': '1000000/s', 'ip': '1000000/s'}}
+    with override_settings(THROTTLE_RATES=rates):
+        started = perf_counter()
+        for _ in range(calls):
+            throttle(request, 'bench')
+        full = (perf_counter() - started) / calls * 1e6
+    write(
+        f'корзина: {consume:.2f} мкс на вызов, '
+        f'проверка запроса (две корзины): {full:.2f} мкс'
+    )
+
+
+PREVIEW_TEMPLATES = {
+    'truncatewords': (
+        '{% for news in object_list %}'
+        '{{ news.title }} {{ news.text|truncatewords:15 }}'
+        '{% endfor %}'
+    ),
+    'preview': (
+        '{% for news in object_list %}'
+        '{{ news.title }} {{ news.preview }}'
+        '{% endfor %}'
+    ),
+}
+
+
+@benchmark('news_previews')
+def news_previews(write, articles=200, words=20000, runs=20):
+    """Список длинных новостей: truncatewords по тексту против превью."""
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Слово ' * words)
+        for index in range(articles)
+    )
+    querysets = {
+        'truncatewords': News.objects.all(),
+        'preview': News.objects.defer('text'),
+    }
+    for mode, queryset in querysets.items():
+        template = engines['django'].from_string(PREVIEW_TEMPLATES[mode])
+        started = perf_counter()
+        for _ in range(runs):
+            object_list = list(queryset.all())
+            template.render({'object_list': object_list})
+        elapsed = (perf_counter() - started) / runs
+        loaded = sum(
+            len(news.__dict__.get('text', '')) + len(news.preview)
+            for news in object_list
+        )
+        write(
+            f'{mode:>13}: {elapsed * 1000:.2f} мс на список, '
+            f'загружено текста {loaded / 1024:.0f} КБ'
+        )
+
+
+@benchmark('streaming')
+def streaming(write, comments=10000):
+    """Ветка из 10 000 комментариев: потоковая отдача против буферной."""
+    author = get_user_model().objects.create(username='bench-streaming')
+    news = News.objects.create(title='Длинная ветка', text='Текст')
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(comments)
+    )
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    for threshold in (None, settings.STREAMING_THRESHOLD):
+        for traced in (False, True):
+            with override_settings(STREAMING_THRESHOLD=threshold):
+                if traced:
+                    tracemalloc.start()
+                started = perf_counter()
+                response = NewsDetail.as_view()(request, pk=news.pk)
+                if not response.streaming:
+                    response.render()
+                chunks = compress_stream(GzipCompressor(6), iter(response))
+                size = len(next(chunks))
+                first_byte = perf_counter()
+                size += sum(len(chunk) for chunk in chunks)
+                finished = perf_counter()
+                if traced:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    timings = first_byte - started, finished - started
+        write(
+            f'{"поток" if threshold else "буфер":>6}: '
+            f'первый байт {timings[0] * 1000:.1f} мс, '
+            f'весь ответ {timings[1] * 1000:.1f} мс, '
+            f'пик памяти {peak / 2 ** 20:.1f} МБ, '
+            f'gzip {size / 1024:.0f} КБ'
+        )
+
+
+def write_fixture(path, news_count, comments_per_news, author_id):
+    """Фикстура из новостей с комментариями, записанная по объекту."""
+    with open(path, 'w', encoding='utf-8') as fixture:
+        fixture.write('[\n')
+        separator = ''
+        comment_pk = 0
+        for news_pk in range(1, news_count + 1):
+            records = [{'model': 'news.news', 'pk': news_pk, 'fields': {
+                'title': f'Новость {news_pk}', 'text': 'Текст новости. ' * 40,
+                'date': '2022-11-01',
+            }}]
+            for _ in range(comments_per_news):
+                comment_pk += 1
+                records.append({'model': 'news.comment', 'pk': comment_pk,
+                                'fields': {
+                                    'news': news_pk, 'author': author_id,
+                                    'text': 'Текст комментария. ' * 5,
+                                    'created': '2022-11-01T10:00:00Z',
+                                }})
+            for record in records:
+                fixture.write(
+                    separator + json.dumps(record, ensure_ascii=False)
+                )
+                separator = ',\n'
+        fixture.write('\n]\n')
+
+
+@benchmark('fixture_loading')
+def fixture_loading(write, sizes=(1000, 4000), comments_per_news=4):
+    """Пик памяти и время загрузки фикстуры: loaddata против потоковой."""
+    author = get_user_model().objects.create(username='bench-fixtures')
+    loaders = {
+        'loaddata': lambda path: call_command(
+            'loaddata', path, verbosity=0
+        ),
+        'stream_loaddata': lambda path: load_fixtures([path]),
+    }
+    with TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f'news-{size}.json')
+            write_fixture(path, size, comments_per_news, author.pk)
+            megabytes = os.path.getsize(path) / 2 ** 20
+            for name, load in loaders.items():
+                News.objects.all().delete()
+                started = perf_counter()
+                load(path)
+                elapsed = perf_counter() - started
+                News.objects.all().delete()
+                tracemalloc.start()
+                load(path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                write(
+                    f'{name:>15}, {megabytes:.1f} МБ: '
+                    f'{elapsed * 1000:.0f} мс, '
+                    f'пик памяти {peak / 2 ** 20:.1f} МБ'
+                )
+
+
+def time_queries(news, queries, enabled):
+    started = perf_counter()
+    if enabled:
+        with connection.execute_wrapper(instrument):
+            for _ in range(queries):
+                News.objects.filter(pk=news.pk).exists()
+    else:
+        for _ in range(queries):
+            News.objects.filter(pk=news.pk).exists()
+    return (perf_counter() - started) / queries
+
+
+def time_pages(client, url, pages):
+    started = perf_counter()
+    for _ in range(pages):
+        client.get(url)
+    return (perf_counter() - started) / pages
+
+
+@benchmark('query_log')
+def query_log(write, queries=5000, pages=200, rounds=5):
+    """Накладные расходы учёта запросов: отдельный запрос и страница."""
+    author = get_user_model().objects.create(username='bench-querylog')
+    news = News.objects.create(title='Заголовок', text='Текст')
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(10)
+    )
+    url = reverse('news:detail', args=(news.pk,))
+    client = Client()
+    timings = {False: [], True: []}
+    with TemporaryDirectory() as directory:
+        # Режимы чередуются, берётся лучший круг: так прогрев не
+        # достаётся одному из них.
+        for _ in range(rounds):
+            for enabled in timings:
+                with override_settings(
+                    QUERY_LOG_ENABLED=enabled, QUERY_LOG_DIR=directory
+                ):
+                    timings[enabled].append((
+                        time_queries(news, queries, enabled),
+                        time_pages(client, url, pages),
+                    ))
+    stats.clear()
+    for enabled, results in timings.items():
+        per_query = min(result[0] for result in results)
+        per_page = min(result[1] for result in results)
+        write(
+            f'{"учёт" if enabled else "без учёта":>9}: '
+            f'запрос {per_query * 1e6:.1f} мкс, '
+            f'страница {per_page * 1000:.2f} мс'
+        )
+
+
+def measure_writes(news, author, stop, latencies, failures):
+    """Пишет комментарии, пока не выставлен stop; копит задержки."""
+    while not stop.is_set():
+        started = perf_counter()
+        try:
+            Comment.objects.create(news=news, author=author, text='Во время')
+        except OperationalError:
+            failures.append(perf_counter() - started)
+        else:
+            latencies.append(perf_counter() - started)
+    connection.close()
+
+
+@benchmark('purge')
+def purge(write, comments=20000):
+    """Удаление новости с комментариями: каскад против пачек purge."""
+    author = get_user_model().objects.create(username='bench-purge')
+    other = News.objects.create(title='Другая новость', text='Текст')
+    for mode in ('cascade', 'purge'):
+        news = News.objects.create(title='Популярная новость', text='Текст')
+        Comment.objects.bulk_create(
+            Comment(news=news, author=author, text=f'Комментарий {index}')
+            for index in range(comments)
+        )
+        stop = threading.Event()
+        latencies, failures = [], []
+        writer = threading.Thread(
+            target=measure_writes,
+            args=(other, author, stop, latencies, failures),
+        )
+        writer.start()
+        started = perf_counter()
+        try:
+            if mode == 'cascade':
+                news.delete()
+            else:
+                purge_news(news)
+            elapsed = perf_counter() - started
+        finally:
+            stop.set()
+            writer.join()
+        write(
+            f'{mode:>7}: удаление {elapsed * 1000:.0f} мс, '
+            f'записей комментариев за это время {len(latencies)}, '
+            f'отказов «database is locked» {len(failures)}, '
+            f'худшая задержка записи '
+            f'{max(latencies + failures) * 1000:.0f} мс'
+        )
+
+
+def time_detail(client, pk, runs):
+    url = reverse('news:detail', args=(pk,))
+    started = perf_counter()
+    for _ in range(runs):
+        client.get(url)
+    return (perf_counter() - started) / runs
+
+
+@benchmark('archive')
+def archive(write, news_count=2000, comments_per_news=20, runs=200):
+    """Перенос старых новостей в архив: размер базы и чтение из архива."""
+    enable_incremental_vacuum()
+    author = get_user_model().objects.create(username='bench-archive')
+    old = timezone.localdate() - timedelta(
+        days=settings.ARCHIVE_AFTER_DAYS + 1
+    )
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Слово ' * 300,
+             date=old - timedelta(days=index % 1000))
+        for index in range(news_count)
+    )
+    fresh = News.objects.create(title='Свежая', text='Слово ' * 300)
+    Comment.objects.bulk_create(
+        Comment(news_id=news_id, author=author, text='Комментарий ' * 10)
+        for news_id in News.objects.values_list('pk', flat=True)
+        for _ in range(comments_per_news)
+    )
+    archived_pk = News.objects.exclude(pk=fresh.pk).values_list(
+        'pk', flat=True
+    ).first()
+    client = Client()
+    time_detail(client, fresh.pk, runs)
+    hot_time = time_detail(client, archived_pk, runs)
+    before = database_stats()
+    started = perf_counter()
+    moved = archive_news()
+    elapsed = perf_counter() - started
+    incremental_vacuum()
+    after = database_stats()
+
+    def size(stats):
+        return stats['page_count'] * stats['page_size'] / 2 ** 20
+
+    write(
+        f'перенесено новостей {moved[0]}, комментариев {moved[1]} '
+        f'за {elapsed:.1f} с'
+    )
+    write(f'основная база: {size(before):.1f} → {size(after):.1f} МБ')
+    write(
+        f'страница новости: в основной базе {hot_time * 1000:.2f} мс, '
+        f'из архива {time_detail(client, archived_pk, runs) * 1000:.2f} мс, '
+        f'свежая {time_detail(client, fresh.pk, runs) * 1000:.2f} мс'
+    )
+
+
+def build_thread(news, author, levels, branching):
+    """Дерево ответов: на каждый комментарий уровня по branching ответов."""
+    parents = [None]
+    for level in range(levels):
+        Comment.objects.bulk_create(
+            Comment(
+                news=news, author=author, parent=parent,
+                text=f'Ответ уровня {level}',
+            )
+            for parent in parents
+            for _ in range(branching)
+        )
+        parents = list(Comment.objects.filter(news=news, depth=level))
+
+
+def walk_replies(comments, found):
+    """Обход ветки по внешнему ключу на родителя: запрос на комментарий."""
+    for comment in comments:
+        found.append(comment)
+        walk_replies(comment.replies.select_related('author'), found)
+    return found
+
+
+def time_thread(load, runs):
+    with CaptureQueriesContext(connection) as queries:
+        count = len(load())
+    started = perf_counter()
+    for _ in range(runs):
+        load()
+    return count, (perf_counter() - started) / runs, len(queries)
+
+
+@benchmark('comment_threads')
+def comment_threads(write, levels=6, branching=4, runs=5):
+    """Ветка ответов по пути комментария против обхода по родителю."""
+    author = get_user_model().objects.create(username='bench-threads')
+    news = News.objects.create(title='Обсуждение', text='Текст')
+    build_thread(news, author, levels, branching)
+    root = Comment.objects.filter(news=news, depth=1).first()
+    scenarios = (
+        ('вся ветка', lambda: walk_replies(
+            news.comment_set.filter(parent=None).select_related('author'), []
+        ), lambda: list(
+            news.comment_set.thread().select_related('author')
+        )),
+        ('поддерево', lambda: walk_replies(
+            Comment.objects.filter(pk=root.pk).select_related('author'), []
+        ), lambda: list(
+            Comment.objects.subtree(root).thread().select_related('author')
+        )),
+    )
+    total = news.comment_set.count()
+    for name, by_parent, by_path in scenarios:
+        count, parent_time, parent_queries = time_thread(by_parent, runs)
+        _, path_time, path_queries = time_thread(by_path, runs)
+        write(
+            f'{name} ({count} комментариев): по родителю '
+            f'{parent_time * 1000:.0f} мс, запросов {parent_queries}; '
+            f'по пути {path_time * 1000:.1f} мс, запросов {path_queries}'
+        )
+    client = Client()
+    url = reverse('news:detail', args=(news.pk,))
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        started = perf_counter()
+        response = client.get(url)
+        elapsed = perf_counter() - started
+    write(
+        f'страница новости ({len(response.context["comments"])} из '
+        f'{total} видно): {elapsed * 1000:.0f} мс, запросов {len(queries)}'
+    )
+
+
+def time_views(client, news, pages, mode):
+    url = reverse('news:detail', args=(news.pk,))
+    started = perf_counter()
+    for _ in range(pages):
+        client.get(url)
+        if mode == 'update':
+            News.objects.filter(pk=news.pk).update(views=F('views') + 1)
+    return (perf_counter() - started) / pages
+
+
+@benchmark('page_views')
+def page_views(write, news_count=2000, pages=300, rounds=5):
+    """Задержка news:detail со счётчиком просмотров и запись счётчиков."""
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст') for index in range(
+            news_count
+        )
+    )
+    news = News.objects.first()
+    client = Client()
+    modes = {
+        'off': 'без счётчика',
+        'batched': 'в памяти',
+        'update': 'UPDATE на просмотр',
+    }
+    timings = {mode: [] for mode in modes}
+    # Режимы чередуются, берётся лучший круг: так прогрев не
+    # достаётся одному из них.
+    for _ in range(rounds):
+        for mode in modes:
+            with override_settings(
+                PAGE_VIEW_COUNTING=mode == 'batched',
+                PAGE_VIEW_FLUSH_INTERVAL=0,
+            ):
+                timings[mode].append(time_views(client, news, pages, mode))
+                get_view_counter().flush()
+    for mode, label in modes.items():
+        write(f'{label}: страница {min(timings[mode]) * 1000:.3f} мс')
+    with override_settings(PAGE_VIEW_FLUSH_INTERVAL=0):
+        counter = get_view_counter()
+        for pk in News.objects.values_list('pk', flat=True):
+            counter.hit(pk)
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            counter.flush()
+            elapsed = perf_counter() - started
+    write(
+        f'запись просмотров {news_count} новостей: '
+        f'{elapsed * 1000:.1f} мс, запросов {len(queries)}'
+    )
+
+
+def trending_stream(news_count, events, hours, seed=0):
+    """
+    События (новость, время): каждая новость обсуждается около суток после
+    публикации, популярность новостей распределена по Парето.
+    """
+    randomizer = random.Random(seed)
+    start = timezone.now() - timedelta(hours=hours)
+    span = hours * 3600
+    popularity = [randomizer.paretovariate(1.2) for _ in range(news_count)]
+    published = sorted(
+        randomizer.uniform(-86400, span) for _ in range(news_count)
+    )
+    times = sorted(randomizer.uniform(0, span) for _ in range(events))
+    stream = []
+    first = 0
+    for moment in times:
+        while published[first] < moment - 86400:
+            first += 1
+        last = first
+        while last < news_count and published[last] <= moment:
+            last += 1
+        active = range(first, max(last, first + 1))
+        news_id = randomizer.choices(
+            active, weights=popularity[first:active.stop]
+        )[0]
+        stream.append((news_id, start + timedelta(seconds=moment)))
+    return stream
+
+
+@benchmark('trending')
+def trending(write, news_count=2000, events=50000, hours=72, size=10):
+    """Точность и скорость рейтинга популярных против полного пересчёта."""
+    stream = trending_stream(news_count, events, hours)
+    values = [(news_id, log_weight(1, moment)) for news_id, moment in stream]
+    exact = top_scores(add_events({}, values, len(values)), size)
+    for capacity in (20, 50, 200):
+        scores = {}
+        started = perf_counter()
+        add_events(scores, values, capacity)
+        per_event = (perf_counter() - started) / len(values)
+        top = top_scores(scores, size)
+        order = 'совпал' if list(top) == list(exact) else 'другой'
+        write(
+            f'ёмкость {capacity:>3}: совпало {len(top.keys() & exact.keys())}'
+            f' из {size}, порядок {order}, '
+            f'{per_event * 1e6:.1f} мкс на событие'
+        )
+    author = get_user_model().objects.create(username='bench-trending')
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст')
+        for index in range(news_count)
+    )
+    pks = list(News.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(news_id=pks[news_id], author=author, text='Текст')
+            for news_id, _ in stream
+        ),
+        batch_size=1000,
+    )
+    started = perf_counter()
+    top_scores(fetch_scores(), size)
+    recompute = perf_counter() - started
+    get_trending()
+    started = perf_counter()
+    for _ in range(100):
+        get_trending()
+    cached = (perf_counter() - started) / 100
+    write(
+        f'страница популярных: полный пересчёт по {events} комментариям '
+        f'{recompute * 1000:.0f} мс, из кеша {cached * 1000:.2f} мс'
+    )
+
+
+def hammer(counter, threads, increments):
+    """Время increments приращений counter из каждого из threads потоков."""
+    def work():
+        for _ in range(increments):
+            counter.inc('news:detail', 'GET', '200')
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return perf_counter() - started
+
+
+@benchmark('metrics')
+def metrics(write, increments=100000, pages=200, rounds=5):
+    """
+    Счётчик с одной блокировкой и с полосами, накладные расходы метрик
+    на страницу и время сборки /metrics.
+    """
+    labels = ('view', 'method', 'status')
+    for threads in (1, 4, 8):
+        timings = {}
+        for stripes in (1, 16):
+            counter = Counter('bench_total', '', labels, stripes=stripes,
+                              registry=None)
+            timings[stripes] = hammer(counter, threads, increments)
+        total = threads * increments
+        write(
+            f'потоков {threads}: одна блокировка '
+            f'{timings[1] / total * 1e9:.0f} нс, '
+            f'16 полос {timings[16] / total * 1e9:.0f} нс на приращение'
+        )
+    news = News.objects.create(title='Заголовок', text='Текст')
+    url = reverse('news:detail', args=(news.pk,))
+    client = Client()
+    timings = {False: [], True: []}
+    with TemporaryDirectory() as directory:
+        for _ in range(rounds):
+            for enabled in timings:
+                with override_settings(
+                    METRICS_ENABLED=enabled, METRICS_DIR=directory
+                ):
+                    timings[enabled].append(time_pages(client, url, pages))
+        started = perf_counter()
+        text = render(collect(directory))
+        scrape = perf_counter() - started
+    registry.clear()
+    for enabled, results in timings.items():
+        write(
+            f'{"метрики" if enabled else "без метрик":>10}: '
+            f'страница {min(results) * 1000:.2f} мс'
+        )
+    write(
+        f'/metrics: {len(text.splitlines())} строк за '
+        f'{scrape * 1000:.2f} мс'
+    )
+
+
+@benchmark('memory_profile')
+def memory_profile(write, comments=2000, pages=10, top=5):
+    """
+    Пик памяти и места выделения потоковой news:detail с большим числом
+    комментариев и цена профилируемого запроса.
+    """
+    author = get_user_model().objects.create(username='bench-memory')
+    news = News.objects.create(title='Заголовок', text='Текст')
+    Comment.objects.bulk_create(
+        (
+            Comment(news=news, author=author, text=f'Комментарий {index}')
+            for index in range(comments)
+        ),
+        batch_size=500,
+    )
+    url = reverse('news:detail', args=(news.pk,))
+    client = Client()
+    with TemporaryDirectory() as directory:
+        timings = {}
+        for rate in (0, 1):
+            with override_settings(
+                MEMORY_PROFILING=True, MEMORY_PROFILE_SAMPLE_RATE=rate,
+                MEMORY_PROFILE_DIR=directory, PAGE_VIEW_COUNTING=False,
+            ):
+                started = perf_counter()
+                for _ in range(pages):
+                    # Тело отдаётся по частям, как его отдал бы сервер.
+                    for _ in client.get(url).streaming_content:
+                        pass
+                timings[rate] = (perf_counter() - started) / pages
+            write(
+                f'{"с профилированием" if rate else "без профилирования":>18}'
+                f': страница {timings[rate] * 1000:.1f} мс'
+            )
+        sample = read_samples(directory)[0]
+    clear_memory_samples()
+    write(
+        f'пик {sample["peak_kb"]:.0f} КиБ, '
+        f'к концу запроса {sample["net_kb"]:.0f} КиБ'
+    )
+    for site in sample['sites'][:top]:
+        write(f'{site["size_kb"]:>10.1f} КиБ  {site["site"]}')
+
+
+@benchmark('cache_warmup')
+def cache_warmup(write, news_count=10, comments=50):
+    """
+    Первая волна запросов к горячим страницам после выкладки: с холодными
+    кешами и после warm_cache с разным числом потоков.
+    """
+    from django.core.cache import cache
+    from yanews.settings_production import TEMPLATES
+
+    author = get_user_model().objects.create(username='bench-warmup')
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст новости. ' * 50)
+        for index in range(news_count)
+    )
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for news in News.objects.all()
+        for index in range(comments)
+    )
+    urls = warmup_urls(news_count)
+    client = Client(HTTP_HOST='localhost')
+    for threads in (None, 1, 4):
+        # Свежий кеширующий загрузчик и пустой кеш — как в новом процессе.
+        with override_settings(
+            TEMPLATES=TEMPLATES, PAGE_VIEW_COUNTING=False
+        ):
+            cache.clear()
+            started = perf_counter()
+            if threads:
+                warm_cache(news_count, threads)
+            warmed = perf_counter()
+            timings = []
+            for url in urls:
+                page_started = perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(perf_counter() - page_started)
+            finished = perf_counter()
+        label = f'прогрев в {threads} пот.' if threads else 'без прогрева'
+        details = timings[2:-2]
+        write(
+            f'{label:>18}: прогрев {(warmed - started) * 1000:.1f} мс, '
+            f'первая волна из {len(urls)} страниц '
+            f'{(finished - warmed) * 1000:.1f} мс, главная '
+            f'{timings[0] * 1000:.1f} мс, новость в среднем '
+            f'{statistics.mean(details) * 1000:.1f} мс'
+        )
@@ -0,0 +1,124 @@
+"""
+Сжатие ответов.
+
+Обычные ответы короче COMPRESSION_MIN_LENGTH байт отдаются как есть.
+Потоковые ответы сжимаются по частям: после каждой части компрессор
+сбрасывает буфер, поэтому клиент получает данные, не дожидаясь конца
+страницы. Кодировка br доступна при установленном пакете brotli.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class GzipCompressor:
+
+    def __init__(self, level):
+        # wbits=31: поток в формате gzip, а не «голый» zlib.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+
+    def __init__(self, level):
+        # Уровни brotli идут от 0 до 11, уровни gzip — от 0 до 9.
+        self._compressor = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {'br': BrotliCompressor, **COMPRESSORS}
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+def choose_encoding(accept_encoding):
+    """
+    Первая из поддерживаемых кодировок, которую принимает клиент.
+
+    Явный отказ (gzip;q=0) действует и при наличии '*' в заголовке.
+    """
+    accepted, refused = set(), set()
+    for part in accept_encoding.split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if match is None:
+            continue
+        name, quality = match.groups()
+        try:
+            allowed = quality is None or float(quality) > 0
+        except ValueError:
+            continue
+        (accepted if allowed else refused).add(name.lower())
+    for encoding in COMPRESSORS:
+        if encoding in refused:
+            continue
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def compress_stream(compressor, chunks):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы кодировкой, которую принимает клиент."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_LENGTH
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        compressor = COMPRESSORS[encoding](settings.COMPRESSION_LEVEL)
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                compressor, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            content = compressor.compress(response.content)
+            content += compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        if response.has_header('ETag'):
+            # Сжатое тело отличается побайтно: ETag становится слабым.
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,185 @@
+"""
+Потоковая загрузка фикстур в формате JSON.
+
+loaddata читает фикстуру целиком через json.load и сохраняет объекты по
+одному. Здесь массив объектов разбирается по частям: из файла читается
+READ_SIZE символов, и каждый завершённый объект сразу превращается в
+модель стандартным десериализатором Django. Объекты копятся по моделям
+и пишутся bulk_create пачками по batch_size, так что в памяти держится
+не больше пачки на модель, сколько бы ни весил файл.
+
+bulk_create не отправляет сигналы, поэтому после загрузки вызывается
+rebuild_denormalized(): она пересобирает то, что обычно поддерживают
+сигналы (снимок главной, популярные новости, кеш пользователей).
+Объекты со связями многие-ко-многим, а при send_signals=True и все
+объекты, сохраняются по одному, как в loaddata.
+"""
+import gzip
+import json
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.serializers import base
+from django.core.serializers.python import Deserializer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .auth import invalidate_user
+from .front_page import FRONT_PAGE_KEY
+from .models import Comment, News
+from .trending import TRENDING_KEY
+
+READ_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+class JsonArrayReader:
+    """Читает элементы JSON-массива верхнего уровня по одному."""
+    decoder = json.JSONDecoder()
+
+    def __init__(self, stream, read_size=READ_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self):
+        if self.eof:
+            raise base.DeserializationError('Фикстура оборвана.')
+        chunk = self.stream.read(self.read_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def peek(self, skip):
+        """Первый символ после пропускаемых, при нужде дочитывая файл."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in skip
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            self.read_more()
+
+    def decode(self):
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # Число в конце буфера могло оборваться посередине.
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return item
+            self.read_more()
+
+    def __iter__(self):
+        if self.peek(WHITESPACE) != '[':
+            raise base.DeserializationError('Фикстура должна быть массивом.')
+        self.position += 1
+        while self.peek(WHITESPACE + ',') != ']':
+            yield self.decode()
+
+
+def iter_json_array(stream, read_size=READ_SIZE):
+    """Элементы JSON-массива верхнего уровня по одному."""
+    return iter(JsonArrayReader(stream, read_size))
+
+
+def open_fixture(path):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+class FixtureLoader:
+    """Пишет десериализованные объекты пачками bulk_create."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=1000,
+                 send_signals=False):
+        self.using = using
+        self.batch_size = batch_size
+        self.send_signals = send_signals
+        self.pending = defaultdict(list)
+        self.loaded = Counter()
+        # Ключи запоминаются только для пользователей: их кеш сбрасывается
+        # поштучно, а держать ключи всех объектов — расти с размером файла.
+        self.user_ids = set()
+
+    def add(self, deserialized):
+        instance = deserialized.object
+        model = type(instance)
+        if self.send_signals or deserialized.m2m_data:
+            # Связи многие-ко-многим требуют ключа, поэтому сохраняем сразу.
+            self.flush(model)
+            deserialized.save(using=self.using)
+            self.loaded_batch(model, [instance])
+        else:
+            self.pending[model].append(instance)
+            if len(self.pending[model]) >= self.batch_size:
+                self.flush(model)
+
+    def loaded_batch(self, model, batch):
+        self.loaded[model] += len(batch)
+        if model is get_user_model():
+            self.user_ids.update(instance.pk for instance in batch)
+
+    def flush(self, model=None):
+        models = [model] if model is not None else list(self.pending)
+        for model in models:
+            batch = self.pending.pop(model, [])
+            if batch:
+                model._default_manager.using(self.using).bulk_create(batch)
+                self.loaded_batch(model, batch)
+
+    def load(self, stream):
+        """Загружает объекты фикстуры из открытого файла."""
+        objects = Deserializer(
+            iter_json_array(stream), using=self.using,
+            ignorenonexistent=False, handle_forward_references=False,
+        )
+        for deserialized in objects:
+            self.add(deserialized)
+        self.flush()
+
+
+def load_fixtures(paths, using=DEFAULT_DB_ALIAS, batch_size=1000,
+                  send_signals=False):
+    """
+    Загружает фикстуры в одной транзакции; возвращает FixtureLoader.
+
+    Как и в loaddata, проверка внешних ключей отложена до конца загрузки,
+    поэтому порядок моделей в файле не важен. С send_signals=True объекты
+    сохраняются по одному с сигналами (raw=True), как в loaddata.
+    """
+    connection = connections[using]
+    loader = FixtureLoader(
+        using=using, batch_size=batch_size, send_signals=send_signals
+    )
+    with transaction.atomic(using=using):
+        with connection.constraint_checks_disabled():
+            for path in paths:
+                with open_fixture(path) as stream:
+                    loader.load(stream)
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in loader.loaded]
+        )
+    transaction.on_commit(
+        lambda: rebuild_denormalized(loader), using=using
+    )
+    return loader
+
+
+def rebuild_denormalized(loader):
+    """Пересобирает данные, которые при обычном сохранении ведут сигналы."""
+    if loader.loaded[News] or loader.loaded[Comment]:
+        cache.delete(FRONT_PAGE_KEY)
+    if loader.loaded[Comment]:
+        cache.delete(TRENDING_KEY)
+    for user_id in loader.user_ids:
+        invalidate_user(user_id)
@@ -1,6 +1,7 @@
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
+from .metrics import FORM_ERRORS
 from .models import Comment
 
 BAD_WORDS = (
@@ -23,5 +24,6 @@ class CommentForm(ModelForm):
         lowered_text = text.lower()
         for word in BAD_WORDS:
             if word in lowered_text:
+                FORM_ERRORS.inc('comment', 'bad_words')
                 raise ValidationError(WARNING)
         return text
@@ -0,0 +1,180 @@
+"""
+Снимок главной страницы.
+
+В кеше хранится список из NEWS_COUNT_ON_HOME_PAGE записей с заголовком,
+датой, началом текста и числом комментариев. Сигналы News и Comment
+меняют только затронутую запись; полный пересчёт выполняется, лишь
+когда снимка нет в кеше (после запуска или истечения FRONT_PAGE_TIMEOUT).
+
+Точечные изменения не продлевают срок снимка: он отсчитывается от
+полного пересчёта (built_at), иначе снимок, который часто меняется,
+не пересчитывался бы никогда, а расхождения между процессами с
+отдельными кешами копились бы без предела.
+"""
+import threading
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment, News
+
+FRONT_PAGE_KEY = 'news:front-page'
+
+_lock = threading.Lock()
+
+
+def make_entry(news, comments=0):
+    return {
+        'pk': news.pk,
+        'title': news.title,
+        'date': News._meta.get_field('date').to_python(news.date),
+        'preview': news.preview,
+        'comments': comments,
+    }
+
+
+def sort_key(entry):
+    return entry['date'], entry['pk']
+
+
+def fetch_entries(exclude=(), limit=None):
+    """Записи для новостей, идущих по порядку главной страницы."""
+    comment_count = Comment.objects.filter(
+        news=OuterRef('pk'), author__deletion__isnull=True
+    ).order_by().values('news').annotate(
+        count=Count('pk')
+    ).values('count')
+    queryset = News.objects.alive().defer('text').exclude(
+        pk__in=exclude
+    ).annotate(
+        comment_count=Coalesce(Subquery(comment_count), 0)
+    ).order_by('-date', '-pk')
+    limit = settings.NEWS_COUNT_ON_HOME_PAGE if limit is None else limit
+    return [make_entry(news, news.comment_count) for news in queryset[:limit]]
+
+
+def remaining_timeout(built_at, timeout):
+    """
+    Оставшийся срок данных, собранных в built_at, со сроком timeout.
+
+    None — срок не ограничен; ноль и меньше — срок истёк.
+    """
+    if timeout is None:
+        return None
+    return built_at + timeout - time()
+
+
+def get_front_page():
+    """Записи главной страницы; при пустом кеше строит снимок заново."""
+    snapshot = cache.get(FRONT_PAGE_KEY)
+    if snapshot is None:
+        snapshot = {'built_at': time(), 'entries': fetch_entries()}
+        cache.set(FRONT_PAGE_KEY, snapshot, settings.FRONT_PAGE_TIMEOUT)
+    return snapshot['entries']
+
+
+def update_front_page(change):
+    """Применяет change(entries) к снимку после фиксации транзакции."""
+    transaction.on_commit(lambda: apply_change(change))
+
+
+def apply_change(change):
+    with _lock:
+        snapshot = cache.get(FRONT_PAGE_KEY)
+        if snapshot is None:
+            return
+        timeout = remaining_timeout(
+            snapshot['built_at'], settings.FRONT_PAGE_TIMEOUT
+        )
+        if timeout is not None and timeout <= 0:
+            return
+        entries = snapshot['entries']
+        if change(entries) is False:
+            return
+        missing = settings.NEWS_COUNT_ON_HOME_PAGE - len(entries)
+        if missing > 0:
+            entries += fetch_entries(
+                exclude=[entry['pk'] for entry in entries], limit=missing
+            )
+        entries.sort(key=sort_key, reverse=True)
+        cache.set(FRONT_PAGE_KEY, snapshot, timeout)
+
+
+def find_entry(entries, pk):
+    for index, entry in enumerate(entries):
+        if entry['pk'] == pk:
+            return index
+    return None
+
+
+def comment_count_changed(news_id, delta):
+    """Меняет число комментариев у новости, если она на главной."""
+    def change(entries):
+        index = find_entry(entries, news_id)
+        if index is None:
+            return False
+        entries[index]['comments'] += delta
+    update_front_page(change)
+
+
+@receiver(post_save, sender=News)
+def news_saved(sender, instance, **kwargs):
+    if instance.deleted_at is not None:
+        news_removed([instance.pk])
+        return
+    # Значения снимаются сразу: к фиксации транзакции объект может измениться.
+    new_entry = make_entry(instance)
+
+    def change(entries):
+        limit = settings.NEWS_COUNT_ON_HOME_PAGE
+        entry = dict(new_entry)
+        index = find_entry(entries, entry['pk'])
+        if index is None:
+            if len(entries) >= limit and sort_key(entry) < sort_key(
+                entries[-1]
+            ):
+                return False
+        else:
+            entry['comments'] = entries.pop(index)['comments']
+            if entries and sort_key(entry) < sort_key(entries[-1]):
+                # Новость опустилась ниже остальных: займёт ли она
+                # освободившееся место, решит дозапрос недостающих записей.
+                return
+        entries.append(entry)
+        entries.sort(key=sort_key, reverse=True)
+        del entries[limit:]
+    update_front_page(change)
+
+
+def news_removed(pks):
+    """Убирает новости из снимка; их места займут следующие по дате."""
+    pks = set(pks)
+
+    def change(entries):
+        kept = [entry for entry in entries if entry['pk'] not in pks]
+        if len(kept) == len(entries):
+            return False
+        entries[:] = kept
+    update_front_page(change)
+
+
+@receiver(post_delete, sender=News)
+def news_deleted(sender, instance, **kwargs):
+    news_removed([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        comment_count_changed(instance.news_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    comment_count_changed(instance.news_id, -1)
@@ -0,0 +1,209 @@
+"""
+Ключи идемпотентности для форм.
+
+Форма несёт скрытое поле idempotency_key, клиенты без формы передают
+заголовок Idempotency-Key. Первый POST с ключом занимает его в хранилище
+(IDEMPOTENCY_BACKEND) и, если ответил редиректом, запоминает редирект на
+IDEMPOTENCY_TTL секунд. Повтор с тем же ключом, например двойной клик
+или повтор клиента после обрыва, получает сохранённый редирект, не
+доходя до представления и базы. Повтор, пришедший, пока первый запрос
+ещё выполняется, ждёт его до IDEMPOTENCY_WAIT секунд.
+
+Ответ без редиректа (ошибки формы, 429) не запоминается: ключ
+освобождается, и исправленную форму можно отправить с ним же.
+"""
+import re
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from time import monotonic, sleep
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils.module_loading import import_string
+
+FIELD_NAME = 'idempotency_key'
+HEADER_NAME = 'Idempotency-Key'
+KEY_PATTERN = re.compile(r'[\w-]{1,100}')
+PENDING = 'pending'
+# Ключ запроса, который не завершился за это время (процесс упал),
+# освобождается.
+PENDING_TTL = 60
+POLL_INTERVAL = 0.05
+
+
+def new_key():
+    """Ключ для скрытого поля формы."""
+    return uuid4().hex
+
+
+class LocalMemoryStore:
+    """
+    Ключи в памяти процесса, не больше max_keys.
+
+    Повтор, попавший в другой процесс, не будет узнан; для нескольких
+    процессов нужен CacheStore с общим кешем.
+    """
+    clock = staticmethod(monotonic)
+
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or settings.IDEMPOTENCY_MAX_KEYS
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key, ttl):
+        """Занимает ключ; возвращает None или состояние занятого ключа."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            self._set(key, PENDING, ttl, now)
+        return None
+
+    def complete(self, key, state, ttl):
+        with self._lock:
+            self._set(key, state, ttl, self.clock())
+
+    def release(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _set(self, key, state, ttl, now):
+        self._entries[key] = (now + ttl, state)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_keys:
+            self._prune(now)
+
+    def _prune(self, now):
+        """Убирает истёкшие ключи, а если их мало — самые старые."""
+        self._entries = OrderedDict(
+            (key, entry) for key, entry in self._entries.items()
+            if entry[0] > now
+        )
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+
+class CacheStore:
+    """
+    Ключи в кеше Django, общие для всех процессов.
+
+    Ключ занимается через cache.add, который атомарен в Memcached и
+    Redis; размер ограничен настройками самого кеша.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def claim(self, key, ttl):
+        if self.cache.add(key, PENDING, ttl):
+            return None
+        return self.cache.get(key)
+
+    def complete(self, key, state, ttl):
+        self.cache.set(key, state, ttl)
+
+    def release(self, key):
+        self.cache.delete(key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = import_string(settings.IDEMPOTENCY_BACKEND)()
+        return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting.startswith('IDEMPOTENCY_'):
+        _store = None
+
+
+def replay(state):
+    status, location = state
+    response = HttpResponse(status=status)
+    response['Location'] = location
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def run_once(key, handler):
+    """
+    Выполняет handler один раз на ключ; повтор получает его редирект.
+
+    Если первый запрос с ключом не завершился за IDEMPOTENCY_WAIT секунд,
+    повтор получает 409 и может попробовать позже.
+    """
+    store = get_store()
+    deadline = monotonic() + settings.IDEMPOTENCY_WAIT
+    while True:
+        state = store.claim(key, PENDING_TTL)
+        if state is None:
+            break
+        if state != PENDING:
+            return replay(state)
+        if monotonic() >= deadline:
+            response = HttpResponse(
+                'Запрос с этим ключом ещё выполняется.',
+                status=HTTPStatus.CONFLICT,
+            )
+            response['Retry-After'] = '1'
+            return response
+        sleep(POLL_INTERVAL)
+    try:
+        response = handler()
+    except BaseException:
+        store.release(key)
+        raise
+    if response.status_code in (HTTPStatus.FOUND, HTTPStatus.SEE_OTHER):
+        store.complete(
+            key, (response.status_code, response['Location']),
+            settings.IDEMPOTENCY_TTL,
+        )
+    else:
+        store.release(key)
+    return response
+
+
+class IdempotencyMixin:
+    """
+    Повтор POST с тем же ключом получает ответ первого запроса.
+
+    Ставится после LoginRequiredMixin (ключи разделены по пользователям)
+    и до ThrottleMixin: повтор не расходует лимит.
+    """
+    idempotency_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'POST':
+            return super().dispatch(request, *args, **kwargs)
+        key = (
+            request.POST.get(FIELD_NAME) or request.headers.get(HEADER_NAME)
+        )
+        if not key:
+            return super().dispatch(request, *args, **kwargs)
+        if not KEY_PATTERN.fullmatch(key):
+            return HttpResponseBadRequest('Неверный ключ идемпотентности.')
+        return run_once(
+            f'idempotency:{self.idempotency_scope}:{request.user.pk}:{key}',
+            lambda: super(IdempotencyMixin, self).dispatch(
+                request, *args, **kwargs
+            ),
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context[FIELD_NAME] = new_key()
+        return context
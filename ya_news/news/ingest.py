@@ -0,0 +1,356 @@
+"""
+Отложенная запись комментариев пачками.
+
+В режиме COMMENT_INGEST_MODE = 'queue' проверенный комментарий не
+сохраняется в запросе, а дописывается в журнал процесса на диске и
+в очередь в памяти. Фоновый поток раз в COMMENT_INGEST_FLUSH_INTERVAL
+секунд (или при накоплении COMMENT_INGEST_BATCH_SIZE комментариев)
+записывает очередь одним bulk_create в одной транзакции. Журнал
+переписывается после каждой записи, поэтому после падения процесса
+в нём остаются только несохранённые комментарии; replay_spools()
+дописывает их в базу, пропуская уже сохранённые.
+
+Если база отклонила пачку (IntegrityError), её комментарии пишутся по
+одному, а отклонённые по отдельности переносятся в журнал отклонённых
+rejected-<pid>.jsonl рядом с журналом очереди. Длина очереди и число
+отклонённых записей видны на странице /metrics (news.metrics).
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .front_page import comment_count_changed
+from .models import Comment, News
+from .trending import comments_added
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PATTERN = 'comments-{}.jsonl'
+REJECTED_PATTERN = 'rejected-{}.jsonl'
+
+QUEUE_DEPTH = metrics.Gauge(
+    'comment_queue_depth', 'Комментарии в очереди, ещё не записанные.',
+)
+QUEUE_REJECTED = metrics.Counter(
+    'comment_queue_rejected_total',
+    'Комментарии из очереди, отклонённые базой.',
+)
+
+
+def spool_owner(path):
+    """PID процесса, которому принадлежит журнал."""
+    return int(path.stem.rsplit('-', 1)[1])
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_spool(path):
+    """Записи журнала; недописанная при падении строка пропускается."""
+    records = []
+    with open(path, encoding='utf-8') as spool:
+        for line in spool:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning('Пропущена повреждённая строка в %s', path)
+    return records
+
+
+def build_comments(records):
+    """Комментарии из записей журнала, кроме удалённых новостей и авторов."""
+    news_ids = set(
+        News.objects.filter(
+            pk__in={record['news_id'] for record in records}
+        ).values_list('pk', flat=True)
+    )
+    author_ids = set(
+        get_user_model().objects.filter(
+            pk__in={record['author_id'] for record in records}
+        ).values_list('pk', flat=True)
+    )
+    return [
+        Comment(
+            news_id=record['news_id'],
+            author_id=record['author_id'],
+            text=record['text'],
+            parent_id=record.get('parent_id'),
+        )
+        for record in records
+        if record['news_id'] in news_ids
+        and record['author_id'] in author_ids
+    ]
+
+
+def save_records(records):
+    """Сохраняет записи одной транзакцией и возвращает их количество."""
+    comments = build_comments(records)
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        # bulk_create не отправляет сигналы, поэтому снимок главной
+        # обновляется явно.
+        for news_id, count in Counter(
+            comment.news_id for comment in comments
+        ).items():
+            comment_count_changed(news_id, count)
+        comments_added(comments)
+    return len(comments)
+
+
+def unsaved(records):
+    """
+    Записи, для которых ещё нет комментария с тем же автором, новостью и
+    текстом, созданного не раньше постановки в очередь. Сохранённые
+    комментарии выбираются одним запросом на все записи.
+    """
+    if not records:
+        return []
+    queued = [parse_datetime(record['created']) for record in records]
+    latest = {}
+    for news_id, author_id, text, created in Comment.objects.filter(
+        news_id__in={record['news_id'] for record in records},
+        author_id__in={record['author_id'] for record in records},
+        created__gte=min(queued),
+    ).values_list('news_id', 'author_id', 'text', 'created'):
+        key = (news_id, author_id, text)
+        latest[key] = max(latest.get(key, created), created)
+    pending = []
+    for record, created in zip(records, queued):
+        saved = latest.get(
+            (record['news_id'], record['author_id'], record['text'])
+        )
+        if saved is None or saved < created:
+            pending.append(record)
+    return pending
+
+
+def replay_spools(directory, batch_size=None):
+    """
+    Дописывает в базу комментарии из журналов завершившихся процессов.
+
+    Уже сохранённые записи пропускаются (см. unsaved()): процесс мог
+    упасть между записью в базу и очисткой журнала.
+    """
+    batch_size = batch_size or settings.COMMENT_INGEST_BATCH_SIZE
+    replayed = 0
+    for path in sorted(Path(directory).glob(SPOOL_PATTERN.format('*'))):
+        owner = spool_owner(path)
+        if owner != os.getpid() and process_alive(owner):
+            continue
+        records = read_spool(path)
+        for start in range(0, len(records), batch_size):
+            batch = unsaved(records[start:start + batch_size])
+            if batch:
+                replayed += save_records(batch)
+        path.unlink()
+    return replayed
+
+
+class CommentQueue:
+    """Очередь комментариев процесса с журналом на диске."""
+
+    def __init__(self, spool_dir, batch_size, flush_interval, fsync=False):
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.spool_path = self.spool_dir / SPOOL_PATTERN.format(os.getpid())
+        self.rejected_path = self.spool_dir / REJECTED_PATTERN.format(
+            os.getpid()
+        )
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.enqueued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.rejected = 0
+        self.last_flush_seconds = 0.0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._spool = None
+        self._thread = None
+
+    def _append_to_spool(self, record):
+        if self._spool is None:
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        self._spool.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def _rewrite_spool(self):
+        """Оставляет в журнале только ещё не записанные комментарии."""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if not self._pending:
+            self.spool_path.unlink(missing_ok=True)
+            return
+        temporary = self.spool_path.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as spool:
+            for record in self._pending:
+                spool.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(temporary, self.spool_path)
+
+    def enqueue(self, comment):
+        """Ставит несохранённый комментарий в очередь."""
+        record = {
+            'news_id': comment.news_id,
+            'author_id': comment.author_id,
+            'text': comment.text,
+            'parent_id': comment.parent_id,
+            'created': timezone.now().isoformat(),
+        }
+        with self._lock:
+            self._append_to_spool(record)
+            self._pending.append(record)
+            self.enqueued += 1
+            depth = len(self._pending)
+            QUEUE_DEPTH.set(depth)
+        if depth >= self.batch_size:
+            self._wakeup.set()
+        return record
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def pending_for(self, news_id, author_id):
+        """Ещё не записанные комментарии автора к новости."""
+        with self._lock:
+            records = [
+                record for record in self._pending
+                if record['news_id'] == news_id
+                and record['author_id'] == author_id
+            ]
+        return [
+            {'text': record['text'],
+             'created': parse_datetime(record['created'])}
+            for record in records
+        ]
+
+    def _save_separately(self, batch):
+        """Пишет записи по одной; отклонённые переносит в их журнал."""
+        rejected = []
+        for record in batch:
+            try:
+                save_records([record])
+            except IntegrityError:
+                rejected.append(record)
+        if not rejected:
+            return
+        logger.error(
+            'База отклонила комментарии (%d), они перенесены в %s',
+            len(rejected), self.rejected_path,
+        )
+        with open(self.rejected_path, 'a', encoding='utf-8') as spool:
+            for record in rejected:
+                spool.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.rejected += len(rejected)
+        QUEUE_REJECTED.inc(amount=len(rejected))
+
+    def flush(self):
+        """Записывает одну пачку; возвращает число записанных элементов."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                return 0
+            started = monotonic()
+            try:
+                save_records(batch)
+            except IntegrityError:
+                # Новость или автора удалили между проверкой и записью:
+                # остальные комментарии пачки не должны пропасть.
+                self._save_separately(batch)
+            with self._lock:
+                del self._pending[:len(batch)]
+                self._rewrite_spool()
+                self.flushed += len(batch)
+                self.flushes += 1
+                self.last_flush_seconds = monotonic() - started
+                QUEUE_DEPTH.set(len(self._pending))
+            return len(batch)
+
+    def flush_all(self):
+        while self.flush():
+            pass
+
+    def stats(self):
+        """Показатели очереди для мониторинга."""
+        return {
+            'depth': self.depth,
+            'enqueued': self.enqueued,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'rejected': self.rejected,
+            'last_flush_seconds': self.last_flush_seconds,
+        }
+
+    def start(self):
+        """Запускает фоновую запись, если задан интервал."""
+        if self.flush_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name='comment-writer', daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush_all)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush_all()
+            except Exception:
+                logger.exception('Ошибка фоновой записи комментариев')
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_comment_queue():
+    """Очередь процесса; при первом обращении дописывает старые журналы."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            replay_spools(settings.COMMENT_INGEST_SPOOL_DIR)
+            _queue = CommentQueue(
+                settings.COMMENT_INGEST_SPOOL_DIR,
+                settings.COMMENT_INGEST_BATCH_SIZE,
+                settings.COMMENT_INGEST_FLUSH_INTERVAL,
+                settings.COMMENT_INGEST_FSYNC,
+            )
+            _queue.start()
+        return _queue
+
+
+@receiver(setting_changed)
+def reset_comment_queue(setting, **kwargs):
+    global _queue
+    if setting.startswith('COMMENT_INGEST_'):
+        _queue = None
@@ -0,0 +1,26 @@
+"""Отложенный импорт редко используемых представлений."""
+from django.utils.module_loading import import_string
+
+
+def lazy_view(view_path, imports=None, **initkwargs):
+    """
+    Представление, класс которого импортируется при первом запросе.
+
+    imports — словарь аргументов as_view(), значения которых заданы
+    путями для импорта (например, form_class), чтобы не тянуть модули
+    форм при загрузке URLconf.
+    """
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            resolved = {
+                name: import_string(path)
+                for name, path in (imports or {}).items()
+            }
+            view = import_string(view_path).as_view(**initkwargs, **resolved)
+        return view(request, *args, **kwargs)
+
+    wrapper.view_path = view_path
+    return wrapper
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.archive import (
+    archive_news, database_stats, enable_incremental_vacuum,
+    incremental_vacuum, vacuum
+)
+
+
+def size_mb(stats):
+    return stats['page_count'] * stats['page_size'] / 2 ** 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит новости старше ARCHIVE_AFTER_DAYS дней вместе с '
+        'комментариями в архивную базу и возвращает освободившееся место '
+        'в файле основной базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help='Возраст новостей в днях, после которого они уходят в архив.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+            help='Количество новостей, переносимых за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--vacuum',
+            choices=('full', 'incremental'),
+            help=(
+                'После переноса сжать основную базу: full — VACUUM, '
+                'incremental — PRAGMA incremental_vacuum.'
+            ),
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum',
+            action='store_true',
+            help='Перевести основную базу в режим auto_vacuum = INCREMENTAL.',
+        )
+
+    def handle(self, *args, **options):
+        if options['enable_incremental_vacuum']:
+            enable_incremental_vacuum()
+        before = database_stats()
+
+        def progress(news_count, comment_count):
+            self.stdout.write(
+                f'В архиве новостей: {news_count}, '
+                f'комментариев: {comment_count}'
+            )
+
+        news_count, comment_count = archive_news(
+            options['days'], options['batch_size'], progress
+        )
+        if options['vacuum'] == 'full':
+            vacuum()
+        elif options['vacuum'] == 'incremental':
+            if before['auto_vacuum'] != 2:
+                self.stderr.write(
+                    'База не в режиме auto_vacuum = INCREMENTAL, '
+                    'запустите команду с --enable-incremental-vacuum.'
+                )
+            incremental_vacuum()
+        after = database_stats()
+        self.stdout.write(
+            f'Перенесено новостей: {news_count}, '
+            f'комментариев: {comment_count}. '
+            f'Размер базы: {size_mb(before):.1f} → {size_mb(after):.1f} МБ, '
+            f'свободных страниц: {after["freelist_count"]}'
+        )
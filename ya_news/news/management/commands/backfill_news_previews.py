@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.front_page import FRONT_PAGE_KEY
+from news.models import News, make_preview
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сохранённое начало текста новостей, например после '
+        'изменения PREVIEW_WORDS или правки текстов в обход save().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество новостей, обновляемых за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать все новости, а не только без превью.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = News.objects.only('pk', 'text', 'preview').order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(preview='')
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for news in batch:
+                preview = make_preview(news.text)
+                if preview != news.preview:
+                    news.preview = preview
+                    changed.append(news)
+            with transaction.atomic():
+                News.objects.bulk_update(changed, ['preview'])
+            updated += len(changed)
+            last_pk = batch[-1].pk
+        if updated:
+            # bulk_update не отправляет сигналы: снимок главной строим заново.
+            cache.delete(FRONT_PAGE_KEY)
+        self.stdout.write(f'Обновлено превью новостей: {updated}')
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_PREFIX = 'import time:'
+# Прогрев при создании WSGI-приложения импортирует модули, которых нет в
+# холодном старте, поэтому в замере он выключен.
+WARMUP_SETTINGS = ('TEMPLATE_WARMUP', 'URL_PRERESOLVE', 'CACHE_WARMUP')
+
+
+def parse_importtime(output):
+    """Пары (модуль, собственное время в мкс) из вывода -X importtime."""
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        self_time, _, module = line[len(IMPORTTIME_PREFIX):].split('|')
+        if not self_time.strip().isdigit():
+            continue
+        yield module.strip(), int(self_time)
+
+
+def group_for_module(module, app_names):
+    """Приложение модуля или, если его нет, пакет верхнего уровня."""
+    for name in app_names:
+        if module == name or module.startswith(name + '.'):
+            return name
+    return module.split('.')[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает создание WSGI-приложения под python -X importtime '
+        'и показывает время импорта по установленным приложениям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Сколько самых медленных групп показать.',
+        )
+
+    def handle(self, *args, **options):
+        wsgi_module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        script = '\n'.join([
+            'from django.conf import settings',
+            *(f'settings.{name} = False' for name in WARMUP_SETTINGS),
+            f'import {wsgi_module}',
+        ])
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            errors = [
+                line for line in result.stderr.splitlines()
+                if line.strip() and not line.startswith(IMPORTTIME_PREFIX)
+            ]
+            raise CommandError(
+                errors[-1] if errors else
+                f'Импорт {wsgi_module} завершился с кодом '
+                f'{result.returncode} без сообщения об ошибке.'
+            )
+        app_names = sorted(
+            (config.name for config in apps.get_app_configs()),
+            key=len,
+            reverse=True,
+        )
+        totals = defaultdict(int)
+        modules = defaultdict(int)
+        for module, self_time in parse_importtime(result.stderr):
+            group = group_for_module(module, app_names)
+            totals[group] += self_time
+            modules[group] += 1
+        rows = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        self.stdout.write(f'{"Группа":<40}{"мс":>10}{"модулей":>10}')
+        for group, total in rows[:options['limit']]:
+            self.stdout.write(
+                f'{group:<40}{total / 1000:>10.1f}{modules[group]:>10}'
+            )
+        self.stdout.write(
+            f'{"Всего":<40}{sum(totals.values()) / 1000:>10.1f}'
+            f'{sum(modules.values()):>10}'
+        )
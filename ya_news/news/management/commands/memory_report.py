@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from news.memprofile import read_samples, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает сводку профилирования памяти всех процессов по '
+        'представлениям: пик и остаток памяти и места выделения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view',
+            help='Показать только замеры этого представления.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=5,
+            help='Сколько мест выделения вывести для представления.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Выгрузить все замеры в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        samples = read_samples()
+        if options['view']:
+            samples = [
+                sample for sample in samples
+                if sample['view'] == options['view']
+            ]
+        if options['json']:
+            self.stdout.write(json.dumps(samples, ensure_ascii=False))
+            return
+        self.stdout.write(
+            f'{"пик макс., КиБ":>14} {"пик средн.":>10} {"остаток":>8} '
+            f'{"замеров":>7}  представление'
+        )
+        for entry in summarize(samples, options['top']):
+            self.stdout.write(
+                f'{entry["max_peak_kb"]:>14.1f} {entry["peak_kb"]:>10.1f} '
+                f'{entry["net_kb"]:>8.1f} {entry["samples"]:>7}  '
+                f'{entry["view"]} ({entry["max_peak_path"]})'
+            )
+            for site in entry['sites']:
+                self.stdout.write(f'{site["size_kb"]:>24.1f}  {site["site"]}')
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет просроченные сессии из базы данных небольшими пачками, '
+        'чтобы не держать блокировку записи SQLite надолго.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.SESSION_PRUNE_BATCH_SIZE,
+            help='Количество сессий, удаляемых за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                keys = list(
+                    Session.objects.filter(
+                        expire_date__lt=now
+                    ).values_list('pk', flat=True)[:batch_size]
+                )
+                if not keys:
+                    break
+                Session.objects.filter(pk__in=keys).delete()
+            deleted += len(keys)
+        self.stdout.write(f'Удалено просроченных сессий: {deleted}')
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.purge import pending_purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет новости и пользователей, удалённых на сайте '
+        'или в админке, вместе с комментариями. Комментарии удаляются '
+        'пачками, и блокировка записи SQLite не держится дольше одной.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PURGE_BATCH_SIZE,
+            help='Количество комментариев, удаляемых за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Пауза между пачками в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        purged = 0
+        for purge, obj, total in pending_purge():
+            label = f'{obj._meta.verbose_name} «{obj}»'
+
+            def progress(deleted):
+                self.stdout.write(
+                    f'{label}: удалено комментариев {deleted} из {total}'
+                )
+
+            purge(
+                obj, options['batch_size'], progress, options['pause']
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'{label}: удаление завершено')
+            )
+            purged += 1
+        self.stdout.write(f'Удалено объектов: {purged}')
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.ingest import replay_spools
+
+
+class Command(BaseCommand):
+    help = (
+        'Дописывает в базу комментарии из журналов очереди, оставшихся '
+        'после остановки или падения процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir',
+            default=settings.COMMENT_INGEST_SPOOL_DIR,
+            help='Каталог с журналами очереди комментариев.',
+        )
+
+    def handle(self, *args, **options):
+        replayed = replay_spools(options['spool_dir'])
+        self.stdout.write(f'Восстановлено комментариев: {replayed}')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from news.fixture_loader import load_fixtures
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает фикстуры JSON, разбирая их по частям и записывая '
+        'пачками bulk_create: память не растёт с размером файла.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Пути к файлам фикстур (.json или .json.gz).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество объектов одной модели в одном bulk_create.',
+        )
+        parser.add_argument(
+            '--send-signals',
+            action='store_true',
+            help='Сохранять объекты по одному с сигналами, как loaddata.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных для загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        loader = load_fixtures(
+            options['paths'],
+            using=options['database'],
+            batch_size=options['batch_size'],
+            send_signals=options['send_signals'],
+        )
+        for model, count in loader.loaded.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
@@ -0,0 +1,56 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from news.warmup import warm_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает главную, популярное, последние новости и страницы '
+        'входа, чтобы после выкладки первые посетители не ждали '
+        'холодных кешей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--news',
+            type=int,
+            default=settings.CACHE_WARMUP_NEWS,
+            help='Сколько последних новостей открыть.',
+        )
+        parser.add_argument(
+            '--parallel',
+            type=int,
+            default=settings.CACHE_WARMUP_THREADS,
+            help='Сколько страниц запрашивать одновременно.',
+        )
+
+    def handle(self, *args, **options):
+        if isinstance(caches['default'], LocMemCache):
+            self.stdout.write(self.style.WARNING(
+                'Кеш по умолчанию живёт в памяти процесса: команда '
+                'прогреет только свой процесс. Рабочие процессы '
+                'прогреваются при старте, если включён CACHE_WARMUP.'
+            ))
+        started = perf_counter()
+        results = warm_cache(options['news'], options['parallel'])
+        elapsed = (perf_counter() - started) * 1000
+        failed = 0
+        for url, status, seconds in results:
+            style = self.style.SQL_FIELD
+            if status >= 400:
+                failed += 1
+                style = self.style.ERROR
+            self.stdout.write(
+                f'  {status} {seconds * 1000:>8.1f} мс  {url}', style
+            )
+        self.stdout.write(
+            f'Прогрето страниц: {len(results)} за {elapsed:.1f} мс '
+            f'в {options["parallel"]} потоков'
+        )
+        if failed:
+            raise CommandError(f'Страниц с ошибкой: {failed}')
@@ -0,0 +1,686 @@
+"""
+Метрики в текстовом формате Prometheus.
+
+Счётчики, гистограммы и текущие значения живут в памяти процесса.
+Значения каждой метрики разложены по STRIPES полосам со своей
+блокировкой, и поток всегда пишет в одну и ту же полосу, поэтому потоки
+почти не ждут друг друга; при чтении полосы складываются.
+
+MetricsMiddleware считает запросы по представлениям, кодам ответа,
+время ответа и SQL-запросы, MeteredCacheMixin — попадания в кеш (ключи
+сессий cached_db помечены как session), формы — отклонённые данные.
+
+Раз в METRICS_FLUSH_INTERVAL секунд процесс копирует свои значения в
+файл METRICS_DIR/metrics-<pid>.mmap, отображённый в память. Страница
+/metrics складывает значения текущего процесса из памяти, файлы
+остальных процессов и общий файл metrics-exited.json завершённых.
+
+Чтобы счётчики не уменьшались, а файлы не копились, при выходе процесс
+прибавляет свои значения к общему файлу и удаляет свой. Файлы процессов,
+завершившихся без этого (упавших), переносятся туда же при чтении
+/metrics; серверу, который знает о завершении рабочих процессов, можно
+вызывать retire_process(pid), например из хука child_exit gunicorn.
+Текущие значения (Gauge) завершённых процессов отбрасываются. Общий
+файл меняется под блокировкой каталога (flock); /metrics берёт её, только
+если нашёл файлы упавших процессов, а остальное читает без блокировки.
+
+Страница /metrics отвечает адресам из METRICS_ALLOWED_IPS и персоналу,
+остальным — 403; при выключенных метриках — 404.
+"""
+import atexit
+import fcntl
+import itertools
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import PermissionDenied
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+FILE_PATTERN = 'metrics-{}.mmap'
+EXITED_FILE = 'metrics-exited.json'
+LOCK_FILE = 'metrics.lock'
+STRIPES = 16
+# Верхние границы корзин гистограммы времени ответа в секундах.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METHODS = frozenset(
+    ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+)
+# Сегменты ключа кеша с числами (id, IP-адреса) не попадают в метку.
+KEY_SEGMENT = re.compile(r':[^:]*\d[^:]*')
+SESSION_KEY_PREFIX = 'django.contrib.sessions'
+
+_stripe_numbers = itertools.count()
+_local = threading.local()
+
+
+def stripe_index():
+    """Номер полосы потока; потоки получают полосы по кругу."""
+    try:
+        return _local.stripe
+    except AttributeError:
+        _local.stripe = next(_stripe_numbers)
+        return _local.stripe
+
+
+class Registry:
+    """Метрики процесса по именам."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        """Значения всех метрик: {имя: [[метки, значение], ...]}."""
+        return {
+            name: [
+                [list(labels), value]
+                for labels, value in metric.collect().items()
+            ]
+            for name, metric in self.metrics.items()
+        }
+
+    def clear(self):
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+registry = Registry()
+
+
+class Metric:
+    """Значения метрики по наборам меток, разложенные по полосам."""
+    kind = None
+
+    def __init__(self, name, documentation, labels=(), stripes=STRIPES,
+                 registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+        if registry is not None:
+            registry.register(self)
+
+    def _stripe(self):
+        return self._stripes[stripe_index() % len(self._stripes)]
+
+    def empty(self):
+        raise NotImplementedError
+
+    def add(self, total, value):
+        """Прибавляет value к total; возвращает сумму."""
+        raise NotImplementedError
+
+    def collect(self):
+        """Сумма полос: {метки: значение}."""
+        totals = {}
+        for lock, values in self._stripes:
+            with lock:
+                items = [
+                    (labels, self.add(self.empty(), value))
+                    for labels, value in values.items()
+                ]
+            for labels, value in items:
+                totals[labels] = self.add(
+                    totals.get(labels, self.empty()), value
+                )
+        return totals
+
+    def clear(self):
+        for lock, values in self._stripes:
+            with lock:
+                values.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def empty(self):
+        return 0
+
+    def add(self, total, value):
+        return total + value
+
+    def inc(self, *labels, amount=1):
+        lock, values = self._stripe()
+        with lock:
+            values[labels] = values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Текущее значение, например длина очереди. Хранится в одной полосе:
+    set() заменяет значение, а не прибавляет к нему. Значения процессов
+    на странице /metrics складываются.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), **kwargs):
+        kwargs['stripes'] = 1
+        super().__init__(name, documentation, labels, **kwargs)
+
+    def empty(self):
+        return 0
+
+    def add(self, total, value):
+        return total + value
+
+    def set(self, value, *labels):
+        lock, values = self._stripe()
+        with lock:
+            values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма: значение — число наблюдений в каждой корзине (последняя
+    без верхней границы) и их сумма.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=DURATION_BUCKETS, **kwargs):
+        super().__init__(name, documentation, labels, **kwargs)
+        self.buckets = tuple(buckets)
+
+    def empty(self):
+        return [0] * (len(self.buckets) + 2)
+
+    def add(self, total, value):
+        return [left + right for left, right in zip(total, value)]
+
+    def bucket_index(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                return index
+        return len(self.buckets)
+
+    def observe(self, value, *labels):
+        index = self.bucket_index(value)
+        lock, values = self._stripe()
+        with lock:
+            counts = values.get(labels)
+            if counts is None:
+                counts = values[labels] = self.empty()
+            counts[index] += 1
+            counts[-1] += value
+
+
+REQUESTS = Counter(
+    'http_requests_total', 'Ответы по представлениям и кодам.',
+    ('view', 'method', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Время ответа по представлениям.',
+    ('view',),
+)
+QUERIES = Counter(
+    'db_queries_total', 'SQL-запросы по представлениям.', ('view',),
+)
+QUERY_DURATION = Counter(
+    'db_query_duration_seconds_total',
+    'Суммарное время SQL-запросов по представлениям.', ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Чтения из кеша по видам ключей.',
+    ('key', 'result'),
+)
+FORM_ERRORS = Counter(
+    'form_errors_total', 'Отклонённые данные форм по причинам.',
+    ('form', 'reason'),
+)
+
+
+def merge(snapshots):
+    """Складывает снимки процессов: {имя: {метки: значение}}."""
+    merged = {name: {} for name in registry.metrics}
+    for snapshot in snapshots:
+        for name, samples in snapshot.items():
+            metric = registry.metrics.get(name)
+            if metric is None:
+                continue
+            totals = merged[name]
+            for labels, value in samples:
+                labels = tuple(labels)
+                totals[labels] = metric.add(
+                    totals.get(labels, metric.empty()), value
+                )
+    return merged
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{escape(value)}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def render(merged):
+    """Текст для Prometheus."""
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in sorted(merged.get(name, {}).items()):
+            if metric.kind in ('counter', 'gauge'):
+                lines.append(
+                    f'{name}{format_labels(metric.labels, labels)} '
+                    f'{format_value(value)}'
+                )
+                continue
+            names = metric.labels + ('le',)
+            seen = 0
+            for bound, count in zip(
+                    metric.buckets + (math.inf,), value[:-1]
+            ):
+                seen += count
+                lines.append(
+                    f'{name}_bucket'
+                    f'{format_labels(names, labels + (format_value(bound),))}'
+                    f' {format_value(seen)}'
+                )
+            suffix = format_labels(metric.labels, labels)
+            lines.append(f'{name}_sum{suffix} {format_value(value[-1])}')
+            lines.append(f'{name}_count{suffix} {format_value(seen)}')
+    return '\n'.join(lines) + '\n'
+
+
+HEADER = struct.Struct('<QQ')
+
+
+class SharedFile:
+    """
+    Файл, отображённый в память, со снимком метрик процесса.
+
+    Заголовок — номер записи и длина данных. На время записи номер
+    нечётный; читатель повторяет чтение, если застал запись или номер
+    изменился, пока он читал.
+    """
+    initial_size = 64 * 1024
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._map = None
+        self._resize(max(self.initial_size, os.fstat(self._fd).st_size))
+        sequence, _ = HEADER.unpack_from(self._map)
+        self._sequence = sequence + sequence % 2
+
+    def _resize(self, size):
+        if self._map is not None:
+            self._map.close()
+        os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def write(self, payload):
+        end = HEADER.size + len(payload)
+        if end > len(self._map):
+            size = len(self._map)
+            while size < end:
+                size *= 2
+            self._resize(size)
+        HEADER.pack_into(self._map, 0, self._sequence + 1, len(payload))
+        self._map[HEADER.size:end] = payload
+        self._sequence += 2
+        HEADER.pack_into(self._map, 0, self._sequence, len(payload))
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def read_shared(path, attempts=3):
+    """Данные из SharedFile; None, если прочитать целиком не удалось."""
+    with open(path, 'rb') as shared:
+        for _ in range(attempts):
+            data = shared.read()
+            shared.seek(0)
+            header = shared.read(HEADER.size)
+            shared.seek(0)
+            if len(header) < HEADER.size:
+                return None
+            sequence, length = HEADER.unpack_from(data)
+            if (
+                sequence % 2 == 0
+                and HEADER.unpack(header)[0] == sequence
+                and len(data) >= HEADER.size + length
+            ):
+                return data[HEADER.size:HEADER.size + length]
+    return None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+_last_flush = monotonic()
+
+
+def write_shared():
+    """Копирует значения процесса в его файл в METRICS_DIR."""
+    global _shared
+    payload = json.dumps(registry.snapshot()).encode()
+    with _shared_lock:
+        pid = os.getpid()
+        if _shared is None or _shared[0] != pid:
+            path = Path(settings.METRICS_DIR) / FILE_PATTERN.format(pid)
+            _shared = (pid, SharedFile(path))
+        _shared[1].write(payload)
+
+
+def flush_if_due():
+    global _last_flush
+    now = monotonic()
+    if now - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        _last_flush = now
+        write_shared()
+
+
+def close_shared():
+    """Закрывает файл процесса; возвращает его путь или None."""
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared[0] != os.getpid():
+            _shared = None
+            return None
+        shared, _shared = _shared[1], None
+    shared.close()
+    return shared.path
+
+
+@receiver(setting_changed)
+def reset_shared(setting, **kwargs):
+    if setting == 'METRICS_DIR':
+        close_shared()
+
+
+@contextmanager
+def directory_lock(directory):
+    """Блокировка каталога метрик, общая для всех процессов."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def file_owner(path):
+    """PID процесса, которому принадлежит файл, или None."""
+    try:
+        return int(path.stem.rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def read_exited(directory):
+    """Значения завершённых процессов из общего файла."""
+    try:
+        return json.loads(
+            (directory / EXITED_FILE).read_text(encoding='utf-8')
+        )
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning('Пропущен повреждённый файл метрик %s', EXITED_FILE)
+        return {}
+
+
+def add_exited(directory, snapshot):
+    """
+    Прибавляет снимок завершённого процесса к общему файлу, кроме
+    текущих значений. Вызывается под directory_lock.
+    """
+    snapshot = {
+        name: samples for name, samples in snapshot.items()
+        if name in registry.metrics
+        and registry.metrics[name].kind != 'gauge'
+    }
+    merged = merge([read_exited(directory), snapshot])
+    payload = {
+        name: [[list(labels), value] for labels, value in totals.items()]
+        for name, totals in merged.items() if totals
+    }
+    path = directory / EXITED_FILE
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(payload), encoding='utf-8')
+    os.replace(temporary, path)
+
+
+def retire_file(directory, path):
+    """
+    Переносит значения из файла завершённого процесса в общий файл и
+    удаляет его. Вызывается под directory_lock.
+    """
+    try:
+        data = read_shared(path)
+        if data:
+            add_exited(directory, json.loads(data))
+        else:
+            logger.warning('Отброшен недописанный файл метрик %s', path)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError):
+        logger.warning('Отброшен повреждённый файл метрик %s', path)
+    path.unlink(missing_ok=True)
+
+
+def retire_process(pid, directory=None):
+    """Переносит значения завершённого процесса pid в общий файл."""
+    directory = Path(directory or settings.METRICS_DIR)
+    with directory_lock(directory):
+        retire_file(directory, directory / FILE_PATTERN.format(pid))
+
+
+def process_files(directory):
+    """Файлы других процессов: (живых, завершившихся)."""
+    own_file = FILE_PATTERN.format(os.getpid())
+    alive, exited = [], []
+    for path in directory.glob(FILE_PATTERN.format('*')):
+        pid = file_owner(path)
+        if path.name == own_file or pid is None:
+            continue
+        (alive if process_alive(pid) else exited).append(path)
+    return alive, exited
+
+
+def exited_version(directory):
+    """Признак версии общего файла: os.replace() создаёт новый файл."""
+    try:
+        stat = (directory / EXITED_FILE).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def read_snapshots(directory, paths):
+    """Общий файл и файлы живых процессов."""
+    snapshots = [read_exited(directory)]
+    for path in paths:
+        try:
+            data = read_shared(path)
+            if data:
+                snapshots.append(json.loads(data))
+        except FileNotFoundError:
+            # Процесс завершился, его значения уже в общем файле.
+            continue
+        except (OSError, ValueError):
+            logger.warning('Пропущен повреждённый файл метрик %s', path)
+    return snapshots
+
+
+def collect(directory=None, attempts=3):
+    """
+    Значения всех процессов; текущий процесс берётся из памяти.
+
+    Файлы завершившихся процессов сначала переносятся в общий файл под
+    блокировкой. Остальное читается без неё: если за время чтения общий
+    файл сменился (процесс завершился и перенёс в него свои значения),
+    чтение повторяется, чтобы не учесть процесс дважды или ни разу.
+    """
+    directory = Path(directory or settings.METRICS_DIR)
+    alive, exited = process_files(directory)
+    if exited:
+        with directory_lock(directory):
+            for path in exited:
+                retire_file(directory, path)
+    for _ in range(attempts):
+        version = exited_version(directory)
+        snapshots = read_snapshots(directory, alive)
+        if exited_version(directory) == version:
+            break
+    else:
+        with directory_lock(directory):
+            snapshots = read_snapshots(directory, process_files(directory)[0])
+    return merge([registry.snapshot()] + snapshots)
+
+
+def scrape_allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not scrape_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
+
+
+def cache_key_kind(key):
+    if key.startswith(SESSION_KEY_PREFIX):
+        return 'session'
+    return KEY_SEGMENT.sub('', key)
+
+
+class MeteredCacheMixin:
+    """
+    Считает попадания и промахи get() и get_many() по видам ключей.
+
+    Подмешивается перед классом бэкенда кеша, например
+    MeteredLocMemCache.
+    """
+    _missing = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        hit = value is not self._missing
+        CACHE_REQUESTS.inc(cache_key_kind(key), 'hit' if hit else 'miss')
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        found = super().get_many(keys, version)
+        for key in keys:
+            CACHE_REQUESTS.inc(
+                cache_key_kind(key), 'hit' if key in found else 'miss'
+            )
+        return found
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
+
+
+class MetricsMiddleware:
+    """
+    Время ответа, коды и SQL-запросы по представлениям.
+
+    Для потоковых ответов время считается до отдачи заголовков.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        queries = [0, 0.0]
+
+        def count(execute, sql, params, many, context):
+            started = perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += perf_counter() - started
+
+        started = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = self.get_response(request)
+        duration = perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else '-'
+        method = request.method if request.method in METHODS else 'other'
+        REQUESTS.inc(view, method, str(response.status_code))
+        REQUEST_DURATION.observe(duration, view)
+        if queries[0]:
+            QUERIES.inc(view, amount=queries[0])
+            QUERY_DURATION.inc(view, amount=queries[1])
+        flush_if_due()
+        return response
+
+
+@atexit.register
+def retire_on_exit():
+    """Переносит значения процесса в общий файл и удаляет его файл."""
+    if not settings.configured or not settings.METRICS_ENABLED:
+        return
+    directory = Path(settings.METRICS_DIR)
+    snapshot = registry.snapshot()
+    try:
+        with directory_lock(directory):
+            if any(snapshot.values()):
+                add_exited(directory, snapshot)
+            path = close_shared()
+            if path is not None:
+                path.unlink(missing_ok=True)
+    except OSError:
+        pass
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.15 on 2026-10-19 01:00
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 500
+PREVIEW_WORDS = 15
+
+
+def make_preview(text):
+    # Копия news.models.make_preview на момент миграции: её дальнейшие
+    # изменения не должны менять результат миграции.
+    return Truncator(text).words(PREVIEW_WORDS, truncate=' …')
+
+
+def fill_previews(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    queryset = News.objects.using(schema_editor.connection.alias)
+    batch = []
+    for news in queryset.only('pk', 'text').iterator():
+        news.preview = make_preview(news.text)
+        batch.append(news)
+        if len(batch) == BATCH_SIZE:
+            queryset.bulk_update(batch, ['preview'])
+            batch = []
+    queryset.bulk_update(batch, ['preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='preview',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
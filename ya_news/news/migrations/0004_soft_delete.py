@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-19 01:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('news', '0003_news_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDeletion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='deletion', serialize=False, to='auth.user')),
+                ('requested', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Удаляемый пользователь',
+                'verbose_name_plural': 'Удаляемые пользователи',
+            },
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Удалена'),
+        ),
+    ]
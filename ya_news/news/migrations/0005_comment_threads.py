@@ -0,0 +1,47 @@
+# Generated by Django 3.2.15 on 2026-10-19 01:55
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+import django.db.models.deletion
+
+# Значение news.models.PATH_STEP на момент миграции.
+PATH_STEP = 10
+
+
+def fill_paths(apps, schema_editor):
+    # Все существующие комментарии — комментарии к новости, не ответы.
+    Comment = apps.get_model('news', 'Comment')
+    Comment.objects.using(schema_editor.connection.alias).update(
+        path=LPad(Cast('pk', CharField()), PATH_STEP, Value('0'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='replies', to='news.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=250),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['news', 'path'], name='news_commen_news_id_2560f4_idx'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -2,12 +2,68 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, F
+from django.db.models.functions import Substr
+from django.utils.text import Truncator
+
+PREVIEW_WORDS = 15
+
+# Путь комментария — ключи всех его предков и его собственный, каждый
+# дополнен нулями до PATH_STEP цифр. Сортировка по пути даёт обход ветки в
+# глубину, а поддерево комментария — диапазон путей, начинающихся с его
+# пути. Цифры меньше PATH_END, поэтому диапазон кончается на path + PATH_END.
+# Путь строится из ключа, известного только после вставки, и его записывает
+# триггер базы (см. news.threads), в том числе для bulk_create.
+PATH_STEP = 10
+PATH_LENGTH = 250
+PATH_END = ':'
+
+
+def raw_delete(queryset):
+    """
+    Удаляет строки queryset одним запросом DELETE; возвращает их число.
+
+    В отличие от QuerySet.delete() не выбирает строки в Python, не
+    отправляет сигналы и не удаляет зависимые объекты: связанные строки
+    и кеши вызывающий код обрабатывает сам. Опирается на закрытый
+    QuerySet._raw_delete, поэтому все такие удаления проходят здесь.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def make_preview(text):
+    """Начало текста новости, как его выводил фильтр truncatewords."""
+    return Truncator(text).words(PREVIEW_WORDS, truncate=' …')
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create не вызывает save(), поэтому превью считается здесь.
+        objs = list(objs)
+        for news in objs:
+            news.preview = make_preview(news.text)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def alive(self):
+        """Новости, не удалённые через soft delete (см. news.purge)."""
+        return self.filter(deleted_at__isnull=True)
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
-    date = models.DateField(default=datetime.today)
+    preview = models.TextField(blank=True, editable=False)
+    date = models.DateField(default=datetime.today, db_index=True)
+    deleted_at = models.DateTimeField(
+        'Удалена', null=True, blank=True, editable=False, db_index=True
+    )
+    # Пишется пачками из памяти процессов, см. news.page_views.
+    views = models.PositiveIntegerField(
+        'Просмотров', default=0, editable=False
+    )
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
@@ -17,6 +73,55 @@ class News(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, update_fields=None, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.preview = make_preview(self.text)
+            if update_fields is not None and 'text' in update_fields:
+                update_fields = {*update_fields, 'preview'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+def path_segment(pk):
+    return str(pk).zfill(PATH_STEP)
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def subtree(self, root):
+        """Комментарий root и все ответы на него любой глубины."""
+        return self.filter(
+            news_id=root.news_id,
+            path__gte=root.path,
+            path__lt=root.path + PATH_END,
+        )
+
+    def thread(self, depth=None, root_depth=0):
+        """
+        Комментарии в порядке обхода ветки, не глубже depth уровней.
+
+        level — уровень комментария относительно root_depth, уровня
+        первого комментария ветки. Выборка идёт по индексу (news, path).
+        """
+        comments = self.order_by('path').annotate(
+            level=F('depth') - root_depth
+        )
+        if depth is not None:
+            comments = comments.filter(depth__lt=root_depth + depth)
+        return comments
+
+    def collapsed(self, depth, root_depth=0):
+        """
+        Число скрытых ответов под комментариями последнего уровня thread().
+
+        Словарь {путь комментария: число ответов на любой глубине под ним}.
+        """
+        cut = (root_depth + depth) * PATH_STEP
+        return dict(
+            self.filter(depth__gte=root_depth + depth).order_by().values(
+                prefix=Substr('path', 1, cut)
+            ).annotate(count=Count('pk')).values_list('prefix', 'count')
+        )
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -28,10 +133,75 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Ответы остаются, если их комментарий удалили: они стоят в ветке на
+    # прежнем месте, поэтому внешний ключ на родителя не проверяется.
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='replies',
+    )
+    path = models.CharField(
+        max_length=PATH_LENGTH, blank=True, editable=False
+    )
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(fields=('news', 'created')),
+            models.Index(fields=('news', 'path')),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def reply_to(self, parent):
+        """
+        Делает комментарий ответом на parent.
+
+        Ветка не глубже COMMENT_MAX_DEPTH уровней: ответ на комментарий
+        последнего уровня становится его соседом.
+        """
+        self.news_id = parent.news_id
+        if parent.depth >= settings.COMMENT_MAX_DEPTH - 1:
+            parent = type(self).objects.filter(pk=parent.parent_id).first()
+        self.parent = parent
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            return super().save(*args, **kwargs)
+        # Те же путь и уровень, что запишет триггер, без лишнего запроса.
+        prefix = self.parent.path if self.parent_id else ''
+        self.depth = len(prefix) // PATH_STEP
+        super().save(*args, **kwargs)
+        self.path = prefix + path_segment(self.pk)
+
+
+class UserDeletion(models.Model):
+    """
+    Пользователь, удалённый через soft delete.
+
+    Сам пользователь заблокирован и удаляется вместе с комментариями
+    командой purge_deleted (см. news.purge).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='deletion',
+    )
+    requested = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Удаляемые пользователи'
+        verbose_name = 'Удаляемый пользователь'
+
+    def __str__(self):
+        return str(self.user_id)
@@ -0,0 +1,133 @@
+"""
+Счётчик просмотров новостей.
+
+Просмотр страницы новости не пишет в базу: процесс копит приращения в
+памяти, а фоновый поток раз в PAGE_VIEW_FLUSH_INTERVAL секунд записывает
+их одним UPDATE ... SET views = views + CASE id WHEN ... END на пачку до
+PAGE_VIEW_FLUSH_BATCH_SIZE новостей. Приращения складываются с тем, что
+записали другие процессы, поэтому общий кеш не нужен. При падении
+процесса теряются только просмотры, накопленные с последней записи, то
+есть не больше чем за PAGE_VIEW_FLUSH_INTERVAL секунд; при обычном
+завершении остаток записывается atexit.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+from itertools import islice
+from time import sleep
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.dispatch import receiver
+
+from .models import News
+from .trending import views_added
+
+logger = logging.getLogger(__name__)
+
+
+def write_views(counts, batch_size):
+    """
+    Прибавляет просмотры {pk: число} к счётчикам новостей.
+
+    Все пачки пишутся в одной транзакции: при ошибке не записывается
+    ни одна, и повторная запись не учтёт просмотры дважды.
+    """
+    items = iter(counts.items())
+    with transaction.atomic():
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                return
+            News.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                views=F('views') + Case(
+                    *(When(pk=pk, then=Value(count)) for pk, count in batch),
+                    default=Value(0),
+                    output_field=PositiveIntegerField(),
+                )
+            )
+
+
+class ViewCounter:
+    """Просмотры новостей, ещё не записанные в базу этим процессом."""
+
+    def __init__(self, flush_interval, batch_size):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.flushes = 0
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def hit(self, news_id):
+        """Учитывает просмотр; возвращает незаписанные просмотры новости."""
+        with self._lock:
+            self._pending[news_id] += 1
+            return self._pending[news_id]
+
+    def pending(self, news_id):
+        with self._lock:
+            return self._pending[news_id]
+
+    def flush(self):
+        """Записывает накопленное; возвращает число новостей."""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending = self._pending, Counter()
+            if not counts:
+                return 0
+            try:
+                write_views(counts, self.batch_size)
+            except DatabaseError:
+                # Просмотры вернутся в очередь и запишутся в следующий раз.
+                with self._lock:
+                    self._pending.update(counts)
+                raise
+            views_added(counts)
+            self.flushes += 1
+            return len(counts)
+
+    def start(self):
+        """Запускает фоновую запись, если задан интервал."""
+        if self.flush_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name='page-view-writer', daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Ошибка записи просмотров новостей')
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_view_counter():
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = ViewCounter(
+                settings.PAGE_VIEW_FLUSH_INTERVAL,
+                settings.PAGE_VIEW_FLUSH_BATCH_SIZE,
+            )
+            _counter.start()
+        return _counter
+
+
+@receiver(setting_changed)
+def reset_view_counter(setting, **kwargs):
+    global _counter
+    if setting.startswith('PAGE_VIEW_'):
+        _counter = None
@@ -0,0 +1,134 @@
+"""
+Удаление новостей и пользователей в два шага.
+
+Каскадное удаление собирает все комментарии в Python и удаляет их в одной
+транзакции, которая у популярной новости или активного пользователя
+держит блокировку записи SQLite секундами. Поэтому удаление только
+помечает объект: новость получает deleted_at, пользователь блокируется и
+попадает в UserDeletion. С сайта объект пропадает сразу, а команда
+purge_deleted удаляет комментарии пачками по PURGE_BATCH_SIZE, каждую в
+своей транзакции, и между пачками новые комментарии сохраняются как
+обычно.
+"""
+from time import sleep
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .auth import invalidate_user
+from .front_page import FRONT_PAGE_KEY, news_removed
+from .models import Comment, News, UserDeletion, raw_delete
+
+
+def soft_delete_news(queryset):
+    """Скрывает новости с сайта до удаления командой purge_deleted."""
+    pks = list(queryset.alive().values_list('pk', flat=True))
+    with transaction.atomic():
+        News.objects.filter(pk__in=pks).update(deleted_at=timezone.now())
+        news_removed(pks)
+    return len(pks)
+
+
+def soft_delete_users(queryset):
+    """Блокирует пользователей и скрывает их комментарии."""
+    pks = list(
+        queryset.filter(deletion__isnull=True).values_list('pk', flat=True)
+    )
+    with transaction.atomic():
+        get_user_model().objects.filter(pk__in=pks).update(is_active=False)
+        UserDeletion.objects.bulk_create(
+            UserDeletion(user_id=pk) for pk in pks
+        )
+        transaction.on_commit(lambda: users_hidden(pks))
+    return len(pks)
+
+
+def users_hidden(pks):
+    # update() не отправляет сигналы: сессии пользователей сбрасываются
+    # сменой версии, а снимок главной с числами комментариев строится
+    # заново.
+    for pk in pks:
+        invalidate_user(pk)
+    cache.delete(FRONT_PAGE_KEY)
+
+
+def delete_in_batches(queryset, batch_size, progress=None, pause=0):
+    """
+    Удаляет строки queryset пачками; возвращает их количество.
+
+    Каждая пачка удаляется одним запросом DELETE ... WHERE pk IN (SELECT
+    ... LIMIT), без сигналов и без сбора связанных объектов. Отдельные
+    SELECT и DELETE в одной транзакции не подходят: SQLite не ждёт, а
+    сразу отвечает «database is locked», когда читающей транзакции нужно
+    стать пишущей, пока пишет другое соединение. progress(deleted)
+    вызывается после каждой пачки, pause секунд ожидания дают место
+    другим записям.
+    """
+    batch = queryset.order_by().values('pk')[:batch_size]
+    deleted = 0
+    while True:
+        count = raw_delete(
+            queryset.model.objects.using(queryset.db).filter(pk__in=batch)
+        )
+        if not count:
+            return deleted
+        deleted += count
+        if progress is not None:
+            progress(deleted)
+        if pause:
+            sleep(pause)
+
+
+def purge_news(news, batch_size=None, progress=None, pause=0):
+    """Удаляет новость, помеченную soft delete, и её комментарии."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    deleted = delete_in_batches(
+        Comment.objects.filter(news=news), batch_size, progress, pause
+    )
+    # Комментарии, добавленные после последней пачки, удалит каскад.
+    news.delete()
+    return deleted
+
+
+def purge_user(user, batch_size=None, progress=None, pause=0):
+    """
+    Удаляет пользователя, помеченного soft delete, и его комментарии.
+
+    Комментарии удаляются и из основной базы, и из архива (см.
+    news.archive); progress получает общее число удалённых.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    hot = delete_in_batches(
+        Comment.objects.filter(author=user), batch_size, progress, pause
+    )
+
+    def archive_progress(deleted):
+        progress(hot + deleted)
+
+    deleted = hot + delete_in_batches(
+        archived_comments(user), batch_size,
+        archive_progress if progress is not None else None, pause,
+    )
+    user.delete()
+    return deleted
+
+
+def archived_comments(user):
+    return Comment.objects.using(
+        settings.ARCHIVE_DATABASE
+    ).filter(author_id=user.pk)
+
+
+def pending_purge():
+    """Новости и пользователи, ожидающие удаления, с числом комментариев."""
+    for news in News.objects.filter(deleted_at__isnull=False).order_by('pk'):
+        yield purge_news, news, news.comment_set.count()
+    users = get_user_model().objects.filter(
+        deletion__isnull=False
+    ).order_by('pk')
+    for user in users:
+        total = user.comment_set.count() + archived_comments(user).count()
+        yield purge_user, user, total
@@ -1,5 +1,6 @@
 import pytest
 
+from django.core.cache import cache
 from django.test.client import Client
 from django.utils import timezone
 from django.conf import settings
@@ -7,11 +8,50 @@ from django.conf import settings
 from datetime import timedelta
 
 from news.models import Comment, News
+from news import memprofile
+from news.metrics import registry
+from news.querylog import stats
 
 
 COUNT_OF_COMMENTS = 10
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеш общий для процесса, а база откатывается после каждого теста."""
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def query_log(settings, tmp_path):
+    """Отчёты учёта запросов пишутся во временный каталог теста."""
+    settings.QUERY_LOG_DIR = tmp_path / 'querylog'
+    yield
+    stats.clear()
+
+
+@pytest.fixture(autouse=True)
+def metrics(settings, tmp_path):
+    """Файлы метрик пишутся во временный каталог теста."""
+    settings.METRICS_DIR = tmp_path / 'metrics'
+    yield
+    registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def memory_profile(settings, tmp_path):
+    """Замеры памяти пишутся во временный каталог теста."""
+    settings.MEMORY_PROFILE_DIR = tmp_path / 'memprofile'
+    yield
+    memprofile.clear()
+
+
+@pytest.fixture(autouse=True)
+def page_views(settings):
+    """Просмотры записываются только явным flush(), без фонового потока."""
+    settings.PAGE_VIEW_FLUSH_INTERVAL = 0
+
+
 @pytest.fixture
 def news():
     return News.objects.create(title='Заголовок', text='Текст')
@@ -0,0 +1,78 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news.models import Comment, News
+
+
+MAX_CHANGE_PAGE_QUERIES = 15
+
+pytestmark = pytest.mark.django_db
+
+
+def create_news_with_comments(django_user_model, comments_count):
+    """Новость с комментариями от разных пользователей."""
+    news = News.objects.create(title='Заголовок', text='Текст')
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'user-{comments_count}-{index}')
+        for index in range(comments_count)
+    )
+    users = django_user_model.objects.filter(
+        username__startswith=f'user-{comments_count}-'
+    )
+    Comment.objects.bulk_create(
+        Comment(news=news, author=user, text=f'Комментарий {user.username}')
+        for user in users
+    )
+    return news
+
+
+def change_page_queries(admin_client, news):
+    """Количество запросов на странице редактирования новости."""
+    url = reverse('admin:news_news_change', args=(news.pk,))
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_change_page_queries_do_not_grow_with_comments(
+        admin_client, django_user_model
+):
+    """
+    Тест: Число запросов на странице новости в админке не зависит
+    от количества комментариев и пользователей.
+    """
+    small = create_news_with_comments(django_user_model, 3)
+    large = create_news_with_comments(django_user_model, 300)
+    change_page_queries(admin_client, small)
+
+    small_queries = change_page_queries(admin_client, small)
+    large_queries = change_page_queries(admin_client, large)
+
+    assert large_queries == small_queries
+    assert large_queries <= MAX_CHANGE_PAGE_QUERIES
+
+
+def test_change_page_shows_one_page_of_comments(
+        admin_client, django_user_model
+):
+    """Тест: Инлайн комментариев выводит одну страницу за раз."""
+    news = create_news_with_comments(django_user_model, 45)
+    url = reverse('admin:news_news_change', args=(news.pk,))
+
+    response = admin_client.get(url, {'comments_page': 3})
+
+    formset = response.context['inline_admin_formsets'][0].formset
+    assert formset.page.number == 3
+    assert len(formset.forms) == 5
+
+
+def test_changelist_counts_comments(admin_client, comment):
+    """Тест: В списке новостей выводится число комментариев."""
+    response = admin_client.get(reverse('admin:news_news_changelist'))
+
+    news = response.context['cl'].result_list[0]
+    assert news.comment_count == 1
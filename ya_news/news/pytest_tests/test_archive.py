@@ -0,0 +1,147 @@
+import pytest
+
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from news.archive import (
+    archive_news, database_stats, enable_incremental_vacuum,
+    incremental_vacuum, write_archive
+)
+from news.front_page import get_front_page
+from news.purge import purge_user, soft_delete_users
+from news.models import Comment, News
+
+
+ARCHIVE = settings.ARCHIVE_DATABASE
+
+# Внешние ключи архива ссылаются на отсутствующую в нём таблицу
+# пользователей, поэтому проверку ключей по завершении теста, которую
+# делает TestCase, архив не проходит.
+pytestmark = pytest.mark.django_db(
+    databases=['default', ARCHIVE], transaction=True
+)
+
+
+@pytest.fixture
+def old_news(author_of_comment):
+    date = timezone.localdate() - timedelta(
+        days=settings.ARCHIVE_AFTER_DAYS + 1
+    )
+    all_old = []
+    for index in range(3):
+        news = News.objects.create(
+            title=f'Старая {index}', text='Текст', date=date - timedelta(index)
+        )
+        for number in range(4):
+            Comment.objects.create(
+                news=news, author=author_of_comment, text=f'Текст {number}'
+            )
+        all_old.append(news)
+    return all_old
+
+
+def test_old_news_moved_with_comments(old_news, news):
+    """
+    Тест: Старые новости с комментариями переезжают в архив с теми же
+    ключами, свежие остаются в основной базе.
+    """
+    hot_comments = list(Comment.objects.values_list('pk', 'news', 'text'))
+    get_front_page()
+
+    moved = archive_news(batch_size=2)
+
+    assert moved == (3, 12)
+    assert list(News.objects.all()) == [news]
+    assert not Comment.objects.exists()
+    assert sorted(
+        News.objects.using(ARCHIVE).values_list('pk', flat=True)
+    ) == sorted(item.pk for item in old_news)
+    assert sorted(
+        Comment.objects.using(ARCHIVE).values_list('pk', 'news', 'text')
+    ) == sorted(hot_comments)
+    assert [entry['pk'] for entry in get_front_page()] == [news.pk]
+
+
+def test_repeated_copy_does_not_duplicate(old_news, author_of_comment):
+    """
+    Тест: Пачка, уже записанная в архив до сбоя, переносится повторно
+    без дублей вместе с комментариями, добавленными после.
+    """
+    news = old_news[0]
+    write_archive([news], list(news.comment_set.all()))
+    Comment.objects.create(news=news, author=author_of_comment, text='Позже')
+
+    archive_news()
+
+    assert Comment.objects.using(ARCHIVE).filter(news=news.pk).count() == 5
+    assert Comment.objects.using(ARCHIVE).count() == 13
+
+
+def test_detail_reads_through_to_archive(
+        old_news, author_client, author_of_comment
+):
+    """Тест: Архивная новость открывается с комментариями, но без формы."""
+    archive_news()
+    url = reverse('news:detail', args=(old_news[0].pk,))
+
+    response = author_client.get(url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['archived']
+    assert 'form' not in response.context
+    comments = response.context['comments']
+    assert len(comments) == 4
+    assert {comment.author for comment in comments} == {author_of_comment}
+    assert author_client.post(url, {'text': 'Текст'}).status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+def test_deleted_user_hidden_and_purged_from_archive(
+        old_news, client, author_of_comment
+):
+    """Тест: Архивные комментарии удалённого автора скрыты и удаляются."""
+    archive_news()
+    url = reverse('news:detail', args=(old_news[0].pk,))
+    soft_delete_users(
+        type(author_of_comment).objects.filter(pk=author_of_comment.pk)
+    )
+
+    assert list(client.get(url).context['comments']) == []
+
+    assert purge_user(author_of_comment, batch_size=5) == 12
+    assert not Comment.objects.using(ARCHIVE).exists()
+
+
+def test_missing_news_not_found(client):
+    """Тест: Новости нет ни в основной базе, ни в архиве."""
+    response = client.get(reverse('news:detail', args=(1,)))
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_incremental_vacuum_shrinks_database(author_of_comment):
+    """Тест: После переноса incremental_vacuum освобождает страницы."""
+    enable_incremental_vacuum()
+    date = timezone.localdate() - timedelta(
+        days=settings.ARCHIVE_AFTER_DAYS + 1
+    )
+    news = News.objects.create(title='Старая', text='Текст', date=date)
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author_of_comment, text='Слово ' * 200)
+        for _ in range(500)
+    )
+    archive_news()
+    before = database_stats()
+
+    incremental_vacuum()
+
+    after = database_stats()
+    assert before['auto_vacuum'] == 2
+    assert before['freelist_count'] > 0
+    assert after['freelist_count'] == 0
+    assert after['page_count'] < before['page_count']
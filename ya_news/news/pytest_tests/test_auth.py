@@ -0,0 +1,60 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+HOME_URL = reverse('news:home')
+
+pytestmark = pytest.mark.django_db
+
+
+def auth_queries(client, url):
+    """Запросы к таблице пользователей при загрузке страницы."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    return response, [
+        query for query in queries.captured_queries
+        if 'auth_user' in query['sql']
+    ]
+
+
+def test_home_without_auth_queries_in_steady_state(
+        author_client, all_news
+):
+    """
+    Тест: Повторный заход авторизованного пользователя на главную
+    не обращается к таблице пользователей.
+    """
+    author_client.get(HOME_URL)
+
+    response, queries = auth_queries(author_client, HOME_URL)
+
+    assert response.context['user'].is_authenticated
+    assert queries == []
+
+
+def test_user_update_invalidates_cache(author_client, author_of_comment):
+    """Тест: Изменение пользователя сбрасывает закешированную копию."""
+    author_client.get(HOME_URL)
+    author_of_comment.username = 'Новое имя'
+    author_of_comment.save()
+
+    response, queries = auth_queries(author_client, HOME_URL)
+
+    assert queries
+    assert response.context['user'].username == 'Новое имя'
+
+
+def test_password_change_logs_out_other_sessions(
+        author_client, author_of_comment
+):
+    """Тест: После смены пароля закешированная сессия недействительна."""
+    author_client.get(HOME_URL)
+    author_of_comment.set_password('new-password')
+    author_of_comment.save()
+
+    response = author_client.get(HOME_URL)
+
+    assert not response.context['user'].is_authenticated
@@ -18,11 +18,12 @@ def test_news_count(client, all_news):
     """
     response = client.get(HOME_URL)
 
-    object_list = response.context.get('object_list')
-    assert object_list is not None
+    front_page = response.context.get('front_page')
+    assert front_page is not None
 
-    news_count = object_list.count()
+    news_count = len(front_page)
     assert settings.NEWS_COUNT_ON_HOME_PAGE == news_count
+    assert response.content.decode().count('<h3>') == news_count
 
 
 def test_news_order(client, all_news):
@@ -32,10 +33,10 @@ def test_news_order(client, all_news):
     """
     response = client.get(HOME_URL)
 
-    object_list = response.context.get('object_list')
-    assert object_list is not None
+    front_page = response.context.get('front_page')
+    assert front_page is not None
 
-    all_dates = [news.date for news in object_list]
+    all_dates = [news['date'] for news in front_page]
     sorted_dates = sorted(all_dates, reverse=True)
 
     assert all_dates == sorted_dates
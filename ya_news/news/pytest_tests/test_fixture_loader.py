@@ -0,0 +1,111 @@
+import io
+import json
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from news.fixture_loader import iter_json_array, load_fixtures
+from news.front_page import get_front_page
+from news.models import Comment, News
+from news.trending import get_trending
+
+FIXTURE = 'news/fixtures/news.json'
+
+pytestmark = pytest.mark.django_db
+
+
+def test_incremental_parser_matches_json_load():
+    """Тест: Разбор по частям даёт те же объекты, что и json.load."""
+    tricky = json.dumps([
+        {'text': 'скобка ] и запятая , в строке', 'pk': 12345},
+        [1, 2.5, None, True],
+        67890,
+    ], ensure_ascii=False, indent=2)
+    with open(FIXTURE, encoding='utf-8') as fixture:
+        expected = json.load(fixture)
+
+    with open(FIXTURE, encoding='utf-8') as fixture:
+        assert list(iter_json_array(fixture, read_size=7)) == expected
+    assert list(iter_json_array(io.StringIO(tricky), read_size=3)) == (
+        json.loads(tricky)
+    )
+
+
+def test_stream_loaddata_matches_loaddata(django_user_model):
+    """
+    Тест: Потоковая загрузка даёт те же новости, что и loaddata,
+    и заполняет превью, которое loaddata оставляет пустым.
+    """
+    call_command('loaddata', FIXTURE, verbosity=0)
+    expected = list(News.objects.values_list('title', 'date', 'text'))
+    News.objects.all().delete()
+
+    call_command('stream_loaddata', FIXTURE, stdout=io.StringIO())
+
+    assert list(News.objects.values_list('title', 'date', 'text')) == (
+        expected
+    )
+    assert not News.objects.filter(preview='').exists()
+
+
+def test_load_in_batches_and_rebuild_front_page(
+        tmp_path, django_user_model, django_capture_on_commit_callbacks
+):
+    """
+    Тест: Объекты пишутся пачками, ссылки вперёд разрешаются,
+    а снимок главной пересобирается после загрузки.
+    """
+    get_front_page()
+    records = [
+        {'model': 'news.comment', 'pk': index, 'fields': {
+            'news': 1, 'author': 1, 'text': f'Комментарий {index}',
+            'created': '2022-11-01T10:00:00Z',
+        }}
+        for index in range(1, 251)
+    ] + [
+        {'model': 'news.news', 'pk': 1, 'fields': {
+            'title': 'Загруженная', 'text': 'Текст', 'date': '2099-01-01',
+        }},
+        {'model': 'auth.user', 'pk': 1, 'fields': {
+            'username': 'Загруженный', 'password': '!',
+        }},
+    ]
+    path = tmp_path / 'large.json'
+    path.write_text(json.dumps(records), encoding='utf-8')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with CaptureQueriesContext(connection) as queries:
+            load_fixtures([path], batch_size=100)
+
+    inserts = [
+        query for query in queries
+        if query['sql'].startswith('INSERT INTO "news_comment"')
+    ]
+    assert len(inserts) == 3
+    assert Comment.objects.filter(news_id=1).count() == 250
+    assert get_front_page()[0]['comments'] == 250
+
+
+def test_load_resets_trending(
+        tmp_path, news, django_capture_on_commit_callbacks
+):
+    """Тест: Загруженные комментарии учитываются в популярных новостях."""
+    assert get_trending() == []
+    path = tmp_path / 'comments.json'
+    path.write_text(json.dumps([
+        {'model': 'auth.user', 'pk': 1, 'fields': {
+            'username': 'Загруженный', 'password': '!',
+        }},
+        {'model': 'news.comment', 'pk': 1, 'fields': {
+            'news': news.pk, 'author': 1, 'text': 'Комментарий',
+            'created': timezone.now().isoformat(),
+        }},
+    ]), encoding='utf-8')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        load_fixtures([path])
+
+    assert [item for item, _ in get_trending()] == [news]
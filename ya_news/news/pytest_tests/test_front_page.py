@@ -0,0 +1,120 @@
+import pytest
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from news import front_page
+from news.front_page import FRONT_PAGE_KEY, fetch_entries, get_front_page
+from news.models import Comment, News
+
+
+HOME_URL = reverse('news:home')
+
+pytestmark = pytest.mark.django_db
+
+
+def front_page_pks():
+    return [entry['pk'] for entry in get_front_page()]
+
+
+def test_home_page_reads_only_snapshot(client, all_news):
+    """Тест: Повторный заход на главную не обращается к базе."""
+    client.get(HOME_URL)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(HOME_URL)
+
+    assert len(queries) == 0
+    assert len(response.context['front_page']) == (
+        settings.NEWS_COUNT_ON_HOME_PAGE
+    )
+
+
+def test_comment_updates_only_its_entry(
+        all_news, author_of_comment, django_capture_on_commit_callbacks
+):
+    """Тест: Новый комментарий меняет счётчик без пересчёта снимка."""
+    news = News.objects.get(title='Новость 0')
+    get_front_page()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(
+                news=news, author=author_of_comment, text='Текст'
+            )
+
+    assert len(queries) == 1
+    entry = get_front_page()[0]
+    assert (entry['pk'], entry['comments']) == (news.pk, 1)
+
+
+def test_new_news_pushes_out_oldest(
+        all_news, django_capture_on_commit_callbacks
+):
+    """Тест: Свежая новость попадает в снимок, самая старая выпадает."""
+    before = front_page_pks()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        fresh = News.objects.create(
+            title='Свежая', text='Текст', date=timezone.now() + timedelta(1)
+        )
+
+    assert front_page_pks() == [fresh.pk] + before[:-1]
+
+
+def test_deleted_news_replaced_by_next(
+        all_news, django_capture_on_commit_callbacks
+):
+    """Тест: Удалённая новость заменяется следующей по дате."""
+    get_front_page()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        News.objects.get(title='Новость 0').delete()
+
+    assert get_front_page() == fetch_entries()
+    assert 'Новость 10' in [entry['title'] for entry in get_front_page()]
+
+
+def test_edited_news_moves_down(
+        all_news, django_capture_on_commit_callbacks
+):
+    """Тест: Новость, дата которой стала старше, уходит из снимка."""
+    get_front_page()
+    news = News.objects.get(title='Новость 0')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        news.date = timezone.now() - timedelta(days=100)
+        news.save()
+
+    assert news.pk not in front_page_pks()
+    assert get_front_page() == fetch_entries()
+
+
+def test_changes_keep_snapshot_expiry(
+        all_news, author_of_comment, django_capture_on_commit_callbacks,
+        monkeypatch
+):
+    """Тест: Точечное изменение не продлевает срок снимка в кеше."""
+    get_front_page()
+    built_at = cache.get(FRONT_PAGE_KEY)['built_at']
+    # К моменту изменения снимку осталось жить 5 секунд.
+    monkeypatch.setattr(
+        front_page, 'time',
+        lambda: built_at + settings.FRONT_PAGE_TIMEOUT - 5,
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(
+            news=News.objects.get(title='Новость 0'),
+            author=author_of_comment, text='Текст',
+        )
+
+    expires = cache._expire_info[cache.make_key(FRONT_PAGE_KEY)]
+    assert expires <= built_at + 10
+    assert get_front_page()[0]['comments'] == 1
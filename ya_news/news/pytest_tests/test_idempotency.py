@@ -0,0 +1,141 @@
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+
+from news.idempotency import (
+    PENDING, CacheStore, LocalMemoryStore, run_once
+)
+from news.models import Comment
+
+
+pytestmark = pytest.mark.django_db
+
+
+def test_double_submit_replayed(
+        author_client, news, django_assert_num_queries
+):
+    """
+    Тест: Повтор формы с тем же ключом получает тот же редирект без
+    запросов к базе, а комментарий сохраняется один раз.
+    """
+    url = reverse('news:detail', args=(news.pk,))
+    key = author_client.get(url).context['idempotency_key']
+    data = {'text': 'Текст', 'idempotency_key': key}
+    first = author_client.post(url, data)
+
+    with django_assert_num_queries(0):
+        second = author_client.post(url, data)
+
+    assert second.status_code == first.status_code == HTTPStatus.FOUND
+    assert second['Location'] == first['Location']
+    assert second['Idempotent-Replayed'] == 'true'
+    assert Comment.objects.count() == 1
+    author_client.post(url, {**data, 'idempotency_key': 'другой-ключ'})
+    assert Comment.objects.count() == 2
+
+
+def test_rejected_form_releases_key(author_client, news):
+    """Тест: После ошибки формы исправленный текст идёт с тем же ключом."""
+    url = reverse('news:detail', args=(news.pk,))
+
+    response = author_client.post(
+        url, {'text': 'Ты негодяй', 'idempotency_key': 'key'}
+    )
+    assert response.status_code == HTTPStatus.OK
+    response = author_client.post(
+        url, {'text': 'Текст', 'idempotency_key': 'key'}
+    )
+
+    assert response.status_code == HTTPStatus.FOUND
+    assert Comment.objects.count() == 1
+
+
+def test_header_key_and_invalid_key(author_client, news):
+    """Тест: Ключ читается из заголовка, ключ с пробелами отклоняется."""
+    url = reverse('news:detail', args=(news.pk,))
+    for _ in range(2):
+        author_client.post(
+            url, {'text': 'Текст'}, HTTP_IDEMPOTENCY_KEY='header-key'
+        )
+
+    response = author_client.post(
+        url, {'text': 'Текст', 'idempotency_key': 'два слова'}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.parametrize('backend', [
+    'news.idempotency.LocalMemoryStore', 'news.idempotency.CacheStore'
+])
+def test_concurrent_duplicates_run_once(settings, backend):
+    """
+    Тест: Одновременные повторы ждут первый запрос и получают его
+    редирект, обработчик выполняется один раз.
+    """
+    settings.IDEMPOTENCY_BACKEND = backend
+    started = threading.Event()
+    finish = threading.Event()
+    calls = []
+    responses = []
+
+    def handler():
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return HttpResponseRedirect('/news/1/#comments')
+
+    def submit():
+        responses.append(run_once('idempotency:test:1:key', handler))
+
+    first = threading.Thread(target=submit)
+    first.start()
+    started.wait(5)
+    duplicates = [threading.Thread(target=submit) for _ in range(3)]
+    for thread in duplicates:
+        thread.start()
+    finish.set()
+    for thread in [first, *duplicates]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert {response['Location'] for response in responses} == {
+        '/news/1/#comments'
+    }
+    assert sum(response.has_header('Idempotent-Replayed')
+               for response in responses) == 3
+
+
+def test_pending_duplicate_gets_conflict(settings):
+    """Тест: Повтор, не дождавшийся первого запроса, получает 409."""
+    settings.IDEMPOTENCY_WAIT = 0
+    CacheStore().claim('idempotency:test:1:key', 60)
+    settings.IDEMPOTENCY_BACKEND = 'news.idempotency.CacheStore'
+
+    response = run_once('idempotency:test:1:key', pytest.fail)
+
+    assert response.status_code == HTTPStatus.CONFLICT
+
+
+def test_local_store_bounded():
+    """Тест: Хранилище в памяти вытесняет истёкшие, затем старые ключи."""
+    store = LocalMemoryStore(max_keys=2)
+    now = [0]
+    store.clock = lambda: now[0]
+    store.claim('old', 10)
+    store.claim('expiring', 1)
+    store.complete('old', (302, '/'), 10)
+    now[0] = 5
+
+    store.claim('new', 10)
+    assert list(store._entries) == ['old', 'new']
+    store.claim('newest', 10)
+
+    assert list(store._entries) == ['new', 'newest']
+    assert store.claim('new', 10) == PENDING
+    assert store.claim('old', 10) is None
@@ -0,0 +1,170 @@
+import json
+import pytest
+
+from datetime import timedelta
+
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from news import ingest
+from news.ingest import get_comment_queue, read_spool, replay_spools
+from news.models import Comment
+
+
+DEAD_PID = 99999999
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def queue_mode(settings, tmp_path):
+    settings.COMMENT_INGEST_MODE = 'queue'
+    settings.COMMENT_INGEST_SPOOL_DIR = tmp_path
+    settings.COMMENT_INGEST_FLUSH_INTERVAL = 0
+    return get_comment_queue()
+
+
+def test_comment_is_queued_and_visible_to_author(
+        queue_mode, author_client, news_id_for_args, form_data
+):
+    """
+    Тест: В режиме очереди комментарий не пишется в запросе,
+    но сразу виден автору как ожидающий публикации.
+    """
+    url = reverse('news:detail', args=news_id_for_args)
+
+    author_client.post(url, data=form_data)
+    response = author_client.get(url)
+
+    assert Comment.objects.count() == 0
+    assert queue_mode.stats()['depth'] == 1
+    assert queue_mode.spool_path.exists()
+    pending = response.context['pending_comments']
+    assert [comment['text'] for comment in pending] == [form_data['text']]
+
+
+def test_pending_comments_hidden_from_other_users(
+        queue_mode, author_client, not_author_client,
+        news_id_for_args, form_data
+):
+    """Тест: Ожидающие комментарии не видны другим пользователям."""
+    url = reverse('news:detail', args=news_id_for_args)
+
+    author_client.post(url, data=form_data)
+    response = not_author_client.get(url)
+
+    assert response.context['pending_comments'] == []
+
+
+def test_flush_writes_batch_and_clears_spool(
+        queue_mode, author_client, news_id_for_args, form_data,
+        author_of_comment
+):
+    """Тест: Запись очереди сохраняет комментарии и очищает журнал."""
+    url = reverse('news:detail', args=news_id_for_args)
+    for _ in range(3):
+        author_client.post(url, data=form_data)
+
+    flushed = queue_mode.flush()
+
+    assert flushed == 3
+    assert Comment.objects.filter(author=author_of_comment).count() == 3
+    assert queue_mode.depth == 0
+    assert not queue_mode.spool_path.exists()
+
+
+def test_replay_skips_already_saved_comments(
+        tmp_path, news, author_of_comment
+):
+    """
+    Тест: Журнал упавшего процесса дописывается в базу без дублей
+    уже сохранённых комментариев.
+    """
+    queued_at = timezone.now() - timedelta(minutes=1)
+    Comment.objects.create(
+        news=news, author=author_of_comment, text='Уже сохранён'
+    )
+    records = [
+        {'news_id': news.id, 'author_id': author_of_comment.id,
+         'text': text, 'created': queued_at.isoformat()}
+        for text in ('Уже сохранён', 'Потерян при падении')
+    ]
+    spool = tmp_path / f'comments-{DEAD_PID}.jsonl'
+    spool.write_text(
+        ''.join(json.dumps(record) + '\n' for record in records)
+        + '{"недописанная строка',
+        encoding='utf-8'
+    )
+
+    replayed = replay_spools(tmp_path)
+
+    assert replayed == 1
+    assert sorted(Comment.objects.values_list('text', flat=True)) == [
+        'Потерян при падении', 'Уже сохранён'
+    ]
+    assert not spool.exists()
+
+
+def test_replay_checks_saved_comments_per_batch(
+        tmp_path, news, author_of_comment
+):
+    """
+    Тест: Уже сохранённые комментарии ищутся одним запросом на пачку,
+    а не отдельным запросом на каждую запись журнала.
+    """
+    queued_at = timezone.now() - timedelta(minutes=1)
+    spool = tmp_path / f'comments-{DEAD_PID}.jsonl'
+    spool.write_text(''.join(
+        json.dumps({
+            'news_id': news.id, 'author_id': author_of_comment.id,
+            'text': f'Комментарий {index}', 'created': queued_at.isoformat(),
+        }) + '\n'
+        for index in range(10)
+    ), encoding='utf-8')
+
+    with CaptureQueriesContext(connection) as queries:
+        replayed = replay_spools(tmp_path, batch_size=5)
+
+    lookups = [
+        query for query in queries.captured_queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "news_comment"' in query['sql']
+    ]
+    assert replayed == 10
+    assert len(lookups) == 2
+
+
+def test_rejected_comment_does_not_drop_batch(
+        queue_mode, news, author_of_comment, monkeypatch, client, settings
+):
+    """
+    Тест: Если база отклонила пачку, остальные комментарии сохраняются,
+    а отклонённый переносится в журнал отклонённых.
+    """
+    save_records = ingest.save_records
+
+    def reject_bad(records):
+        if any(record['text'] == 'Отклонённый' for record in records):
+            raise IntegrityError
+        return save_records(records)
+
+    monkeypatch.setattr(ingest, 'save_records', reject_bad)
+    for text in ('Первый', 'Отклонённый', 'Второй'):
+        queue_mode.enqueue(
+            Comment(news=news, author=author_of_comment, text=text)
+        )
+
+    queue_mode.flush()
+
+    assert sorted(Comment.objects.values_list('text', flat=True)) == [
+        'Второй', 'Первый'
+    ]
+    rejected = read_spool(queue_mode.rejected_path)
+    assert [record['text'] for record in rejected] == ['Отклонённый']
+    assert queue_mode.stats()['rejected'] == 1
+    settings.METRICS_ENABLED = True
+    text = client.get('/metrics').content.decode()
+    assert 'comment_queue_depth 0.0' in text
+    assert 'comment_queue_rejected_total 1.0' in text
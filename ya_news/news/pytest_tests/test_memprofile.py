@@ -0,0 +1,92 @@
+import tracemalloc
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from news.memprofile import read_samples, summarize
+from news.models import Comment
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.MEMORY_PROFILING = True
+    settings.MEMORY_PROFILE_SAMPLE_RATE = 1
+
+
+def test_detail_allocations_attributed(
+        client, news, author_of_comment, profiling
+):
+    """
+    Тест: Для страницы новости записываются пик и остаток памяти, а
+    комментарии, выбранные для шаблона, видны как место в коде проекта.
+    """
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author_of_comment, text='Слово ' * 50)
+        for _ in range(200)
+    )
+
+    client.get(reverse('news:detail', args=(news.pk,)))
+
+    sample, = read_samples()
+    assert sample['view'] == 'news:detail'
+    assert sample['peak_kb'] >= sample['net_kb'] > 0
+    assert any(site['site'].startswith('news/') for site in sample['sites'])
+    assert not tracemalloc.is_tracing()
+    entry, = summarize(read_samples())
+    assert (entry['samples'], entry['max_peak_path']) == (
+        1, reverse('news:detail', args=(news.pk,))
+    )
+
+
+def test_streamed_page_measured_after_body(
+        client, news, comment, profiling, settings
+):
+    """Тест: Потоковая страница профилируется до конца отдачи тела."""
+    settings.STREAMING_THRESHOLD = 0
+    response = client.get(reverse('news:detail', args=(news.pk,)))
+
+    assert response.streaming
+    assert read_samples() == []
+    assert tracemalloc.is_tracing()
+    b''.join(response.streaming_content)
+    assert not tracemalloc.is_tracing()
+    assert [sample['view'] for sample in read_samples()] == ['news:detail']
+
+
+def test_report_for_staff_and_command(
+        client, admin_client, not_author_client, news, profiling, settings
+):
+    """Тест: Сводка доступна только персоналу и выводится командой."""
+    settings.MEMORY_PROFILE_HISTORY = 2
+    for _ in range(3):
+        client.get(reverse('news:home'))
+    url = reverse('news:memory_stats')
+    settings.MEMORY_PROFILING = False
+
+    assert not_author_client.get(url).status_code == HTTPStatus.FORBIDDEN
+    response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert [entry['view'] for entry in response.json()['views']] == [
+        'news:home'
+    ]
+    assert len(response.json()['recent']) == 2
+    out = StringIO()
+    call_command('memory_report', stdout=out)
+    assert 'news:home (/)' in out.getvalue()
+
+
+def test_not_sampled(client, news, settings):
+    """Тест: Без MEMORY_PROFILING и при нулевой доле замеров нет."""
+    client.get(reverse('news:detail', args=(news.pk,)))
+    settings.MEMORY_PROFILING = True
+    settings.MEMORY_PROFILE_SAMPLE_RATE = 0
+    client.get(reverse('news:detail', args=(news.pk,)))
+
+    assert read_samples() == []
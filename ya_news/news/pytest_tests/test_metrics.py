@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from django.db import connection
+from django.urls import reverse
+
+from news import metrics
+from news.metrics import (
+    EXITED_FILE, FILE_PATTERN, Counter, SharedFile, collect, registry,
+    retire_on_exit, write_shared
+)
+
+
+DEAD_PID = 99999999
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def metrics_enabled(settings):
+    """Метрики по умолчанию выключены, в этих тестах они включаются."""
+    settings.METRICS_ENABLED = True
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response['Content-Type'].startswith('text/plain')
+    return response.content.decode()
+
+
+def test_requests_and_queries_counted(client, news):
+    """Тест: Ответы, время и SQL-запросы считаются по представлениям."""
+    url = reverse('news:detail', args=(news.pk,))
+    client.get('/missing/')
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        client.get(url)
+        client.get(url)
+
+    text = scrape(client)
+
+    assert (
+        'http_requests_total{view="news:detail",method="GET",status="200"}'
+        ' 2.0'
+    ) in text
+    assert 'http_requests_total{view="-",method="GET",status="404"} 1.0' in (
+        text
+    )
+    assert 'http_request_duration_seconds_count{view="news:detail"} 2.0' in (
+        text
+    )
+    assert (
+        'http_request_duration_seconds_bucket{view="news:detail",le="+Inf"}'
+        ' 2.0'
+    ) in text
+    assert collect()['db_queries_total'][('news:detail',)] == len(queries)
+
+
+def test_session_cache_and_form_errors(
+        author_client, news, settings
+):
+    """
+    Тест: Чтение сессии cached_db из кеша и отклонённый комментарий
+    попадают в метрики.
+    """
+    settings.SESSION_ENGINE = settings.SESSION_ENGINES['cached_db']
+    author_client.post(
+        reverse('news:detail', args=(news.pk,)), {'text': 'Ты негодяй'}
+    )
+    author_client.get(reverse('news:home'))
+
+    text = scrape(author_client)
+
+    assert 'form_errors_total{form="comment",reason="bad_words"} 1.0' in text
+    assert 'cache_requests_total{key="session",result="hit"}' in text
+    assert 'cache_requests_total{key="news:front-page",result="miss"}' in text
+
+
+def test_other_processes_summed(client, settings):
+    """Тест: /metrics складывает файлы других процессов со своими."""
+    client.get(reverse('news:home'))
+    write_shared()
+    snapshot = registry.snapshot()
+    SharedFile(settings.METRICS_DIR / FILE_PATTERN.format(0)).write(
+        json.dumps(snapshot).encode()
+    )
+    broken = SharedFile(settings.METRICS_DIR / FILE_PATTERN.format(1))
+    broken.write(b'{"http_requests_total": ')
+
+    text = scrape(client)
+
+    assert (
+        'http_requests_total{view="news:home",method="GET",status="200"}'
+        ' 2.0'
+    ) in text
+
+
+def test_exited_process_files_merged(client, settings):
+    """
+    Тест: Файл завершившегося процесса переносится в общий файл, его
+    счётчики учитываются один раз, а текущие значения отбрасываются.
+    """
+    client.get(reverse('news:home'))
+    snapshot = registry.snapshot()
+    snapshot['comment_queue_depth'] = [[[], 7]]
+    dead = settings.METRICS_DIR / FILE_PATTERN.format(DEAD_PID)
+    SharedFile(dead).write(json.dumps(snapshot).encode())
+
+    scrape(client)
+    text = scrape(client)
+
+    assert not dead.exists()
+    assert (settings.METRICS_DIR / EXITED_FILE).exists()
+    assert (
+        'http_requests_total{view="news:home",method="GET",status="200"}'
+        ' 2.0'
+    ) in text
+    assert 'comment_queue_depth 7.0' not in text
+
+
+def test_exit_hook_retires_own_file(client, settings):
+    """Тест: При выходе процесс переносит свои значения в общий файл."""
+    client.get(reverse('news:home'))
+    write_shared()
+    own = settings.METRICS_DIR / FILE_PATTERN.format(os.getpid())
+
+    retire_on_exit()
+    registry.clear()
+
+    assert not own.exists()
+    assert collect()['http_requests_total'] == {
+        ('news:home', 'GET', '200'): 1
+    }
+
+
+def test_scrape_restricted(client, admin_client, settings):
+    """
+    Тест: /metrics отвечает разрешённым адресам и персоналу, остальным —
+    403, а при выключенных метриках — 404.
+    """
+    remote = {'REMOTE_ADDR': '203.0.113.7'}
+
+    assert client.get('/metrics', **remote).status_code == (
+        HTTPStatus.FORBIDDEN
+    )
+    assert admin_client.get('/metrics', **remote).status_code == (
+        HTTPStatus.OK
+    )
+    settings.METRICS_ENABLED = False
+    assert client.get('/metrics').status_code == HTTPStatus.NOT_FOUND
+
+
+def test_scrape_without_lock(client, settings, monkeypatch):
+    """
+    Тест: Без файлов упавших процессов /metrics не берёт блокировку
+    каталога и учитывает процесс, завершившийся во время чтения, один раз.
+    """
+    client.get(reverse('news:home'))
+    snapshot = json.dumps(registry.snapshot()).encode()
+    other = settings.METRICS_DIR / FILE_PATTERN.format(os.getppid())
+    SharedFile(other).write(snapshot)
+    read_shared = metrics.read_shared
+
+    def exit_while_read(path, *args, **kwargs):
+        data = read_shared(path, *args, **kwargs)
+        if path == other:
+            metrics.add_exited(settings.METRICS_DIR, json.loads(data))
+            other.unlink()
+        return data
+
+    def no_lock(directory):
+        raise AssertionError('Блокировка каталога не нужна.')
+
+    monkeypatch.setattr(metrics, 'read_shared', exit_while_read)
+    monkeypatch.setattr(metrics, 'directory_lock', no_lock)
+
+    assert collect()['http_requests_total'] == {
+        ('news:home', 'GET', '200'): 2
+    }
+
+
+def test_striped_counter_under_threads():
+    """Тест: Приращения из многих потоков не теряются."""
+    counter = Counter('test_total', 'Тест.', ('kind',), registry=None)
+
+    def work():
+        for _ in range(1000):
+            counter.inc('a')
+        counter.inc('b', amount=0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.collect() == {('a',): 8000, ('b',): 4.0}
@@ -0,0 +1,46 @@
+"""
+Модули, общие с проектом ya_note.
+
+ya_news и ya_note — независимые проекты: каждый запускается и проверяется
+из своего каталога, общего пакета на пути импорта у них нет. Поэтому
+одинаковые модули лежат в обоих приложениях копиями, а этот тест следит,
+чтобы копии не расходились. Исправление в одной копии переносится в другую
+в том же коммите.
+"""
+import pytest
+
+from django.conf import settings
+
+OWN = settings.BASE_DIR / 'news'
+SIBLING = settings.BASE_DIR.parent / 'ya_note' / 'notes'
+MIRRORED = (
+    'metrics.py',
+    'management/commands/prune_sessions.py',
+    'auth.py',
+    'management/commands/warm_templates.py',
+    'lazy.py',
+    'management/commands/importtime_report.py',
+    'throttling.py',
+    'compression.py',
+    'streaming.py',
+    'querylog.py',
+    'management/commands/query_report.py',
+    'memprofile.py',
+    'management/commands/memory_report.py',
+    'idempotency.py',
+)
+
+
+def normalize(text):
+    """Текст копии из ya_note с именами ya_news."""
+    return text.replace('yanote', 'yanews').replace('notes', 'news')
+
+
+@pytest.mark.skipif(not SIBLING.is_dir(), reason='Нет проекта ya_note.')
+@pytest.mark.parametrize('module', MIRRORED)
+def test_module_matches_sibling(module):
+    """Тест: Общий модуль совпадает с копией в ya_note."""
+    own = (OWN / module).read_text(encoding='utf-8')
+    sibling = (SIBLING / module).read_text(encoding='utf-8')
+
+    assert own == normalize(sibling)
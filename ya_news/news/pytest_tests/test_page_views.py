@@ -0,0 +1,93 @@
+import pytest
+
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news import page_views
+from news.models import News
+from news.page_views import ViewCounter, get_view_counter
+
+
+pytestmark = pytest.mark.django_db
+
+
+def test_views_counted_without_writes(client, news, all_news):
+    """
+    Тест: Просмотры копятся в памяти и видны на странице, а затем
+    записываются одним запросом на все новости.
+    """
+    others = list(News.objects.exclude(pk=news.pk)[:3])
+    url = reverse('news:detail', args=(news.pk,))
+    client.get(url)
+    response = client.get(url)
+    for other in others:
+        client.get(reverse('news:detail', args=(other.pk,)))
+
+    assert 'просмотров: 2' in response.content.decode()
+    assert News.objects.get(pk=news.pk).views == 0
+    with CaptureQueriesContext(connection) as queries:
+        assert get_view_counter().flush() == 4
+    assert [
+        query['sql'].split()[0] for query in queries
+        if 'SAVEPOINT' not in query['sql']
+    ] == ['UPDATE']
+    assert News.objects.get(pk=news.pk).views == 2
+    assert [item.views for item in News.objects.filter(
+        pk__in=[other.pk for other in others]
+    )] == [1, 1, 1]
+    assert get_view_counter().flush() == 0
+
+
+def test_views_kept_after_failed_flush(news, monkeypatch):
+    """Тест: Если запись не удалась, просмотры не теряются."""
+    counter = get_view_counter()
+    counter.hit(news.pk)
+
+    def locked(counts, batch_size):
+        raise OperationalError('database is locked')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(page_views, 'write_views', locked)
+        with pytest.raises(OperationalError):
+            counter.flush()
+
+    counter.flush()
+    assert News.objects.get(pk=news.pk).views == 1
+
+
+def test_failed_batch_not_counted_twice(all_news):
+    """
+    Тест: Если вторая пачка не записалась, повторная запись учитывает
+    каждый просмотр один раз.
+    """
+    first, second = News.objects.all()[:2]
+    counter = ViewCounter(flush_interval=0, batch_size=1)
+    counter.hit(first.pk)
+    counter.hit(second.pk)
+    updates = []
+
+    def fail_second_update(execute, sql, params, many, context):
+        if sql.startswith('UPDATE'):
+            updates.append(sql)
+            if len(updates) == 2:
+                raise OperationalError('database is locked')
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(fail_second_update):
+        with pytest.raises(OperationalError):
+            counter.flush()
+    counter.flush()
+
+    assert [
+        News.objects.get(pk=news.pk).views for news in (first, second)
+    ] == [1, 1]
+
+
+def test_views_in_admin(admin_client, news):
+    """Тест: Число просмотров видно в списке новостей админки."""
+    News.objects.filter(pk=news.pk).update(views=42)
+
+    response = admin_client.get(reverse('admin:news_news_changelist'))
+
+    assert '<td class="field-views">42</td>' in response.content.decode()
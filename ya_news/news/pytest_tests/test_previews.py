@@ -0,0 +1,50 @@
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news.models import PREVIEW_WORDS, News
+
+LONG_TEXT = ' '.join(f'слово{index}' for index in range(100))
+
+pytestmark = pytest.mark.django_db
+
+
+def test_preview_computed_on_save_and_bulk_create():
+    """Тест: Превью считается в save(), даже с update_fields, и bulk_create."""
+    news = News.objects.create(title='Заголовок', text=LONG_TEXT)
+    bulk_news, = News.objects.bulk_create(
+        [News(title='Пачкой', text=LONG_TEXT)]
+    )
+    news.text = 'Новый текст'
+    news.save(update_fields=['text'])
+
+    assert bulk_news.preview.split()[:-1] == LONG_TEXT.split()[:PREVIEW_WORDS]
+    assert News.objects.get(pk=news.pk).preview == 'Новый текст'
+
+
+def test_home_page_does_not_load_text(client):
+    """Тест: Главная страница не загружает полный текст новостей."""
+    News.objects.create(title='Заголовок', text=LONG_TEXT)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('news:home'))
+
+    assert '"news_news"."text"' not in ''.join(
+        query['sql'] for query in queries
+    )
+    assert 'слово0' in response.content.decode()
+    assert 'слово99' not in response.content.decode()
+
+
+def test_backfill_fills_missing_previews():
+    """Тест: Команда заполняет превью, сохранённых в обход save()."""
+    news = News.objects.create(title='Заголовок', text=LONG_TEXT)
+    News.objects.filter(pk=news.pk).update(preview='')
+
+    call_command('backfill_news_previews', '--batch-size=1')
+
+    news.refresh_from_db()
+    assert news.preview.startswith('слово0 слово1')
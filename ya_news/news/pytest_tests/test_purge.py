@@ -0,0 +1,156 @@
+import pytest
+import threading
+
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news.front_page import get_front_page
+from news.models import Comment, News, UserDeletion, raw_delete
+from news.purge import purge_news, soft_delete_news, soft_delete_users
+
+
+WRITE_TIMEOUT = 5
+
+pytestmark = pytest.mark.django_db
+
+
+def test_admin_delete_hides_news(
+        admin_client, news, ten_comments, django_capture_on_commit_callbacks
+):
+    """
+    Тест: Удаление в админке сразу скрывает новость с сайта,
+    а комментарии остаются до purge_deleted.
+    """
+    get_front_page()
+    url = reverse('admin:news_news_delete', args=(news.pk,))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.post(url, {'post': 'yes'})
+
+    assert response.status_code == HTTPStatus.FOUND
+    assert News.objects.alive().count() == 0
+    assert Comment.objects.count() == len(ten_comments)
+    assert get_front_page() == []
+    detail = admin_client.get(reverse('news:detail', args=(news.pk,)))
+    assert detail.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize('name', ('news:edit', 'news:delete', 'news:reply'))
+@pytest.mark.parametrize('method', ('get', 'post'))
+def test_comments_of_deleted_news_not_editable(
+        author_client, comment, form_data, name, method
+):
+    """
+    Тест: Комментарии к удалённой новости нельзя изменить, удалить
+    или ответить на них.
+    """
+    soft_delete_news(News.objects.filter(pk=comment.news_id))
+    url = reverse(name, args=(comment.pk,))
+
+    response = getattr(author_client, method)(url, data=form_data)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert Comment.objects.get(pk=comment.pk).text == comment.text
+
+
+def test_deleted_user_logged_out_and_hidden(
+        client, author_client, author_of_comment, comment,
+        django_capture_on_commit_callbacks
+):
+    """Тест: Удалённый пользователь выходит, его комментарии скрыты."""
+    url = reverse('news:detail', args=(comment.news.pk,))
+    author_client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        soft_delete_users(
+            type(author_of_comment).objects.filter(pk=author_of_comment.pk)
+        )
+
+    response = author_client.get(url)
+    assert not response.context['user'].is_authenticated
+    assert list(response.context['comments']) == []
+    assert Comment.objects.filter(pk=comment.pk).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_purge_does_not_block_comment_writes(author_of_comment):
+    """
+    Тест: Между пачками удаления комментарии к другим новостям
+    сохраняются без ожидания, а добавленные к удаляемой новости
+    удаляются вместе с ней.
+    """
+    doomed = News.objects.create(title='Удаляемая', text='Текст')
+    other = News.objects.create(title='Другая', text='Текст')
+    Comment.objects.bulk_create(
+        Comment(news=doomed, author=author_of_comment, text=f'Текст {index}')
+        for index in range(25)
+    )
+    soft_delete_news(News.objects.filter(pk=doomed.pk))
+    progress = []
+
+    def write_comments():
+        try:
+            targets = (other,) if progress else (doomed, other)
+            for news in targets:
+                Comment.objects.create(
+                    news=news, author=author_of_comment, text='Во время'
+                )
+        finally:
+            connection.close()
+
+    def report(deleted):
+        assert not connection.in_atomic_block
+        writer = threading.Thread(target=write_comments)
+        writer.start()
+        writer.join(WRITE_TIMEOUT)
+        progress.append((deleted, writer.is_alive()))
+
+    purge_news(doomed, batch_size=10, progress=report)
+
+    assert [deleted for deleted, _ in progress] == [10, 20, 26]
+    assert not any(blocked for _, blocked in progress)
+    assert not News.objects.filter(pk=doomed.pk).exists()
+    assert Comment.objects.filter(news=other).count() == len(progress)
+
+
+@pytest.mark.django_db(databases=['default', settings.ARCHIVE_DATABASE])
+def test_purge_command_reports_progress(
+        news, ten_comments, author_of_comment, capsys
+):
+    """Тест: purge_deleted удаляет помеченные объекты пачками с отчётом."""
+    soft_delete_news(News.objects.filter(pk=news.pk))
+    UserDeletion.objects.create(user=author_of_comment)
+
+    call_command('purge_deleted', batch_size=4)
+
+    output = capsys.readouterr().out
+    assert 'удалено комментариев 8 из 10' in output
+    assert 'удалено комментариев 10 из 10' in output
+    assert not News.objects.exists()
+    assert not type(author_of_comment).objects.exists()
+
+
+def test_raw_delete_single_query_without_signals(ten_comments):
+    """Тест: raw_delete удаляет строки одним запросом, без сигналов."""
+    deleted_signals = []
+
+    def receiver(sender, **kwargs):
+        deleted_signals.append(sender)
+
+    post_delete.connect(receiver, sender=Comment)
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            deleted = raw_delete(Comment.objects.all())
+    finally:
+        post_delete.disconnect(receiver, sender=Comment)
+
+    assert deleted == len(ten_comments)
+    assert len(queries) == 1
+    assert deleted_signals == []
+    assert not Comment.objects.exists()
@@ -0,0 +1,88 @@
+import io
+import pytest
+
+from http import HTTPStatus
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from news.querylog import (
+    collect_report, fingerprint, read_slow_queries, write_report
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def query_log_enabled(settings):
+    """Учёт запросов по умолчанию выключен, в этих тестах он включается."""
+    settings.QUERY_LOG_ENABLED = True
+
+
+def test_fingerprint_ignores_values():
+    """Тест: Запросы, различающиеся лишь значениями, сводятся к одному."""
+    first = fingerprint(
+        'SELECT * FROM "news_news" WHERE "id" IN (%s, %s) LIMIT 21'
+    )
+    second = fingerprint(
+        "SELECT *  FROM \"news_news\"\n WHERE \"id\" IN (7) LIMIT 'x'"
+    )
+
+    assert first == second == (
+        'SELECT * FROM "news_news" WHERE "id" IN (...) LIMIT ?'
+    )
+
+
+def test_queries_grouped_by_view(client, news, settings):
+    """
+    Тест: Запросы учитываются по представлению, медленные пишутся
+    в журнал со строкой кода, из которой выполнены, а не со строкой
+    обёрток метрик и профилирования.
+    """
+    settings.SLOW_QUERY_THRESHOLD = 0
+    settings.METRICS_ENABLED = True
+    settings.MEMORY_PROFILING = True
+    settings.MEMORY_PROFILE_SAMPLE_RATE = 1
+    url = reverse('news:detail', args=(news.pk,))
+    client.get(url)
+    client.get(url)
+
+    report = [entry for entry in collect_report() if entry['view'] == (
+        'news:detail'
+    )]
+    assert report and all(entry['count'] == 2 for entry in report)
+    files = {
+        record['origin'].partition(':')[0] for record in read_slow_queries()
+    }
+    assert 'news/archive.py' in files
+    assert not files & {
+        'news/querylog.py', 'news/metrics.py', 'news/memprofile.py'
+    }
+
+
+def test_report_merges_processes(client, news, settings):
+    """Тест: Команда складывает отчёты других процессов с текущим."""
+    client.get(reverse('news:detail', args=(news.pk,)))
+    write_report(settings.QUERY_LOG_DIR)
+    own_report = next(settings.QUERY_LOG_DIR.glob('queries-*.json'))
+    own_report.rename(own_report.with_name('queries-1.json'))
+
+    stdout = io.StringIO()
+    call_command('query_report', '--view=news:detail', stdout=stdout)
+
+    counts = [entry['count'] for entry in collect_report()]
+    assert set(counts) == {2}
+    assert 'news:detail: SELECT' in stdout.getvalue()
+
+
+def test_stats_endpoint_for_staff_only(
+        client, admin_client, not_author_client
+):
+    """Тест: Сводка доступна только персоналу."""
+    url = reverse('news:query_stats')
+
+    assert client.get(url).status_code == HTTPStatus.FOUND
+    assert not_author_client.get(url).status_code == HTTPStatus.FORBIDDEN
+    response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert 'queries' in response.json()
@@ -0,0 +1,84 @@
+import pytest
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+
+pytestmark = pytest.mark.django_db
+
+
+def session_queries_on_detail(user, news_id, engine, settings_fixture):
+    """Количество запросов к django_session при повторном заходе."""
+    settings_fixture.SESSION_ENGINE = engine
+    client = Client()
+    client.force_login(user)
+    url = reverse('news:detail', args=(news_id,))
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    return len([
+        query for query in queries.captured_queries
+        if 'django_session' in query['sql']
+    ])
+
+
+@pytest.mark.parametrize(
+    'mode, expected_queries',
+    (
+        ('cached_db', 0),
+        ('signed_cookies', 0),
+    )
+)
+def test_session_modes_skip_session_table(
+        settings, author_of_comment, news, mode, expected_queries
+):
+    """
+    Тест: В режимах cached_db и signed_cookies повторный запрос
+    не обращается к таблице сессий.
+    """
+    queries = session_queries_on_detail(
+        author_of_comment, news.id, settings.SESSION_ENGINES[mode], settings
+    )
+    assert queries == expected_queries
+
+
+def test_db_session_mode_reads_session_table(
+        settings, author_of_comment, news
+):
+    """Тест: В режиме db каждый запрос читает таблицу сессий."""
+    queries = session_queries_on_detail(
+        author_of_comment, news.id, settings.SESSION_ENGINES['db'], settings
+    )
+    assert queries > 0
+
+
+def test_prune_sessions_deletes_only_expired():
+    """Тест: prune_sessions удаляет только просроченные сессии."""
+    now = timezone.now()
+    Session.objects.bulk_create(
+        Session(
+            session_key=f'expired{index}',
+            session_data='',
+            expire_date=now - timedelta(days=1)
+        )
+        for index in range(5)
+    )
+    Session.objects.create(
+        session_key='alive',
+        session_data='',
+        expire_date=now + timedelta(days=1)
+    )
+
+    call_command('prune_sessions', batch_size=2, stdout=StringIO())
+
+    assert list(
+        Session.objects.values_list('session_key', flat=True)
+    ) == ['alive']
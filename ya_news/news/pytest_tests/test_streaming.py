@@ -0,0 +1,91 @@
+import gzip
+import pytest
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news.compression import COMPRESSORS, choose_encoding
+from news.models import Comment
+from news.views import NewsDetail
+
+LONG_THREAD = 2000
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def long_thread(news, author_of_comment):
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author_of_comment, text=f'Комментарий {i}')
+        for i in range(LONG_THREAD)
+    )
+    return reverse('news:detail', args=(news.pk,))
+
+
+def peak_memory(rf, news):
+    """Пик памяти, выделенной за время ответа и чтения его тела."""
+    request = rf.get('/')
+    request.user = AnonymousUser()
+    tracemalloc.start()
+    response = NewsDetail.as_view()(request, pk=news.pk)
+    if not response.streaming:
+        response.render()
+    size = sum(len(chunk) for chunk in response)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, peak
+
+
+def test_long_thread_streamed_before_comments_loaded(client, long_thread):
+    """
+    Тест: Начало страницы длинной ветки отдаётся до выборки комментариев,
+    а комментарии приходят целиком и по порядку.
+    """
+    response = client.get(long_thread)
+    chunks = iter(response.streaming_content)
+
+    with CaptureQueriesContext(connection) as queries:
+        head = next(chunks).decode()
+
+    assert len(queries) == 0
+    assert 'Заголовок' in head
+    assert 'Комментарий' not in head
+    body = b''.join(chunks).decode()
+    positions = [
+        body.index(f'Комментарий {i}<') for i in (0, 1, LONG_THREAD - 1)
+    ]
+    assert positions == sorted(positions)
+
+
+def test_streaming_lowers_peak_memory(rf, settings, news, long_thread):
+    """Тест: Потоковая отдача длинной ветки требует меньше памяти."""
+    streamed_size, streamed_peak = peak_memory(rf, news)
+    settings.STREAMING_THRESHOLD = None
+    buffered_size, buffered_peak = peak_memory(rf, news)
+
+    assert abs(streamed_size - buffered_size) < buffered_size * 0.05
+    assert streamed_peak * 2 < buffered_peak
+
+
+def test_compression_threshold(client, settings, long_thread):
+    """Тест: Поток сжимается gzip по частям, короткий ответ не сжимается."""
+    streamed = client.get(long_thread, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+    content = gzip.decompress(b''.join(streamed.streaming_content))
+    settings.COMPRESSION_MIN_LENGTH = 10 ** 6
+    small = client.get(reverse('users:login'), HTTP_ACCEPT_ENCODING='gzip')
+
+    assert streamed['Content-Encoding'] == 'gzip'
+    assert f'Комментарий {LONG_THREAD - 1}<'.encode() in content
+    assert not small.has_header('Content-Encoding')
+
+
+def test_explicit_refusal_beats_wildcard():
+    """Тест: Кодировка с q=0 не выбирается, даже если клиент принимает *."""
+    brotli = 'br' if 'br' in COMPRESSORS else None
+
+    assert choose_encoding('gzip;q=0, *') == brotli
+    assert choose_encoding('*, br;q=0') == 'gzip'
+    assert choose_encoding('gzip;q=0, br;q=0, *') is None
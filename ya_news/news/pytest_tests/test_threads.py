@@ -0,0 +1,118 @@
+import pytest
+
+from http import HTTPStatus
+
+from django.urls import reverse
+
+from news.models import Comment
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def chain(comment, author_of_comment, settings):
+    """Цепочка ответов на comment глубже видимой на странице новости."""
+    settings.COMMENT_THREAD_DEPTH = 2
+    comments = [comment]
+    for number in range(4):
+        reply = Comment(author=author_of_comment, text=f'Ответ {number}')
+        reply.reply_to(comments[-1])
+        reply.save()
+        comments.append(reply)
+    return comments
+
+
+def test_reply_placed_under_parent(
+        author_client, not_author_of_comment, comment, news
+):
+    """
+    Тест: Ответ стоит в ветке сразу под своим комментарием, после
+    ответов на него, но до следующего комментария к новости.
+    """
+    first = Comment(author=not_author_of_comment, text='Первый ответ')
+    first.reply_to(comment)
+    first.save()
+    Comment.objects.create(
+        news=news, author=not_author_of_comment, text='Позже'
+    )
+
+    response = author_client.post(
+        reverse('news:reply', args=(comment.pk,)), {'text': 'Ответ'}
+    )
+
+    assert response.status_code == HTTPStatus.FOUND
+    reply = Comment.objects.get(text='Ответ')
+    assert (reply.parent, reply.depth) == (comment, 1)
+    assert reply.path == comment.path + str(reply.pk).zfill(10)
+    thread = list(news.comment_set.thread())
+    assert [item.text for item in thread] == [
+        comment.text, 'Первый ответ', 'Ответ', 'Позже'
+    ]
+    assert [item.level for item in thread] == [0, 1, 1, 0]
+
+
+def test_bulk_created_replies_get_paths(comment, author_of_comment):
+    """Тест: Пути ответов из bulk_create записывает триггер базы."""
+    Comment.objects.bulk_create(
+        Comment(
+            news=comment.news, author=author_of_comment, parent=comment,
+            text=f'Ответ {number}',
+        )
+        for number in range(3)
+    )
+
+    replies = Comment.objects.filter(parent=comment).order_by('pk')
+    assert [reply.path for reply in replies] == [
+        comment.path + str(reply.pk).zfill(10) for reply in replies
+    ]
+    assert {reply.depth for reply in replies} == {1}
+
+
+def test_subtree_single_query(chain, django_assert_num_queries):
+    """Тест: Поддерево комментария выбирается одним запросом."""
+    with django_assert_num_queries(1):
+        subtree = list(Comment.objects.subtree(chain[2]).thread())
+
+    assert subtree == chain[2:]
+    assert [comment.level for comment in subtree] == [2, 3, 4]
+
+
+def test_deep_replies_collapsed(client, chain, news):
+    """
+    Тест: Ответы глубже COMMENT_THREAD_DEPTH свёрнуты с их числом и
+    открываются на странице ответа.
+    """
+    response = client.get(reverse('news:detail', args=(news.pk,)))
+
+    comments = response.context['comments']
+    assert comments == chain[:2]
+    assert [comment.hidden_replies for comment in comments] == [0, 3]
+    thread_url = reverse('news:thread', args=(chain[1].pk,))
+    assert thread_url in response.content.decode()
+
+    response = client.get(thread_url)
+
+    comments = response.context['comments']
+    assert comments == chain[1:3]
+    assert [comment.level for comment in comments] == [0, 1]
+    assert comments[-1].hidden_replies == 2
+
+
+def test_reply_depth_limited(chain, author_of_comment, settings):
+    """Тест: Ответ на комментарий последнего уровня становится соседом."""
+    settings.COMMENT_MAX_DEPTH = 3
+    reply = Comment(author=author_of_comment, text='Ответ')
+
+    reply.reply_to(chain[2])
+    reply.save()
+
+    assert (reply.parent, reply.depth) == (chain[1], 2)
+
+
+def test_replies_kept_after_parent_deleted(author_client, chain, news):
+    """Тест: Удаление комментария не трогает ответы на него."""
+    response = author_client.post(reverse('news:delete', args=(chain[1].pk,)))
+
+    assert response.status_code == HTTPStatus.FOUND
+    assert list(news.comment_set.thread()) == [chain[0], *chain[2:]]
@@ -0,0 +1,91 @@
+import pytest
+
+from http import HTTPStatus
+
+from django.urls import reverse
+
+from news.models import Comment
+from news.throttling import LocalMemoryBackend
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def strict_rates(settings):
+    settings.THROTTLE_RATES = {'comments': {'user': '2/m', 'ip': '3/m'}}
+
+
+def test_user_is_throttled_after_rate_exceeded(
+        strict_rates, author_client, news_id_for_args, form_data
+):
+    """
+    Тест: После исчерпания лимита пользователь получает 429
+    с заголовком Retry-After, а комментарий не сохраняется.
+    """
+    url = reverse('news:detail', args=news_id_for_args)
+
+    responses = [author_client.post(url, data=form_data) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [
+        HTTPStatus.FOUND, HTTPStatus.FOUND, HTTPStatus.TOO_MANY_REQUESTS
+    ]
+    assert int(responses[-1]['Retry-After']) > 0
+    assert Comment.objects.count() == 2
+
+
+def test_ip_limit_shared_between_users(
+        strict_rates, author_client, not_author_client,
+        news_id_for_args, form_data
+):
+    """Тест: Лимит на IP-адрес общий для всех пользователей."""
+    url = reverse('news:detail', args=news_id_for_args)
+
+    statuses = [
+        client.post(url, data=form_data).status_code
+        for client in (author_client, author_client,
+                       not_author_client, not_author_client)
+    ]
+
+    assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS
+    assert Comment.objects.count() == 3
+
+
+def test_reading_is_not_throttled(strict_rates, author_client, news):
+    """Тест: GET-запросы не расходуют токены."""
+    url = reverse('news:detail', args=(news.id,))
+
+    statuses = {author_client.get(url).status_code for _ in range(5)}
+
+    assert statuses == {HTTPStatus.OK}
+
+
+def test_bucket_refills_over_time():
+    """Тест: Корзина пополняется со временем."""
+    now = [0.0]
+    backend = LocalMemoryBackend()
+    backend.clock = lambda: now[0]
+
+    first = backend.consume('key', 1, 0.5)
+    second = backend.consume('key', 1, 0.5)
+    now[0] = 2.0
+    third = backend.consume('key', 1, 0.5)
+
+    assert (first, second, third) == (0, 2.0, 0)
+
+
+def test_buckets_limited_to_least_recently_used():
+    """
+    Тест: Корзин не больше max_buckets, вытесняются давно не
+    использованные, даже если они ещё не наполнились.
+    """
+    backend = LocalMemoryBackend()
+    backend.clock = lambda: 0.0
+    backend.max_buckets = 2
+
+    backend.consume('first', 5, 0.1)
+    backend.consume('second', 5, 0.1)
+    backend.consume('first', 5, 0.1)
+    backend.consume('third', 5, 0.1)
+
+    assert list(backend._buckets) == ['first', 'third']
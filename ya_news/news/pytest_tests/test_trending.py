@@ -0,0 +1,129 @@
+import pytest
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from news import front_page
+from news.models import Comment, News
+from news.page_views import get_view_counter
+from news.purge import soft_delete_news
+from news.trending import (
+    TRENDING_KEY, add_events, current_score, get_trending, log_weight
+)
+
+
+pytestmark = pytest.mark.django_db
+
+
+def comment_on(news, author, count):
+    for index in range(count):
+        Comment.objects.create(
+            news=news, author=author, text=f'Комментарий {index}'
+        )
+
+
+def test_comments_update_ranking_without_scan(
+        all_news, author_of_comment, django_capture_on_commit_callbacks,
+        django_assert_num_queries
+):
+    """
+    Тест: Новые комментарии меняют рейтинг в кеше, и страница
+    популярных не выбирает комментарии.
+    """
+    first, second = News.objects.all()[:2]
+    comment_on(first, author_of_comment, 2)
+    assert [news for news, _ in get_trending()] == [first]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        comment_on(second, author_of_comment, 3)
+
+    with django_assert_num_queries(1):
+        trending = get_trending()
+    assert [news for news, _ in trending] == [second, first]
+    assert [round(score, 3) for _, score in trending] == [3, 2]
+
+
+def test_scores_decay_lazily():
+    """Тест: За период полураспада вес события падает вдвое."""
+    now = timezone.now()
+    half_life = timedelta(hours=6)
+    scores = add_events({}, [
+        (1, log_weight(1, now - half_life)),
+        (1, log_weight(1, now)),
+        (2, log_weight(1, now - half_life * 2)),
+    ], capacity=10)
+
+    assert current_score(scores[1], now) == pytest.approx(1.5)
+    assert current_score(scores[2], now) == pytest.approx(0.25)
+    assert current_score(scores[1], now + half_life) == pytest.approx(0.75)
+
+
+def test_bounded_top_keeps_active_news():
+    """Тест: Новая новость вытесняет наименее популярную из кеша."""
+    now = timezone.now()
+    scores = add_events({}, [
+        (1, log_weight(5, now)),
+        (2, log_weight(1, now)),
+        (3, log_weight(2, now)),
+    ], capacity=2)
+
+    assert sorted(scores) == [1, 3]
+    assert current_score(scores[3], now) == pytest.approx(3)
+
+
+def test_trending_page_skips_deleted_news(
+        client, all_news, author_of_comment
+):
+    """Тест: Удалённая новость пропадает со страницы популярных."""
+    first, second = News.objects.all()[:2]
+    comment_on(first, author_of_comment, 2)
+    comment_on(second, author_of_comment, 1)
+    get_trending()
+
+    soft_delete_news(News.objects.filter(pk=first.pk))
+    response = client.get(reverse('news:trending'))
+
+    assert [news for news, _ in response.context['trending']] == [second]
+
+
+def test_views_counted_after_flush(
+        client, news, settings, django_capture_on_commit_callbacks
+):
+    """Тест: Записанные просмотры поднимают новость в рейтинге."""
+    settings.TRENDING_VIEW_WEIGHT = 0.5
+    get_trending()
+    for _ in range(4):
+        client.get(reverse('news:detail', args=(news.pk,)))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        get_view_counter().flush()
+
+    assert [
+        (item, round(score, 3)) for item, score in get_trending()
+    ] == [(news, 2)]
+
+
+def test_events_keep_scores_expiry(
+        all_news, author_of_comment, django_capture_on_commit_callbacks,
+        monkeypatch
+):
+    """Тест: Новые события не продлевают срок оценок в кеше."""
+    get_trending()
+    built_at = cache.get(TRENDING_KEY)['built_at']
+    # Оставшийся срок считает news.front_page.remaining_timeout.
+    monkeypatch.setattr(
+        front_page, 'time',
+        lambda: built_at + settings.TRENDING_TIMEOUT - 5,
+    )
+    news = News.objects.first()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        comment_on(news, author_of_comment, 1)
+
+    expires = cache._expire_info[cache.make_key(TRENDING_KEY)]
+    assert expires <= built_at + 10
+    assert [item for item, _ in get_trending()] == [news]
@@ -0,0 +1,134 @@
+import pytest
+import subprocess
+
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.urls import get_resolver, reverse
+
+from news.management.commands import importtime_report
+from news.management.commands.importtime_report import (
+    group_for_module, parse_importtime
+)
+from news.front_page import FRONT_PAGE_KEY
+from news.models import News
+from news.page_views import get_view_counter
+from news.trending import TRENDING_KEY
+from news.warmup import preresolve_urls, warm_cache, warm_templates
+from yanews.settings_production import TEMPLATES
+
+
+@pytest.fixture
+def production_templates(settings):
+    settings.TEMPLATES = TEMPLATES
+    return engines['django'].engine
+
+
+def test_warm_templates_fills_cached_loader(production_templates):
+    """Тест: Прогрев компилирует шаблоны проекта в кеширующий загрузчик."""
+    loaded, errors = warm_templates()
+
+    cache = production_templates.template_loaders[0].get_template_cache
+    assert errors == {}
+    assert 'news/home.html' in loaded
+    assert 'news/home.html' in cache
+    assert 'includes/header.html' in cache
+
+
+def test_warm_templates_command(production_templates):
+    """Тест: Команда warm_templates сообщает число шаблонов."""
+    stdout = StringIO()
+
+    call_command('warm_templates', stdout=stdout)
+
+    assert 'Скомпилировано шаблонов' in stdout.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_warm_cache_fills_caches(production_templates, all_news):
+    """
+    Тест: Прогрев открывает главную и последние новости в нескольких
+    потоках, заполняет кеши и загрузчик шаблонов, не считая просмотров.
+    """
+    results = warm_cache(news_count=3, threads=2)
+
+    latest = News.objects.all()[:3]
+    assert [url for url, _, _ in results] == [
+        reverse('news:home'), reverse('news:trending'),
+        *(reverse('news:detail', args=(news.pk,)) for news in latest),
+        reverse('users:login'), reverse('users:signup'),
+    ]
+    assert {status for _, status, _ in results} == {200}
+    assert cache.get(FRONT_PAGE_KEY) is not None
+    assert cache.get(TRENDING_KEY) is not None
+    loaded = production_templates.template_loaders[0].get_template_cache
+    assert 'news/detail.html' in loaded
+    assert 'registration/login.html' in loaded
+    assert get_view_counter().pending(latest[0].pk) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_warm_cache_command(news):
+    """Тест: Команда warm_cache сообщает число страниц и время."""
+    stdout = StringIO()
+
+    call_command('warm_cache', '--news', '1', '--parallel', '1',
+                 stdout=stdout)
+
+    assert 'Прогрето страниц: 5 за' in stdout.getvalue()
+    assert reverse('news:detail', args=(news.pk,)) in stdout.getvalue()
+
+
+def test_preresolve_urls_builds_reverse_tables():
+    """Тест: Предварительное разрешение обходит все маршруты проекта."""
+    resolver = get_resolver()
+
+    count = preresolve_urls(resolver)
+
+    assert count > 0
+    assert 'admin' in resolver.namespace_dict
+
+
+def test_lazy_view_imports_class_on_first_request():
+    """Тест: Ленивое представление импортирует класс при первом вызове."""
+    view = get_resolver().resolve(reverse('users:signup')).func
+
+    assert view.view_path == 'django.views.generic.CreateView'
+
+
+def test_importtime_output_grouped_by_app():
+    """Тест: Строки -X importtime группируются по приложениям."""
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       120 |        120 |   django.contrib.admin.sites\n'
+        'import time:        30 |        150 | news.models\n'
+    )
+
+    groups = [
+        (group_for_module(module, ['django.contrib.admin', 'news']), time)
+        for module, time in parse_importtime(output)
+    ]
+
+    assert groups == [('django.contrib.admin', 120), ('news', 30)]
+
+
+def test_importtime_failure_without_stderr(monkeypatch):
+    """
+    Тест: Замер идёт без прогрева, а упавший без вывода импорт даёт
+    понятную ошибку вместо IndexError.
+    """
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 1, stdout='', stderr='')
+
+    monkeypatch.setattr(importtime_report.subprocess, 'run', run)
+
+    with pytest.raises(CommandError, match='без сообщения об ошибке'):
+        call_command('importtime_report')
+    script = calls[0][-1]
+    assert 'settings.TEMPLATE_WARMUP = False' in script
+    assert 'settings.CACHE_WARMUP = False' in script
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+class ArchiveRouter:
+    """
+    Архивная база (ARCHIVE_DATABASE) хранит только таблицы приложения news.
+
+    Запросы к ней всегда явные (``using``), поэтому модели других
+    приложений читаются из основной базы, даже если запрос пришёл через
+    связь архивного объекта, например comment.author.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'news':
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {obj1._state.db, obj2._state.db}
+        if settings.ARCHIVE_DATABASE in databases:
+            return databases <= {DEFAULT_DB_ALIAS, settings.ARCHIVE_DATABASE}
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == settings.ARCHIVE_DATABASE:
+            return app_label == 'news'
+        return None
@@ -0,0 +1,74 @@
+"""
+Потоковая отдача больших страниц.
+
+Страница рендерится целиком, но вместо длинного списка в неё подставляется
+метка. Ответ отдаёт часть до метки сразу, затем элементы списка пачками
+по STREAMING_CHUNK_SIZE, прямо из итератора запроса, и остаток страницы.
+Так первый байт уходит до выборки списка, а в памяти держится одна пачка.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+
+def stream_or_list(queryset):
+    """
+    Возвращает (элементы, нужен ли поток).
+
+    Для коротких списков выборка ограничена STREAMING_THRESHOLD + 1
+    строками и сразу служит результатом; для длинных возвращается
+    исходный ленивый queryset.
+    """
+    threshold = settings.STREAMING_THRESHOLD
+    if threshold is None:
+        return list(queryset), False
+    items = list(queryset[:threshold + 1])
+    if len(items) <= threshold:
+        return items, False
+    return queryset, True
+
+
+class StreamingTemplateMixin:
+    """
+    Отдаёт список stream_queryset потоком, если он назначен.
+
+    Основной шаблон выводит переменную ``streamed`` вместо списка, а
+    каждая пачка рендерится шаблоном stream_template_name с пачкой в
+    переменной stream_object_name.
+    """
+    stream_template_name = None
+    stream_object_name = 'object_list'
+    stream_queryset = None
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.stream_queryset is None:
+            return super().render_to_response(context, **response_kwargs)
+        marker = f'<!--stream:{uuid4().hex}-->'
+        context['streamed'] = mark_safe(marker)
+        response = super().render_to_response(context, **response_kwargs)
+        head, tail = response.rendered_content.split(marker, 1)
+        return StreamingHttpResponse(
+            self.stream_content(head, tail),
+            content_type=response['Content-Type'],
+            status=response.status_code,
+        )
+
+    def stream_context(self, chunk):
+        return {self.stream_object_name: chunk, 'user': self.request.user}
+
+    def stream_content(self, head, tail):
+        yield head
+        template = get_template(self.stream_template_name)
+        chunk_size = settings.STREAMING_CHUNK_SIZE
+        chunk = []
+        for item in self.stream_queryset.iterator(chunk_size=chunk_size):
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                yield template.render(self.stream_context(chunk))
+                chunk = []
+        if chunk:
+            yield template.render(self.stream_context(chunk))
+        yield tail
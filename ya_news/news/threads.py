@@ -0,0 +1,53 @@
+"""
+Пути комментариев в базе.
+
+Путь комментария (см. news.models.PATH_STEP) состоит из ключей, а ключ
+SQLite выдаёт только при вставке. Поэтому путь и уровень новой строки
+записывает триггер AFTER INSERT: вставка остаётся одним запросом, а
+bulk_create, очередь комментариев и загрузка фикстур получают пути без
+отдельного прохода. Строки, вставленные с готовым путём (перенос в
+архив), триггер не трогает.
+
+При изменении таблицы миграцией SQLite пересоздаёт её без триггеров,
+поэтому триггер создаётся заново после каждого migrate.
+"""
+from django.db import connections, router
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from .models import PATH_STEP, Comment
+
+TRIGGER_NAME = 'news_comment_path'
+
+
+def create_path_trigger(connection):
+    table = connection.ops.quote_name(Comment._meta.db_table)
+    padding = '0' * PATH_STEP
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {TRIGGER_NAME}
+            AFTER INSERT ON {table}
+            WHEN NEW.path = ''
+            BEGIN
+                UPDATE {table} SET
+                    path = COALESCE(
+                        (SELECT path FROM {table} WHERE id = NEW.parent_id),
+                        ''
+                    ) || substr('{padding}' || NEW.id, -{PATH_STEP}),
+                    depth = COALESCE(
+                        (SELECT depth + 1 FROM {table}
+                         WHERE id = NEW.parent_id),
+                        0
+                    )
+                WHERE id = NEW.id;
+            END
+        ''')
+
+
+@receiver(post_migrate)
+def comments_migrated(sender, using, **kwargs):
+    if (
+        sender.label == Comment._meta.app_label
+        and router.allow_migrate_model(using, Comment)
+    ):
+        create_path_trigger(connections[using])
@@ -0,0 +1,172 @@
+"""
+Популярные новости.
+
+Популярность новости — сумма весов событий: комментарий весит 1,
+просмотр — TRENDING_VIEW_WEIGHT, и каждое событие вдвое теряет вес за
+TRENDING_HALF_LIFE секунд. Чтобы не пересчитывать затухание всех оценок,
+вес события сразу приводится к общей точке отсчёта EPOCH: умножается на
+2 ** ((t - EPOCH) / TRENDING_HALF_LIFE). Все оценки затухают одинаково,
+поэтому их порядок от времени чтения не зависит, а текущая оценка
+получается при чтении делением на тот же множитель для момента чтения.
+Оценки хранятся логарифмами, иначе множитель переполнил бы float.
+
+В кеше лежат оценки не больше чем TRENDING_CAPACITY новостей (алгоритм
+Space-Saving): новость, которой среди них нет, вытесняет новость с
+наименьшей оценкой и получает эту оценку в придачу. Оценка бывает
+завышена не больше чем на наименьшую оценку в кеше, и новости с заметной
+активностью не теряются. Страница популярных читает только кеш и
+новости по ключам. Comment просматривается, лишь когда записи в кеше нет
+(после запуска или по истечении TRENDING_TIMEOUT), и тогда учитываются
+только комментарии: время просмотров в базе не хранится. Как и снимок
+главной (news.front_page), события не продлевают срок записи: он
+отсчитывается от пересчёта.
+"""
+import math
+import threading
+from time import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .front_page import remaining_timeout
+from .models import Comment, News
+
+TRENDING_KEY = 'news:trending'
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+# Через столько периодов полураспада вес события меньше 0,1 %.
+WINDOW_HALF_LIVES = 10
+
+_lock = threading.Lock()
+
+
+def log_weight(weight, when):
+    """Логарифм веса события, приведённого к EPOCH."""
+    return math.log2(weight) + (
+        when.timestamp() - EPOCH
+    ) / settings.TRENDING_HALF_LIFE
+
+
+def log_add(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def current_score(log_score, now=None):
+    """Оценка с учётом затухания на момент now."""
+    now = timezone.now() if now is None else now
+    return 2 ** (log_score - log_weight(1, now))
+
+
+def add_events(scores, events, capacity):
+    """Добавляет события (новость, логарифм веса) в оценки scores."""
+    for news_id, value in events:
+        if news_id in scores:
+            scores[news_id] = log_add(scores[news_id], value)
+        elif len(scores) < capacity:
+            scores[news_id] = value
+        else:
+            evicted = min(scores, key=scores.get)
+            scores[news_id] = log_add(scores.pop(evicted), value)
+    return scores
+
+
+def fetch_scores(now=None):
+    """Точные оценки всех новостей по комментариям из базы."""
+    now = timezone.now() if now is None else now
+    since = now - timedelta(
+        seconds=settings.TRENDING_HALF_LIFE * WINDOW_HALF_LIVES
+    )
+    scores = {}
+    rows = Comment.objects.filter(created__gte=since).values_list(
+        'news_id', 'created'
+    )
+    for news_id, created in rows.iterator():
+        value = log_weight(1, created)
+        scores[news_id] = (
+            log_add(scores[news_id], value) if news_id in scores else value
+        )
+    return scores
+
+
+def top_scores(scores, limit):
+    return dict(sorted(scores.items(), key=lambda item: -item[1])[:limit])
+
+
+def get_scores():
+    """Оценки из кеша; при пустом кеше пересчитываются по комментариям."""
+    state = cache.get(TRENDING_KEY)
+    if state is None:
+        state = {
+            'built_at': time(),
+            'scores': top_scores(fetch_scores(), settings.TRENDING_CAPACITY),
+        }
+        cache.set(TRENDING_KEY, state, settings.TRENDING_TIMEOUT)
+    return state['scores']
+
+
+def get_trending(limit=None):
+    """Популярные новости с текущими оценками, по убыванию оценки."""
+    limit = settings.TRENDING_SIZE if limit is None else limit
+    scores = get_scores()
+    # Удалённые и перенесённые в архив новости пропускаются здесь.
+    news = News.objects.alive().defer('text').in_bulk(list(scores))
+    now = timezone.now()
+    ranked = sorted(
+        (pk for pk in scores if pk in news), key=lambda pk: -scores[pk]
+    )
+    return [
+        (news[pk], current_score(scores[pk], now)) for pk in ranked[:limit]
+    ]
+
+
+def record_events(events):
+    """Добавляет события в оценки в кеше после фиксации транзакции."""
+    events = list(events)
+
+    def apply():
+        with _lock:
+            state = cache.get(TRENDING_KEY)
+            if state is None:
+                return
+            timeout = remaining_timeout(
+                state['built_at'], settings.TRENDING_TIMEOUT
+            )
+            if timeout is not None and timeout <= 0:
+                return
+            add_events(state['scores'], events, settings.TRENDING_CAPACITY)
+            cache.set(TRENDING_KEY, state, timeout)
+    transaction.on_commit(apply)
+
+
+def comments_added(comments):
+    """Учитывает комментарии, сохранённые без сигналов (bulk_create)."""
+    now = timezone.now()
+    record_events(
+        (comment.news_id, log_weight(1, comment.created or now))
+        for comment in comments
+    )
+
+
+def views_added(counts):
+    """Учитывает просмотры {новость: число}, записанные news.page_views."""
+    weight = settings.TRENDING_VIEW_WEIGHT
+    if weight <= 0:
+        return
+    now = timezone.now()
+    record_events(
+        (news_id, log_weight(weight * count, now))
+        for news_id, count in counts.items()
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        comments_added([instance])
@@ -6,6 +6,7 @@ app_name = 'news'
 
 urlpatterns = [
     path('', views.NewsList.as_view(), name='home'),
+    path('trending/', views.TrendingList.as_view(), name='trending'),
     path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
     path(
         'delete_comment/<int:pk>/',
@@ -13,4 +14,12 @@ urlpatterns = [
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path(
+        'reply_comment/<int:pk>/',
+        views.CommentReply.as_view(),
+        name='reply'
+    ),
+    path('thread/<int:pk>/', views.CommentThread.as_view(), name='thread'),
+    path('queries/', views.QueryStats.as_view(), name='query_stats'),
+    path('memory/', views.MemoryStats.as_view(), name='memory_stats'),
 ]
@@ -1,57 +1,165 @@
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db.models import prefetch_related_objects
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import generic
 
+from .archive import get_comment, get_news, is_archived
 from .forms import CommentForm
-from .models import Comment, News
+from .front_page import get_front_page
+from .idempotency import IdempotencyMixin, new_key
+from .ingest import get_comment_queue
+from .memprofile import read_samples, summarize
+from .models import Comment, News, UserDeletion
+from .page_views import get_view_counter
+from .querylog import collect_report, read_slow_queries
+from .streaming import StreamingTemplateMixin, stream_or_list
+from .throttling import ThrottleMixin
+from .trending import get_trending
 
 
-class NewsList(generic.ListView):
-    """Список новостей."""
-    model = News
+class NewsList(generic.TemplateView):
+    """
+    Список последних новостей.
+
+    Страница выводится из снимка главной в кеше (см. news.front_page);
+    их количество определяется в настройках проекта.
+    """
     template_name = 'news/home.html'
 
-    def get_queryset(self):
-        """
-        Выводим только несколько последних новостей.
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['front_page'] = get_front_page()
+        return context
 
-        Их количество определяется в настройках проекта.
-        """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
+class TrendingList(generic.TemplateView):
+    """Популярные новости по затухающей оценке, см. news.trending."""
+    template_name = 'news/trending.html'
 
-class NewsDetail(generic.DetailView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['trending'] = get_trending()
+        return context
+
+
+class NewsCommentsMixin(StreamingTemplateMixin):
+    """
+    Добавляет в контекст ветку комментариев новости self.object.
+
+    Ветка выбирается одним запросом в порядке обхода (см.
+    CommentQuerySet.thread) на COMMENT_THREAD_DEPTH уровней от
+    thread_root или от начала ветки новости; у комментариев последнего
+    уровня hidden_replies — число свёрнутых ответов под ними.
+    """
+    stream_template_name = 'news/comments.html'
+    stream_object_name = 'comments'
+    thread_root = None
+
+    def get_news(self):
+        return self.object
+
+    def get_visible_comments(self):
+        news = self.get_news()
+        comments = news.comment_set.all()
+        if self.thread_root is not None:
+            comments = comments.subtree(self.thread_root)
+        if is_archived(news):
+            # В архиве нет таблицы пользователей: авторы подгружаются из
+            # основной базы отдельным запросом (см. stream_context).
+            hidden = UserDeletion.objects.values_list('pk', flat=True)
+            return comments.exclude(author_id__in=list(hidden))
+        return comments.filter(author__deletion__isnull=True)
+
+    def get_root_depth(self):
+        return 0 if self.thread_root is None else self.thread_root.depth
+
+    def get_comments(self):
+        comments = self.get_visible_comments().thread(
+            settings.COMMENT_THREAD_DEPTH, self.get_root_depth()
+        )
+        if is_archived(self.get_news()):
+            return comments
+        return comments.select_related('author')
+
+    def mark_collapsed(self, comments):
+        for comment in comments:
+            comment.hidden_replies = self.hidden_replies.get(comment.path, 0)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        archived = is_archived(self.get_news())
+        comments, streamed = stream_or_list(self.get_comments())
+        self.hidden_replies = self.get_visible_comments().collapsed(
+            settings.COMMENT_THREAD_DEPTH, self.get_root_depth()
+        )
+        if streamed:
+            # Длинная ветка отдаётся потоком, см. StreamingTemplateMixin.
+            self.stream_queryset = comments
+        else:
+            self.mark_collapsed(comments)
+            if archived:
+                prefetch_related_objects(comments, 'author')
+        context['comments'] = comments
+        context['archived'] = archived
+        return context
+
+    def stream_context(self, chunk):
+        self.mark_collapsed(chunk)
+        if is_archived(self.get_news()):
+            prefetch_related_objects(chunk, 'author')
+        context = super().stream_context(chunk)
+        context['archived'] = is_archived(self.get_news())
+        return context
+
+
+class NewsDetail(NewsCommentsMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
+        """Новость, которой нет в основной базе, ищется в архиве."""
+        obj = get_news(self.kwargs['pk'])
+        if obj is None or obj.deleted_at is not None:
+            raise Http404('Новость не найдена.')
         return obj
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated:
+        context['views'] = self.object.views
+        if settings.PAGE_VIEW_COUNTING and not context['archived']:
+            context['views'] += get_view_counter().hit(self.object.pk)
+        if self.request.user.is_authenticated and not context['archived']:
             context['form'] = CommentForm()
-        comments = self.object.comment_set.all()  # Получаем комментарии
-        context['comments'] = comments  # Добавляем комментарии в контекст
+            context['idempotency_key'] = new_key()
+        if (
+            settings.COMMENT_INGEST_MODE == 'queue'
+            and self.request.user.is_authenticated
+        ):
+            context['pending_comments'] = get_comment_queue().pending_for(
+                self.object.pk, self.request.user.pk
+            )
         return context
 
 
 class NewsComment(
         LoginRequiredMixin,
+        IdempotencyMixin,
+        ThrottleMixin,
+        NewsCommentsMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
     model = News
     form_class = CommentForm
     template_name = 'news/detail.html'
+    throttle_scope = 'comments'
+    idempotency_scope = 'comments'
+
+    def get_queryset(self):
+        return self.model.objects.alive()
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -61,7 +169,10 @@ class NewsComment(
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_INGEST_MODE == 'queue':
+            get_comment_queue().enqueue(comment)
+        else:
+            comment.save()
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -80,6 +191,69 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
+class CommentThread(NewsCommentsMixin, generic.DetailView):
+    """Комментарий со всеми ответами на него, в том числе свёрнутыми."""
+    model = Comment
+    template_name = 'news/thread.html'
+    context_object_name = 'root'
+
+    def get_object(self, queryset=None):
+        comment = get_comment(self.kwargs['pk'])
+        if comment is None or comment.news.deleted_at is not None:
+            raise Http404('Комментарий не найден.')
+        self.thread_root = comment
+        return comment
+
+    def get_news(self):
+        return self.object.news
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['news'] = self.get_news()
+        return context
+
+
+class CommentReply(
+        LoginRequiredMixin, IdempotencyMixin, ThrottleMixin, generic.FormView
+):
+    """Ответ на комментарий."""
+    form_class = CommentForm
+    template_name = 'news/reply.html'
+    throttle_scope = 'comments'
+    idempotency_scope = 'comments'
+
+    def get_parent(self):
+        if not hasattr(self, 'parent'):
+            self.parent = get_object_or_404(
+                Comment.objects.filter(
+                    news__deleted_at__isnull=True,
+                    author__deletion__isnull=True,
+                ).select_related('news'),
+                pk=self.kwargs['pk'],
+            )
+        return self.parent
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['parent'] = self.get_parent()
+        return context
+
+    def form_valid(self, form):
+        comment = form.save(commit=False)
+        comment.author = self.request.user
+        comment.reply_to(self.get_parent())
+        if settings.COMMENT_INGEST_MODE == 'queue':
+            get_comment_queue().enqueue(comment)
+        else:
+            comment.save()
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse(
+            'news:detail', kwargs={'pk': self.get_parent().news_id}
+        ) + '#comments'
+
+
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
@@ -91,16 +265,49 @@ class CommentBase(LoginRequiredMixin):
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями
+        к новостям, которые не удалены.
+        """
+        return self.model.objects.filter(
+            author=self.request.user, news__deleted_at__isnull=True
+        )
 
 
-class CommentUpdate(CommentBase, generic.UpdateView):
+class CommentUpdate(CommentBase, ThrottleMixin, generic.UpdateView):
     """Редактирование комментария."""
     template_name = 'news/edit.html'
     form_class = CommentForm
+    throttle_scope = 'comments'
 
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+class QueryStats(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Сводка SQL-запросов по отпечаткам для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            'queries': collect_report(),
+            'slow': read_slow_queries(limit=50),
+        }, json_dumps_params={'ensure_ascii': False})
+
+
+class MemoryStats(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Сводка профилирования памяти по представлениям для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        samples = read_samples()
+        return JsonResponse({
+            'views': summarize(samples),
+            'recent': samples[:50],
+        }, json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,132 @@
+"""Прогрев процесса перед приёмом первых запросов."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import TemplateSyntaxError, engines
+from django.test import Client, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from .models import News
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def iter_project_templates(engine):
+    """Имена всех шаблонов из каталогов DIRS движка."""
+    for directory in engine.dirs:
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*')):
+            if path.is_file() and path.suffix in TEMPLATE_SUFFIXES:
+                yield path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """
+    Компилирует все шаблоны проекта.
+
+    С кеширующим загрузчиком скомпилированные шаблоны остаются в памяти
+    процесса, и первый запрос не тратит время на разбор. Возвращает
+    список загруженных шаблонов и словарь ошибок компиляции.
+    """
+    loaded, errors = [], {}
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in iter_project_templates(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors[name] = error
+            else:
+                loaded.append(name)
+    return loaded, errors
+
+
+def preresolve_urls(resolver=None):
+    """
+    Заранее компилирует шаблоны URL и таблицы reverse().
+
+    Иначе регулярные выражения и словари обратного разрешения строятся
+    на первом запросе. Возвращает количество обработанных маршрутов.
+    """
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += preresolve_urls(pattern)
+        else:
+            count += 1
+    return count
+
+
+def warmup_urls(news_count=None):
+    """Главная, популярное, последние новости и страницы входа."""
+    if news_count is None:
+        news_count = settings.CACHE_WARMUP_NEWS
+    try:
+        news_ids = list(
+            News.objects.alive().values_list('pk', flat=True)[:news_count]
+        )
+    except DatabaseError:
+        # Процесс должен стартовать и без базы; страницы новостей тогда
+        # не прогреваются.
+        logger.exception('Не удалось выбрать новости для прогрева')
+        news_ids = []
+    return [
+        reverse('news:home'),
+        reverse('news:trending'),
+        *(reverse('news:detail', args=(pk,)) for pk in news_ids),
+        reverse('users:login'),
+        reverse('users:signup'),
+    ]
+
+
+def warmup_host():
+    """Имя хоста из ALLOWED_HOSTS, которое пропустит CommonMiddleware."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def fetch(url, host):
+    """Запрашивает страницу анонимно; возвращает (url, код, секунды)."""
+    client = Client(HTTP_HOST=host, raise_request_exception=False)
+    started = perf_counter()
+    try:
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        response.close()
+        return url, response.status_code, perf_counter() - started
+    finally:
+        for connection in connections.all():
+            connection.close()
+
+
+def warm_cache(news_count=None, threads=None):
+    """
+    Запрашивает самые посещаемые страницы через тестовый клиент.
+
+    Запросы проходят весь стек процесса, поэтому заполняют кеши главной,
+    популярного и пользователей, кеширующий загрузчик шаблонов и всё,
+    что включено в настройках, без отдельного списка. Просмотры
+    прогрева не учитываются. Возвращает [(url, код, секунды)].
+    """
+    if threads is None:
+        threads = settings.CACHE_WARMUP_THREADS
+    urls = warmup_urls(news_count)
+    host = warmup_host()
+    with override_settings(PAGE_VIEW_COUNTING=False):
+        with ThreadPoolExecutor(max(threads, 1)) as pool:
+            return list(pool.map(lambda url: fetch(url, host), urls))
@@ -21,11 +21,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'news.metrics.MetricsMiddleware',
+    'news.querylog.QueryLogMiddleware',
+    'news.memprofile.MemoryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'news.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'news.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -50,14 +54,70 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yanews.wsgi.application'
 
+# Прогрев при создании WSGI-приложения: компиляция всех шаблонов проекта
+# и построение таблиц URL (включены в yanews.settings_production).
+TEMPLATE_WARMUP = False
+URL_PRERESOLVE = False
+
+# Прогрев кешей (news.warmup.warm_cache): главная, популярное,
+# CACHE_WARMUP_NEWS последних новостей и страницы входа запрашиваются
+# через тестовый клиент в CACHE_WARMUP_THREADS потоков. LocMemCache у
+# каждого процесса свой, поэтому CACHE_WARMUP прогревает процесс при
+# создании WSGI-приложения; команда warm_cache годится для общего кеша.
+CACHE_WARMUP = False
+CACHE_WARMUP_NEWS = 10
+CACHE_WARMUP_THREADS = 4
+
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'archive': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'archive.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['news.routers.ArchiveRouter']
+
+# Новости старше ARCHIVE_AFTER_DAYS дней команда archive_news переносит
+# вместе с комментариями в базу ARCHIVE_DATABASE пачками по
+# ARCHIVE_BATCH_SIZE новостей; NewsDetail ищет в архиве то, чего нет в
+# основной базе (см. news.archive).
+ARCHIVE_DATABASE = 'archive'
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 100
+
+CACHES = {
+    'default': {
+        'BACKEND': 'news.metrics.MeteredLocMemCache',
     }
 }
 
+# Режимы хранения сессий: 'db' читает и пишет таблицу django_session
+# на каждый запрос, 'cached_db' читает из кеша и пишет в базу сквозной
+# записью, 'signed_cookies' хранит сессию в подписанной cookie без базы.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = 'cached_db'
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# Сколько секунд держать в кеше пользователя, найденного по сессии.
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Сколько просроченных сессий удаляет prune_sessions за одну транзакцию.
+SESSION_PRUNE_BATCH_SIZE = 500
+
+# Удалённые новости и пользователи только скрываются с сайта; команда
+# purge_deleted удаляет их комментарии пачками по PURGE_BATCH_SIZE,
+# каждая пачка в своей транзакции (см. news.purge).
+PURGE_BATCH_SIZE = 500
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +140,111 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+# Сколько секунд живёт снимок главной страницы в кеше. Снимок обновляется
+# сигналами точечно; срок ограничивает расхождение между процессами,
+# если кеш не общий.
+FRONT_PAGE_TIMEOUT = 300
+
+# Популярные новости (news.trending): комментарий весит 1, просмотр —
+# TRENDING_VIEW_WEIGHT, вес события вдвое падает за TRENDING_HALF_LIFE
+# секунд. Страница показывает TRENDING_SIZE новостей, в кеше хранятся
+# оценки TRENDING_CAPACITY новостей. Оценки обновляются событиями
+# точечно и пересчитываются по комментариям раз в TRENDING_TIMEOUT секунд:
+# это ограничивает расхождение между процессами, если кеш не общий.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_VIEW_WEIGHT = 0.05
+TRENDING_SIZE = 10
+TRENDING_CAPACITY = 200
+TRENDING_TIMEOUT = 60 * 60
+
+# Ответы на комментарии: ветка не глубже COMMENT_MAX_DEPTH уровней (не
+# больше 25 — столько ключей помещается в путь комментария), на странице
+# новости видны COMMENT_THREAD_DEPTH уровней, а более глубокие ответы
+# свёрнуты в ссылку на страницу ответа с их числом.
+COMMENT_MAX_DEPTH = 8
+COMMENT_THREAD_DEPTH = 4
+
+# Страницы, где список длиннее STREAMING_THRESHOLD элементов (ветка
+# комментариев), отдаются потоком пачками по STREAMING_CHUNK_SIZE.
+# None отключает потоковую отдачу.
+STREAMING_THRESHOLD = 500
+STREAMING_CHUNK_SIZE = 200
+
+# Сжатие ответов: тела короче COMPRESSION_MIN_LENGTH байт не сжимаются,
+# потоковые ответы сжимаются по частям. Кодировка br используется при
+# установленном пакете brotli, иначе gzip.
+COMPRESSION_MIN_LENGTH = 1024
+COMPRESSION_LEVEL = 6
+
+# Учёт SQL-запросов (news.querylog): отпечатки запросов с числом и
+# гистограммой времени по представлениям. Процесс раз в
+# QUERY_LOG_FLUSH_INTERVAL секунд сбрасывает отчёт в QUERY_LOG_DIR, туда же
+# пишется журнал запросов дольше SLOW_QUERY_THRESHOLD секунд. По умолчанию
+# учёт выключен, в боевом окружении его включает settings_production.
+QUERY_LOG_ENABLED = False
+QUERY_LOG_DIR = BASE_DIR / 'querylog'
+QUERY_LOG_FLUSH_INTERVAL = 10
+SLOW_QUERY_THRESHOLD = 0.1
+
+# Метрики для Prometheus (news.metrics) по адресу /metrics: запросы, SQL,
+# чтения кеша и отклонённые формы. Процесс раз в METRICS_FLUSH_INTERVAL
+# секунд копирует свои значения в отображённый в память файл в
+# METRICS_DIR, а /metrics складывает файлы всех процессов. По умолчанию
+# метрики выключены, в боевом окружении их включает settings_production.
+# /metrics отвечает адресам из METRICS_ALLOWED_IPS и персоналу; за обратным
+# прокси REMOTE_ADDR — адрес прокси, и доступ к /metrics извне нужно
+# закрыть на нём.
+METRICS_ENABLED = False
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# Профилирование памяти (news.memprofile) включается явно: доля
+# MEMORY_PROFILE_SAMPLE_RATE запросов выполняется под tracemalloc с
+# глубиной стека MEMORY_PROFILE_FRAMES. Для них записываются пик и остаток
+# памяти и MEMORY_PROFILE_TOP мест выделения; последние
+# MEMORY_PROFILE_HISTORY замеров процесса хранятся в MEMORY_PROFILE_DIR.
+MEMORY_PROFILING = False
+MEMORY_PROFILE_SAMPLE_RATE = 0.01
+MEMORY_PROFILE_FRAMES = 10
+MEMORY_PROFILE_TOP = 10
+MEMORY_PROFILE_HISTORY = 200
+MEMORY_PROFILE_DIR = BASE_DIR / 'memprofile'
+
+# Просмотры новостей (news.page_views) копятся в памяти процесса и
+# записываются раз в PAGE_VIEW_FLUSH_INTERVAL секунд (0 — без потока)
+# пачками по PAGE_VIEW_FLUSH_BATCH_SIZE новостей; при падении процесса
+# теряются просмотры не больше чем за интервал.
+PAGE_VIEW_COUNTING = True
+PAGE_VIEW_FLUSH_INTERVAL = 5
+PAGE_VIEW_FLUSH_BATCH_SIZE = 500
+
+# Приём комментариев: 'sync' сохраняет комментарий в запросе, 'queue'
+# ставит его в очередь с журналом на диске, а фоновый поток пишет очередь
+# пачками раз в COMMENT_INGEST_FLUSH_INTERVAL секунд (0 — без потока).
+# COMMENT_INGEST_FSYNC защищает журнал и от падения ОС ценой fsync.
+COMMENT_INGEST_MODE = 'sync'
+COMMENT_INGEST_BATCH_SIZE = 100
+COMMENT_INGEST_FLUSH_INTERVAL = 0.5
+COMMENT_INGEST_SPOOL_DIR = BASE_DIR / 'spool'
+COMMENT_INGEST_FSYNC = False
+
+# Ключи идемпотентности (news.idempotency): повтор POST формы с тем же
+# ключом в течение IDEMPOTENCY_TTL секунд получает исходный редирект без
+# записи в базу; повтор во время первого запроса ждёт его до
+# IDEMPOTENCY_WAIT секунд. LocalMemoryStore держит не больше
+# IDEMPOTENCY_MAX_KEYS ключей в процессе, news.idempotency.CacheStore
+# хранит ключи в общем кеше процессов.
+IDEMPOTENCY_BACKEND = 'news.idempotency.LocalMemoryStore'
+IDEMPOTENCY_TTL = 60 * 60
+IDEMPOTENCY_WAIT = 5
+IDEMPOTENCY_MAX_KEYS = 10000
+
+# Ограничение частоты записей: корзины токенов на пользователя и на IP
+# для каждой области. Пустое значение области отключает ограничение.
+# news.throttling.CacheBackend хранит корзины в общем кеше процессов.
+THROTTLE_BACKEND = 'news.throttling.LocalMemoryBackend'
+THROTTLE_RATES = {
+    'comments': {'user': '20/m', 'ip': '200/m'},
+}
@@ -0,0 +1,32 @@
+"""
+Настройки боевого окружения.
+
+Подключаются через DJANGO_SETTINGS_MODULE=yanews.settings_production.
+"""
+from copy import deepcopy
+
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES as BASE_TEMPLATES
+
+DEBUG = False
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# Кеширующий загрузчик разбирает каждый шаблон один раз за жизнь процесса.
+TEMPLATES = deepcopy(BASE_TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+]
+
+# Прогрев при создании WSGI-приложения.
+TEMPLATE_WARMUP = True
+URL_PRERESOLVE = True
+CACHE_WARMUP = True
+
+# Учёт SQL-запросов и метрики для Prometheus.
+QUERY_LOG_ENABLED = True
+METRICS_ENABLED = True
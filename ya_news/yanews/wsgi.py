@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
 
 application = get_wsgi_application()
+
+if (
+    settings.TEMPLATE_WARMUP
+    or settings.URL_PRERESOLVE
+    or settings.CACHE_WARMUP
+):
+    from news.warmup import preresolve_urls, warm_cache, warm_templates
+
+    if settings.TEMPLATE_WARMUP:
+        warm_templates()
+    if settings.URL_PRERESOLVE:
+        preresolve_urls()
+    if settings.CACHE_WARMUP:
+        warm_cache()
@@ -1,5 +1,35 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
 from .models import Note
+from .purge import soft_delete_users
+
+User = get_user_model()
 
 admin.site.register(Note)
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class SoftDeleteUserAdmin(UserAdmin):
+    """
+    Удаление только блокирует пользователей, см. notes.purge.
+
+    Страница подтверждения не собирает заметки: их удалит команда
+    purge_deleted.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(deletion__isnull=True)
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        model_count = {self.opts.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, set(), []
+
+    def delete_model(self, request, obj):
+        soft_delete_users(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_users(queryset)
@@ -0,0 +1,85 @@
+"""
+Кеширование пользователя, найденного по сессии.
+
+Стандартный AuthenticationMiddleware на каждый запрос выбирает
+пользователя из auth_user. Здесь найденный пользователь кладётся в кеш
+по ключу сессии на AUTH_USER_CACHE_TIMEOUT секунд. Любое сохранение или
+удаление пользователя (в том числе смена пароля) меняет его версию,
+и все закешированные копии перестают совпадать.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+USER_KEY = 'auth-user:{}'
+VERSION_KEY = 'auth-user-version:{}'
+
+
+def get_user_version(user_id):
+    """Текущая версия пользователя; создаётся при первом обращении."""
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user(user_id):
+    """Делает недействительными все закешированные копии пользователя."""
+    cache.set(VERSION_KEY.format(user_id), uuid4().hex, None)
+
+
+def get_user(request):
+    """Аналог django.contrib.auth.get_user с кешем по ключу сессии."""
+    session = request.session
+    try:
+        user_id = auth.get_user_model()._meta.pk.to_python(
+            session[auth.SESSION_KEY]
+        )
+    except KeyError:
+        return AnonymousUser()
+    if not session.session_key:
+        return auth.get_user(request)
+    key = USER_KEY.format(session.session_key)
+    version = get_user_version(user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        cached_version, user = cached
+        session_hash = session.get(auth.HASH_SESSION_KEY)
+        if (
+            cached_version == version
+            and user.pk == user_id
+            and session_hash
+            and constant_time_compare(
+                session_hash, user.get_session_auth_hash()
+            )
+        ):
+            return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, (version, user), settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Подставляет в request.user пользователя из кеша."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """Смена пароля, правка или удаление пользователя сбрасывают кеш."""
+    invalidate_user(instance.pk)
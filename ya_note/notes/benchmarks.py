@@ -0,0 +1,191 @@
+"""
+Сценарии замеров производительности.
+
+Каждый сценарий регистрируется декоратором benchmark и запускается
+командой ``python manage.py benchmark <имя>`` на временной тестовой базе.
+"""
+import json
+import random
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Note, NoteRevision
+from .revisions import load_chain, reconstruct
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Регистрирует сценарий замера под указанным именем."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def revision_size(revision):
+    if revision.is_snapshot:
+        return len(revision.snapshot.encode())
+    return len(json.dumps(revision.delta, ensure_ascii=False).encode())
+
+
+@benchmark('note_revisions')
+def note_revisions(write, revisions=500, words=1000, reads=200):
+    """Объём истории и время восстановления версии при разных интервалах."""
+    author = get_user_model().objects.create(username='bench-revisions')
+    vocabulary = [f'слово{index}' for index in range(200)]
+    randomizer = random.Random(0)
+    for interval in (1, 20, 100):
+        with override_settings(NOTE_REVISION_SNAPSHOT_INTERVAL=interval):
+            text = ' '.join(randomizer.choices(vocabulary, k=words))
+            note = Note.objects.create(
+                title='Черновик', text=text, author=author,
+                slug=f'bench-revisions-{interval}',
+            )
+            full_copies = len(text.encode())
+            started = perf_counter()
+            for _ in range(revisions - 1):
+                tokens = note.text.split(' ')
+                for _ in range(3):
+                    position = randomizer.randrange(len(tokens))
+                    tokens[position] = randomizer.choice(vocabulary)
+                note.text = ' '.join(tokens)
+                note.save()
+                full_copies += len(note.text.encode())
+            saving = (perf_counter() - started) / (revisions - 1)
+        stored = sum(
+            revision_size(revision)
+            for revision in NoteRevision.objects.filter(note=note)
+        )
+        numbers = [randomizer.randint(1, revisions) for _ in range(reads)]
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            for number in numbers:
+                reconstruct(load_chain(note, number))
+            reading = (perf_counter() - started) / reads
+        write(
+            f'интервал {interval:>3}: история {stored / 1024:.0f} КБ '
+            f'(полные копии {full_copies / 1024:.0f} КБ), '
+            f'сохранение {saving * 1000:.2f} мс, '
+            f'восстановление {reading * 1000:.2f} мс, '
+            f'{len(queries) / reads:.0f} запроса'
+        )
+
+
+@benchmark('bulk_notes')
+def bulk_notes(write, count=1000):
+    """Действия над 1000 выбранных заметок против обработки по одной."""
+    author = get_user_model().objects.create(username='bench-bulk')
+    client = Client()
+    client.force_login(author)
+
+    def create_notes():
+        return [
+            Note.objects.create(
+                title=f'Заметка {index}', text='Текст заметки. ' * 20,
+                slug=f'bench-bulk-{index}', author=author,
+            ).pk
+            for index in range(count)
+        ]
+
+    def run(action, pks, **data):
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            response = client.post(
+                reverse('notes:bulk'),
+                {'action': action, 'notes': pks, **data},
+            )
+            assert response.status_code in (200, 302), response.status_code
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            finished = perf_counter()
+        summary = f'{(finished - started) * 1000:.0f} мс, '
+        summary += f'запросов {len(queries)}'
+        if response.streaming:
+            summary += f', выгружено {size / 1024:.0f} КБ'
+        return summary
+
+    with override_settings(THROTTLE_RATES={}):
+        pks = create_notes()
+        write(f'выгрузка: {run("export", pks)}')
+        write(f'префикс: {run("prefix", pks, prefix="[Архив] ")}')
+        write(f'удаление: {run("delete", pks)}')
+
+        create_notes()
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            for slug in Note.objects.for_author(author).values_list(
+                'slug', flat=True
+            ):
+                client.post(reverse('notes:delete', args=(slug,)))
+            finished = perf_counter()
+        write(
+            f'удаление по одной: {(finished - started) * 1000:.0f} мс, '
+            f'запросов {len(queries)}'
+        )
+
+
+def concurrent_writes(authors, action):
+    """Время, за которое потоки выполняют action(author) одновременно."""
+    barrier = threading.Barrier(len(authors) + 1)
+
+    def run(author):
+        try:
+            barrier.wait()
+            action(author)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=run, args=(author,)) for author in authors
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = perf_counter()
+    for thread in threads:
+        thread.join()
+    return perf_counter() - started
+
+
+@benchmark('sharding')
+def sharding(write, users=16, writes=50):
+    """Запись заметок параллельными пользователями при 1, 2 и 4 базах."""
+    authors = [
+        get_user_model().objects.create(username=f'bench-shard-{index}')
+        for index in range(users)
+    ]
+    aliases = list(settings.DATABASES)
+    total = users * writes
+    for count in (1, 2, 4):
+        shards = aliases[:count]
+
+        def create(author):
+            for index in range(writes):
+                Note.objects.create(
+                    title='Заметка', text='Текст заметки. ' * 20,
+                    slug=f'bench-shard-{count}-{author.pk}-{index}',
+                    author=author,
+                )
+
+        def update(author):
+            notes = list(Note.objects.for_author(author))
+            for index in range(writes):
+                note = notes[index % len(notes)]
+                note.text += f' правка {index}'
+                note.save()
+
+        with override_settings(NOTES_SHARDS=shards):
+            creating = concurrent_writes(authors, create)
+            updating = concurrent_writes(authors, update)
+        write(
+            f'баз {count}: создание {total / creating:.0f} заметок/с, '
+            f'правка {total / updating:.0f} заметок/с'
+        )
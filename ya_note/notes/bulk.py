@@ -0,0 +1,115 @@
+"""
+Действия над несколькими заметками сразу.
+
+Заметки приходят уже отфильтрованными по автору (см. NoteBulk), поэтому
+здесь ограничение владельцем соблюдается за счёт самого queryset.
+"""
+import json
+
+from pytils.translit import slugify
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Note, NoteRevision, NoteSlug, raw_delete
+from .note_cache import notes_deleted, notes_saved
+from .revisions import record_title_changes
+
+SLUG_LENGTH = Note._meta.get_field('slug').max_length
+TITLE_LENGTH = Note._meta.get_field('title').max_length
+# Столько условий slug LIKE попадает в один запрос к реестру.
+SLUG_QUERY_BATCH = 100
+
+
+def delete_notes(author, queryset):
+    """
+    Удаляет заметки одним запросом DELETE; возвращает их количество.
+
+    Обычный QuerySet.delete() из-за сигналов выбирает и удаляет заметки
+    по одной пачке за другой, поэтому здесь используется raw_delete, а
+    зависимые версии и кеш обрабатываются явно.
+    """
+    db = queryset.db
+    pks = list(queryset.values_list('pk', flat=True))
+    with transaction.atomic(), transaction.atomic(using=db):
+        NoteRevision.objects.using(db).filter(note__in=pks).delete()
+        deleted = raw_delete(
+            Note.objects.using(db).filter(author=author, pk__in=pks)
+        )
+        raw_delete(NoteSlug.objects.filter(pk__in=pks))
+    notes_deleted(author.pk, pks)
+    return deleted
+
+
+def unique_slugs(notes):
+    """
+    Присваивает заметкам slug из заголовка, не занятый другими.
+
+    Занятыми считаются все slug реестра, начинающиеся с нового slug
+    заметки, включая уже выданные с суффиксом. Текущие slug выбранных
+    заметок тоже считаются занятыми (кроме собственного): SQLite
+    проверяет уникальность построчно, и обмен slug между заметками
+    внутри одного UPDATE привёл бы к ошибке.
+    """
+    wanted = {note.pk: slugify(note.title)[:SLUG_LENGTH] for note in notes}
+    taken = {note.slug for note in notes}
+    bases = sorted(set(wanted.values()))
+    for start in range(0, len(bases), SLUG_QUERY_BATCH):
+        condition = Q()
+        for base in bases[start:start + SLUG_QUERY_BATCH]:
+            condition |= Q(slug__startswith=base)
+        taken.update(
+            NoteSlug.objects.filter(condition).exclude(
+                pk__in=list(wanted)
+            ).values_list('slug', flat=True)
+        )
+    for note in notes:
+        slug = candidate = wanted[note.pk]
+        suffix = 1
+        while candidate in taken and candidate != note.slug:
+            suffix += 1
+            tail = f'-{suffix}'
+            candidate = slug[:SLUG_LENGTH - len(tail)] + tail
+        note.slug = candidate
+        taken.add(candidate)
+
+
+def prefix_notes(author, queryset, prefix):
+    """
+    Добавляет префикс к заголовкам в одной транзакции.
+
+    Новые slug сначала занимаются в реестре и только потом
+    записываются в базу заметок автора: если slug успел занять другой
+    запрос, IntegrityError возникает до записи в базу заметок, и обе
+    транзакции откатываются.
+    """
+    notes = list(queryset)
+    for note in notes:
+        note.title = (prefix + note.title)[:TITLE_LENGTH]
+    db = queryset.db
+    with transaction.atomic():
+        unique_slugs(notes)
+        NoteSlug.objects.bulk_update(
+            [NoteSlug(pk=note.pk, slug=note.slug) for note in notes],
+            ('slug',), batch_size=500,
+        )
+        with transaction.atomic(using=db):
+            Note.objects.using(db).bulk_update(
+                notes, ('title', 'slug'), batch_size=500
+            )
+            record_title_changes(notes)
+            notes_saved(author.pk, notes)
+    return len(notes)
+
+
+def export_notes(queryset):
+    """Заметки массивом JSON по частям, не загружая их все разом."""
+    yield '['
+    separator = ''
+    for note in queryset.only('title', 'slug', 'text').iterator():
+        yield separator + json.dumps(
+            {'title': note.title, 'slug': note.slug, 'text': note.text},
+            ensure_ascii=False,
+        )
+        separator = ',\n'
+    yield ']\n'
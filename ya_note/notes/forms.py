@@ -3,7 +3,8 @@ from pytils.translit import slugify
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Note
+from .metrics import FORM_ERRORS
+from .models import Note, NoteSlug
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
 
@@ -22,8 +23,50 @@ class NoteForm(forms.ModelForm):
         if not slug:
             title = cleaned_data.get('title')
             slug = slugify(title)[:100]
-        if Note.objects.filter(
+        if NoteSlug.objects.filter(
                 slug=slug
         ).exclude(id=self.instance.pk).exists():
+            FORM_ERRORS.inc('note', 'slug_taken')
             raise ValidationError(slug + WARNING)
         return slug
+
+
+class BulkNoteForm(forms.Form):
+    """Форма для действий над несколькими заметками сразу."""
+    DELETE = 'delete'
+    EXPORT = 'export'
+    PREFIX = 'prefix'
+
+    notes = forms.ModelMultipleChoiceField(
+        label='Заметки',
+        queryset=Note.objects.none(),
+    )
+    action = forms.ChoiceField(
+        label='Действие',
+        choices=(
+            (DELETE, 'Удалить'),
+            (EXPORT, 'Выгрузить'),
+            (PREFIX, 'Добавить к заголовку префикс'),
+        ),
+    )
+    prefix = forms.CharField(
+        label='Префикс',
+        max_length=50,
+        required=False,
+        strip=False,
+        help_text='Например, метка «[Работа] »; slug пересоздаётся.',
+    )
+
+    def __init__(self, *args, queryset, **kwargs):
+        """Выбирать можно только из переданных заметок."""
+        super().__init__(*args, **kwargs)
+        self.fields['notes'].queryset = queryset
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (
+            cleaned_data.get('action') == self.PREFIX
+            and not cleaned_data.get('prefix')
+        ):
+            self.add_error('prefix', 'Укажите префикс.')
+        return cleaned_data
@@ -0,0 +1,64 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from notes.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает сценарии замеров производительности на временной '
+        'тестовой базе данных в файле: так запись и блокировки SQLite '
+        'стоят столько же, сколько в рабочей базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Имена сценариев; без аргументов запускаются все.',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Показать доступные сценарии и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, func in BENCHMARKS.items():
+                self.stdout.write(f'{name}: {func.__doc__}')
+            return
+        names = options['names'] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные сценарии: ' + ', '.join(sorted(unknown))
+            )
+        # Как и тестовый раннер: с DEBUG = True журнал запросов рос бы
+        # вместе с числом запросов и искажал замеры памяти.
+        setup_test_environment(debug=False)
+        with TemporaryDirectory() as directory:
+            old_names = {}
+            for connection in connections.all():
+                connection.settings_dict['TEST']['NAME'] = str(
+                    Path(directory) / f'benchmark-{connection.alias}.sqlite3'
+                )
+                old_names[connection] = connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True
+                )
+            try:
+                for name in names:
+                    self.stdout.write(self.style.MIGRATE_HEADING(name))
+                    BENCHMARKS[name](self.stdout.write)
+            finally:
+                for connection, old_name in old_names.items():
+                    connection.creation.destroy_test_db(
+                        old_name, verbosity=0
+                    )
+                teardown_test_environment()
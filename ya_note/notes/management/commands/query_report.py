@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from notes.querylog import collect_report, percentile_ms, read_slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает сводку SQL-запросов всех процессов по отпечаткам и '
+        'представлениям и последние медленные запросы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Сколько отпечатков с наибольшим суммарным временем вывести.',
+        )
+        parser.add_argument(
+            '--view',
+            help='Показать только запросы этого представления.',
+        )
+        parser.add_argument(
+            '--slow',
+            type=int,
+            default=10,
+            help='Сколько последних медленных запросов вывести.',
+        )
+
+    def handle(self, *args, **options):
+        report = collect_report()
+        if options['view']:
+            report = [
+                entry for entry in report if entry['view'] == options['view']
+            ]
+        self.stdout.write(
+            f'{"всего, мс":>10} {"число":>7} {"средн.":>7} {"p95 ≤":>6}  '
+            'представление: запрос'
+        )
+        for entry in report[:options['limit']]:
+            p95 = percentile_ms(entry, 0.95)
+            self.stdout.write(
+                f'{entry["total_ms"]:>10.1f} {entry["count"]:>7} '
+                f'{entry["total_ms"] / entry["count"]:>7.2f} '
+                f'{p95 if p95 is not None else "—":>6}  '
+                f'{entry["view"]}: {entry["fingerprint"][:200]}'
+            )
+        slow = read_slow_queries(limit=options['slow'])
+        if slow:
+            self.stdout.write(self.style.MIGRATE_HEADING('Медленные запросы'))
+        for record in slow:
+            self.stdout.write(
+                f'{record["time"]} {record["duration_ms"]:.1f} мс '
+                f'{record["view"]} ({record["origin"]}): {record["sql"][:200]}'
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import Note
+from notes.sharding import misplaced_authors, move_author
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит заметки авторов в базы, выбранные для них по '
+        'NOTES_SHARDS. Запускается после изменения списка баз; пока '
+        'заметки автора не перенесены, они не видны на сайте.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, кого и куда нужно перенести.',
+        )
+
+    def handle(self, *args, **options):
+        authors = notes = 0
+        for author_id, source, target in list(misplaced_authors()):
+            if options['dry_run']:
+                moved = Note.objects.using(source).filter(
+                    author_id=author_id
+                ).count()
+            else:
+                moved = move_author(author_id, source, target)
+            self.stdout.write(
+                f'автор {author_id}: {source} -> {target}, '
+                f'заметок {moved}'
+            )
+            authors += 1
+            notes += moved
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Авторов: {authors}, заметок: {notes}'
+            )
+        )
@@ -0,0 +1,26 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны проекта: проверяет их перед выкладкой '
+        'и показывает, сколько времени занимает прогрев при старте.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        loaded, errors = warm_templates()
+        elapsed = (perf_counter() - started) * 1000
+        for name in loaded:
+            self.stdout.write(f'  {name}', self.style.SQL_FIELD)
+        self.stdout.write(
+            f'Скомпилировано шаблонов: {len(loaded)} за {elapsed:.1f} мс'
+        )
+        if errors:
+            for name, error in errors.items():
+                self.stderr.write(f'{name}: {error}')
+            raise CommandError(f'Ошибок компиляции: {len(errors)}')
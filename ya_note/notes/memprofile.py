@@ -0,0 +1,243 @@
+"""
+Профилирование памяти по представлениям.
+
+При MEMORY_PROFILING = True доля MEMORY_PROFILE_SAMPLE_RATE запросов
+выполняется под tracemalloc. Для каждого такого запроса записываются
+пик выделенной памяти, память, занятая к концу запроса, и
+MEMORY_PROFILE_TOP мест выделения. Место — ближайшая строка кода проекта
+в стеке выделения, поэтому list(queryset) в представлении виден как
+строка представления, а не как модуль ORM. Места считаются по снимку,
+снятому, пока ответ ещё жив: контекст TemplateResponse держит
+выбранные для шаблона объекты.
+
+tracemalloc видит выделения всех потоков процесса, поэтому под
+профилированием одновременно выполняется не больше одного запроса. Если
+tracemalloc уже запущен (python -X tracemalloc), запросы не
+профилируются, чтобы не остановить чужую трассировку.
+Последние MEMORY_PROFILE_HISTORY замеров процесс сохраняет в
+MEMORY_PROFILE_DIR, откуда их собирают команда memory_report и страница
+для персонала.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPORT_PATTERN = 'memory-{}.json'
+KIB = 1024
+
+_samples = deque()
+_lock = threading.Lock()
+
+
+def allocation_site(traceback):
+    """Ближайшая к выделению строка кода проекта или самого выделения."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback):
+        if (
+            frame.filename.startswith(base_dir)
+            and frame.filename != __file__
+            and 'site-packages' not in frame.filename
+        ):
+            path = os.path.relpath(frame.filename, base_dir)
+            return f'{path}:{frame.lineno}'
+    frame = traceback[-1]
+    path = frame.filename.rpartition('site-packages' + os.sep)[2]
+    return f'{path}:{frame.lineno}'
+
+
+def top_sites(snapshot, limit):
+    """Места выделения с наибольшим объёмом, в КиБ."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    sites = {}
+    for statistic in snapshot.statistics('traceback'):
+        site = allocation_site(statistic.traceback)
+        size, count = sites.get(site, (0, 0))
+        sites[site] = (size + statistic.size, count + statistic.count)
+    ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+    return [
+        {'site': site, 'size_kb': round(size / KIB, 1), 'count': count}
+        for site, (size, count) in ranked[:limit]
+    ]
+
+
+def measure(request, response):
+    """Замер запроса, выполненного под tracemalloc; трассировку снимает."""
+    try:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    match = request.resolver_match
+    return {
+        'time': timezone.now().isoformat(),
+        'view': match.view_name if match else '-',
+        'path': request.path,
+        'status': response.status_code,
+        'peak_kb': round(peak / KIB, 1),
+        'net_kb': round(current / KIB, 1),
+        'sites': top_sites(snapshot, settings.MEMORY_PROFILE_TOP),
+    }
+
+
+def record(sample):
+    """Добавляет замер к последним замерам процесса и сохраняет их."""
+    _samples.append(sample)
+    while len(_samples) > settings.MEMORY_PROFILE_HISTORY:
+        _samples.popleft()
+    write_report()
+
+
+def write_report(directory=None):
+    """Сохраняет замеры процесса в файл; запись атомарна."""
+    directory = Path(directory or settings.MEMORY_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / REPORT_PATTERN.format(os.getpid())
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(list(_samples)), encoding='utf-8')
+    os.replace(temporary, path)
+
+
+def clear():
+    _samples.clear()
+
+
+def read_samples(directory=None):
+    """Замеры всех процессов, новые первыми."""
+    directory = Path(directory or settings.MEMORY_PROFILE_DIR)
+    samples = []
+    for path in directory.glob(REPORT_PATTERN.format('*')):
+        try:
+            samples.extend(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            logger.warning('Пропущен повреждённый отчёт %s', path)
+    samples.sort(key=lambda sample: sample['time'], reverse=True)
+    return samples
+
+
+def summarize(samples, top=None):
+    """
+    Сводка по представлениям по убыванию наибольшего пика: число замеров,
+    пик, средние пик и остаток и места выделения со средним объёмом.
+    """
+    top = settings.MEMORY_PROFILE_TOP if top is None else top
+    views = {}
+    for sample in samples:
+        entry = views.setdefault(sample['view'], {
+            'view': sample['view'], 'samples': 0, 'max_peak_kb': 0,
+            'max_peak_path': None, 'peak_kb': 0.0, 'net_kb': 0.0,
+            'sites': {},
+        })
+        entry['samples'] += 1
+        entry['peak_kb'] += sample['peak_kb']
+        entry['net_kb'] += sample['net_kb']
+        if sample['peak_kb'] >= entry['max_peak_kb']:
+            entry['max_peak_kb'] = sample['peak_kb']
+            entry['max_peak_path'] = sample['path']
+        for site in sample['sites']:
+            entry['sites'][site['site']] = (
+                entry['sites'].get(site['site'], 0) + site['size_kb']
+            )
+    for entry in views.values():
+        count = entry['samples']
+        entry['peak_kb'] = round(entry['peak_kb'] / count, 1)
+        entry['net_kb'] = round(entry['net_kb'] / count, 1)
+        entry['sites'] = [
+            {'site': site, 'size_kb': round(size / count, 1)}
+            for site, size in sorted(
+                entry['sites'].items(), key=lambda item: item[1],
+                reverse=True,
+            )[:top]
+        ]
+    return sorted(
+        views.values(), key=lambda entry: entry['max_peak_kb'], reverse=True
+    )
+
+
+class ProfiledContent:
+    """
+    Тело потокового ответа, после отдачи которого снимается замер.
+
+    Замер снимается и при close(), который сервер вызывает, даже если
+    клиент ушёл, не дочитав ответ.
+    """
+
+    def __init__(self, content, finish):
+        self._content = iter(content)
+        self._finish = finish
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._content)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._finish is None:
+            return
+        finish, self._finish = self._finish, None
+        try:
+            if hasattr(self._content, 'close'):
+                self._content.close()
+        finally:
+            finish()
+
+
+class MemoryProfileMiddleware:
+    """
+    Профилирует память части запросов.
+
+    Потоковый ответ профилируется до конца отдачи тела: его строки
+    выбираются и рендерятся уже после выхода из представления.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            not settings.MEMORY_PROFILING
+            or random.random() >= settings.MEMORY_PROFILE_SAMPLE_RATE
+            or tracemalloc.is_tracing()
+            or not _lock.acquire(blocking=False)
+        ):
+            return self.get_response(request)
+        try:
+            tracemalloc.start(settings.MEMORY_PROFILE_FRAMES)
+            response = self.get_response(request)
+        except BaseException:
+            tracemalloc.stop()
+            _lock.release()
+            raise
+        if response.streaming:
+            response.streaming_content = ProfiledContent(
+                response.streaming_content,
+                lambda: self.finish(request, response),
+            )
+        else:
+            self.finish(request, response)
+        return response
+
+    def finish(self, request, response):
+        try:
+            record(measure(request, response))
+        except OSError:
+            logger.exception('Не удалось сохранить замер памяти')
+        finally:
+            _lock.release()
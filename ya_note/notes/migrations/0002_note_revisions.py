@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-19 01:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_first_revisions(apps, schema_editor):
+    Note = apps.get_model('notes', 'Note')
+    NoteRevision = apps.get_model('notes', 'NoteRevision')
+    NoteRevision.objects.bulk_create(
+        (
+            NoteRevision(
+                note_id=note.pk, number=1, title=note.title,
+                snapshot=note.text,
+            )
+            for note in Note.objects.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=100)),
+                ('snapshot', models.TextField(blank=True, null=True)),
+                ('delta', models.JSONField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='notes.note')),
+            ],
+            options={
+                'ordering': ('note', 'number'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(fields=('note', 'number'), name='unique_note_revision'),
+        ),
+        migrations.RunPython(create_first_revisions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.15 on 2026-10-19 01:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def register_notes(apps, schema_editor):
+    # До разделения все заметки лежат в default, и реестр получает их ключи.
+    alias = schema_editor.connection.alias
+    Note = apps.get_model('notes', 'Note')
+    NoteSlug = apps.get_model('notes', 'NoteSlug')
+    NoteSlug.objects.using(alias).bulk_create(
+        (
+            NoteSlug(pk=note.pk, slug=note.slug, author_id=note.author_id)
+            for note in Note.objects.using(alias).iterator()
+        ),
+        batch_size=500,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0003_user_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteSlug',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(register_notes, migrations.RunPython.noop),
+    ]
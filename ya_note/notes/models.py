@@ -1,9 +1,57 @@
+from collections import defaultdict
+
 from django.conf import settings
-from django.db import models
+from django.db import DatabaseError, models, router, transaction
 
 from pytils.translit import slugify
 
 
+def raw_delete(queryset):
+    """
+    Удаляет строки queryset одним запросом DELETE; возвращает их число.
+
+    В отличие от QuerySet.delete() не выбирает строки в Python, не
+    отправляет сигналы и не удаляет зависимые объекты: связанные строки
+    и кеши вызывающий код обрабатывает сам. Опирается на закрытый
+    QuerySet._raw_delete, поэтому все такие удаления проходят здесь.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+class NoteQuerySet(models.QuerySet):
+
+    def for_author(self, author):
+        """Заметки автора из базы, где они хранятся (см. notes.routers)."""
+        return self.using(
+            router.db_for_read(self.model, instance=author)
+        ).filter(author=author)
+
+    def create(self, **kwargs):
+        # QuerySet.create() передаёт в save() базу запроса, а без явной
+        # базы заметка должна попасть в базу автора.
+        if self._db is not None:
+            return super().create(**kwargs)
+        note = self.model(**kwargs)
+        note.save()
+        return note
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create не вызывает save(): ключи из реестра выдаются здесь,
+        # а заметки без явной базы раскладываются по базам авторов.
+        objs = list(objs)
+        NoteSlug.objects.register(objs)
+        if self._db is not None:
+            return super().bulk_create(objs, *args, **kwargs)
+        shards = defaultdict(list)
+        for note in objs:
+            shards[router.db_for_write(self.model, instance=note)].append(
+                note
+            )
+        for alias, notes in shards.items():
+            self.using(alias).bulk_create(notes, *args, **kwargs)
+        return objs
+
+
 class Note(models.Model):
     title = models.CharField(
         'Заголовок',
@@ -28,11 +76,137 @@ class Note(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = NoteQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        note = super().from_db(db, field_names, values)
+        note._registered_slug = note.__dict__.get('slug')
+        return note
+
     def save(self, *args, **kwargs):
         if not self.slug:
             max_slug_length = self._meta.get_field('slug').max_length
             self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        if self.pk is None:
+            # Ключ новой заметки выдаёт реестр, поэтому он уникален во всех
+            # базах заметок и не меняется при переезде автора.
+            NoteSlug.objects.register([self])
+            kwargs['force_insert'] = True
+            try:
+                super().save(*args, **kwargs)
+            except DatabaseError:
+                NoteSlug.objects.filter(pk=self.pk).delete()
+                self.pk = None
+                raise
+        else:
+            if (
+                'slug' not in self.get_deferred_fields()
+                and self.slug != getattr(self, '_registered_slug', None)
+            ):
+                NoteSlug.objects.filter(pk=self.pk).update(slug=self.slug)
+            super().save(*args, **kwargs)
+        self._registered_slug = self.slug
+
+
+class NoteRevision(models.Model):
+    """
+    Версия заметки.
+
+    Хранит либо полный текст (snapshot), либо правку (delta) относительно
+    предыдущей версии; формат правки описан в notes.revisions.
+    """
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+    )
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=100)
+    snapshot = models.TextField(null=True, blank=True)
+    delta = models.JSONField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('note', 'number')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='unique_note_revision'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.title} (версия {self.number})'
+
+    @property
+    def is_snapshot(self):
+        return self.snapshot is not None
+
+
+class UserDeletion(models.Model):
+    """
+    Пользователь, удалённый через soft delete.
+
+    Сам пользователь заблокирован и удаляется вместе с заметками
+    командой purge_deleted (см. notes.purge).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='deletion',
+    )
+    requested = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Удаляемые пользователи'
+        verbose_name = 'Удаляемый пользователь'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class NoteSlugQuerySet(models.QuerySet):
+
+    def register(self, notes):
+        """
+        Выдаёт новым заметкам ключи и занимает их slug.
+
+        Занятый slug вызывает IntegrityError, и ни одна заметка из
+        notes не регистрируется.
+        """
+        new = [note for note in notes if note.pk is None]
+        if not new:
+            return
+        slugs = [note.slug for note in new]
+        with transaction.atomic(using=self.db):
+            self.bulk_create(
+                NoteSlug(slug=note.slug, author_id=note.author_id)
+                for note in new
+            )
+            pks = dict(self.filter(slug__in=slugs).values_list('slug', 'pk'))
+        for note in new:
+            note.pk = pks[note.slug]
+            note._registered_slug = note.slug
+
+
+class NoteSlug(models.Model):
+    """
+    Реестр заметок во всех базах (см. notes.routers).
+
+    Хранится в default и выдаёт заметкам ключи; уникальность slug
+    проверяется здесь, а не в базах заметок.
+    """
+    slug = models.SlugField(max_length=100, unique=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+
+    objects = NoteSlugQuerySet.as_manager()
+
+    def __str__(self):
+        return self.slug
@@ -0,0 +1,206 @@
+"""
+Кеш заметок пользователя.
+
+Для каждого пользователя в кеше лежит одна запись: краткий список его
+заметок (id, slug, title) и сами заметки по slug. Чтения списка и
+отдельных заметок обходятся без запросов к базе, а сохранение и
+удаление заметки сразу обновляют запись (сквозная запись) после
+фиксации транзакции.
+
+Память ограничена с двух сторон: записи пользователей вытесняет сам
+кеш (LocMemCache выбрасывает давно не читанные ключи при MAX_ENTRIES),
+а внутри записи хранится не больше NOTES_CACHE_MAX_NOTES заметок —
+вытесняются давно не читанные. Чтобы не сохранять запись на каждое
+чтение, прочитанная заметка переносится в конец, только если она в
+старшей половине записи. Список длиннее NOTES_CACHE_MAX_SUMMARIES не
+кешируется: такие списки отдаются потоком.
+
+Сквозная запись увеличивает номер версии записи пользователя. Запись,
+дополненная из базы, сохраняется, только если версия не изменилась,
+пока шёл запрос, поэтому медленное заполнение не затрёт более новую
+заметку, а запросы к базе выполняются без блокировки. Заметки из кеша
+отсоединены от базы и годятся только для чтения: изменять и удалять
+заметку нужно, загрузив её из базы.
+"""
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Note
+
+ENTRY_KEY = 'notes:user:{}'
+VERSION_KEY = 'notes:user:{}:version'
+SUMMARY_FIELDS = ('id', 'slug', 'title')
+
+_lock = threading.Lock()
+
+
+def detached(note, field_names=None):
+    """Копия заметки без связанных объектов, пригодная для кеша."""
+    # from_db ждёт значения в порядке полей модели.
+    field_names = [
+        field.attname for field in Note._meta.concrete_fields
+        if field_names is None or field.attname in field_names
+    ]
+    return Note.from_db(
+        note._state.db, field_names,
+        [getattr(note, name) for name in field_names],
+    )
+
+
+def load_entry(user_id):
+    return cache.get(ENTRY_KEY.format(user_id))
+
+
+def store_entry(user_id, entry):
+    cache.set(ENTRY_KEY.format(user_id), entry, settings.NOTES_CACHE_TIMEOUT)
+
+
+def new_entry():
+    return {'summaries': None, 'notes': OrderedDict()}
+
+
+def entry_version(user_id):
+    return cache.get(VERSION_KEY.format(user_id), 0)
+
+
+def bump_version(user_id):
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Версия не истекает: иначе она могла бы вернуться к значению,
+        # которое видел идущий запрос заполнения.
+        cache.set(key, 1, None)
+
+
+def store_if_unchanged(user_id, version, entry):
+    """Сохраняет запись, если сквозная запись не меняла её с version."""
+    with _lock:
+        if entry_version(user_id) == version:
+            store_entry(user_id, entry)
+
+
+def get_summaries(user):
+    """
+    Краткий список заметок пользователя по возрастанию id.
+
+    None, если заметок больше NOTES_CACHE_MAX_SUMMARIES.
+    """
+    version = entry_version(user.pk)
+    entry = load_entry(user.pk) or new_entry()
+    if entry['summaries'] is not None:
+        return entry['summaries']
+    limit = settings.NOTES_CACHE_MAX_SUMMARIES
+    summaries = list(
+        Note.objects.for_author(user).only(*SUMMARY_FIELDS).order_by('pk')
+        [:limit + 1]
+    )
+    if len(summaries) > limit:
+        return None
+    entry['summaries'] = summaries
+    store_if_unchanged(user.pk, version, entry)
+    return summaries
+
+
+def get_note(user, slug):
+    """Заметка пользователя по slug или None, если её нет."""
+    version = entry_version(user.pk)
+    entry = load_entry(user.pk) or new_entry()
+    notes = entry['notes']
+    note = notes.get(slug)
+    if note is not None:
+        if list(notes).index(slug) < len(notes) // 2:
+            notes.move_to_end(slug)
+            store_if_unchanged(user.pk, version, entry)
+        return note
+    note = Note.objects.for_author(user).filter(slug=slug).first()
+    if note is None:
+        return None
+    note = detached(note)
+    notes[slug] = note
+    trim(notes)
+    store_if_unchanged(user.pk, version, entry)
+    return note
+
+
+def trim(notes):
+    """Вытесняет давно не читанные заметки сверх NOTES_CACHE_MAX_NOTES."""
+    while len(notes) > settings.NOTES_CACHE_MAX_NOTES:
+        notes.popitem(last=False)
+
+
+def update_entry(user_id, change):
+    """Применяет change(entry) к записи пользователя после фиксации."""
+    def apply():
+        with _lock:
+            bump_version(user_id)
+            entry = load_entry(user_id)
+            if entry is not None:
+                change(entry)
+                store_entry(user_id, entry)
+    transaction.on_commit(apply)
+
+
+def forget(entry, pks):
+    """Убирает заметки pks из записи, под каким бы slug они ни лежали."""
+    if entry['summaries'] is not None:
+        entry['summaries'] = [
+            summary for summary in entry['summaries']
+            if summary.pk not in pks
+        ]
+    for slug, note in list(entry['notes'].items()):
+        if note.pk in pks:
+            del entry['notes'][slug]
+
+
+def notes_saved(user_id, notes):
+    """Записывает сохранённые заметки пользователя в его запись кеша."""
+    # Копии снимаются сразу: к фиксации транзакции объекты могут измениться.
+    copies = [
+        (detached(note), detached(note, SUMMARY_FIELDS)) for note in notes
+    ]
+
+    def change(entry):
+        forget(entry, {note.pk for note, _ in copies})
+        for note, summary in copies:
+            if entry['summaries'] is not None:
+                entry['summaries'].append(summary)
+            entry['notes'][note.slug] = note
+        summaries = entry['summaries']
+        if summaries is not None:
+            summaries.sort(key=attrgetter('pk'))
+            if len(summaries) > settings.NOTES_CACHE_MAX_SUMMARIES:
+                entry['summaries'] = None
+        trim(entry['notes'])
+    update_entry(user_id, change)
+
+
+def notes_deleted(user_id, pks):
+    """Убирает удалённые заметки пользователя из его записи кеша."""
+    pks = set(pks)
+    update_entry(user_id, lambda entry: forget(entry, pks))
+
+
+def forget_users(user_ids):
+    """Удаляет записи пользователей, изменённых в обход сигналов."""
+    with _lock:
+        for user_id in user_ids:
+            bump_version(user_id)
+        cache.delete_many([ENTRY_KEY.format(pk) for pk in user_ids])
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, **kwargs):
+    notes_saved(instance.author_id, [instance])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    notes_deleted(instance.author_id, [instance.pk])
@@ -0,0 +1,111 @@
+"""
+Удаление пользователей в два шага.
+
+Каскадное удаление собирает все заметки и версии пользователя в Python и
+удаляет их в одной транзакции, которая у активного пользователя держит
+блокировку записи SQLite секундами. Поэтому удаление только блокирует
+пользователя и добавляет его в UserDeletion: он сразу выходит из всех
+сессий, а команда purge_deleted удаляет версии и заметки пачками по
+PURGE_BATCH_SIZE, и между пачками заметки других пользователей
+сохраняются как обычно.
+"""
+from time import sleep
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+
+from .auth import invalidate_user
+from .models import Note, NoteRevision, UserDeletion, raw_delete
+from .note_cache import forget_users
+
+
+def soft_delete_users(queryset):
+    """Блокирует пользователей до удаления командой purge_deleted."""
+    pks = list(
+        queryset.filter(deletion__isnull=True).values_list('pk', flat=True)
+    )
+    with transaction.atomic():
+        get_user_model().objects.filter(pk__in=pks).update(is_active=False)
+        UserDeletion.objects.bulk_create(
+            UserDeletion(user_id=pk) for pk in pks
+        )
+        transaction.on_commit(lambda: users_hidden(pks))
+    return len(pks)
+
+
+def users_hidden(pks):
+    # update() не отправляет сигналы: сессии пользователей сбрасываются
+    # сменой версии, кеш заметок удаляется.
+    for pk in pks:
+        invalidate_user(pk)
+    forget_users(pks)
+
+
+def delete_in_batches(queryset, batch_size, progress=None, pause=0):
+    """
+    Удаляет строки queryset пачками; возвращает их количество.
+
+    Каждая пачка удаляется одним запросом DELETE ... WHERE pk IN (SELECT
+    ... LIMIT), без сигналов и без сбора связанных объектов. Отдельные
+    SELECT и DELETE в одной транзакции не подходят: SQLite не ждёт, а
+    сразу отвечает «database is locked», когда читающей транзакции нужно
+    стать пишущей, пока пишет другое соединение. progress(deleted)
+    вызывается после каждой пачки, pause секунд ожидания дают место
+    другим записям.
+    """
+    batch = queryset.order_by().values('pk')[:batch_size]
+    deleted = 0
+    while True:
+        count = raw_delete(
+            queryset.model.objects.using(queryset.db).filter(pk__in=batch)
+        )
+        if not count:
+            return deleted
+        deleted += count
+        if progress is not None:
+            progress(deleted)
+        if pause:
+            sleep(pause)
+
+
+def purge_user(user, batch_size=None, progress=None, pause=0):
+    """
+    Удаляет пользователя, помеченного soft delete, с заметками.
+
+    Сначала удаляются версии, потом сами заметки; progress получает
+    общее число удалённых строк.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    revisions = delete_in_batches(
+        user_revisions(user),
+        batch_size, progress, pause,
+    )
+
+    def notes_progress(deleted):
+        progress(revisions + deleted)
+
+    deleted = revisions + delete_in_batches(
+        Note.objects.for_author(user), batch_size,
+        notes_progress if progress is not None else None, pause,
+    )
+    user.delete()
+    return deleted
+
+
+def user_revisions(user):
+    return NoteRevision.objects.using(
+        router.db_for_read(Note, instance=user)
+    ).filter(note__author=user)
+
+
+def pending_purge():
+    """Пользователи, ожидающие удаления, с числом заметок и версий."""
+    users = get_user_model().objects.filter(
+        deletion__isnull=False
+    ).order_by('pk')
+    for user in users:
+        total = Note.objects.for_author(user).count() + (
+            user_revisions(user).count()
+        )
+        yield purge_user, user, total
@@ -0,0 +1,269 @@
+"""
+Учёт SQL-запросов.
+
+QueryLogMiddleware оборачивает выполнение запросов через
+connection.execute_wrapper. Каждый запрос сводится к отпечатку (литералы
+и параметры заменены на ?, списки IN схлопнуты), и для пары
+«представление, отпечаток» копятся число запросов, суммарное время и
+гистограмма длительностей. Запросы дольше SLOW_QUERY_THRESHOLD секунд
+дописываются в журнал медленных запросов вместе с представлением и
+строкой кода проекта, из которой они выполнены.
+
+Статистика живёт в памяти процесса; раз в QUERY_LOG_FLUSH_INTERVAL
+секунд и при выходе процесс сбрасывает её в QUERY_LOG_DIR, откуда отчёты
+всех процессов собирают команда query_report и страница для персонала.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from contextlib import ExitStack
+from functools import lru_cache
+from pathlib import Path
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPORT_PATTERN = 'queries-{}.json'
+SLOW_PATTERN = 'slow-{}.jsonl'
+# Верхние границы корзин гистограммы в миллисекундах; последняя — без
+# границы.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Модули, которые оборачивают запросы сами и не бывают их источником.
+INSTRUMENTATION = frozenset(
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('querylog.py', 'metrics.py', 'memprofile.py')
+)
+
+NORMALIZERS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """SQL без конкретных значений: одинаков для запросов одного вида."""
+    for pattern, replacement in NORMALIZERS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def bucket_index(milliseconds):
+    for index, bound in enumerate(BUCKETS_MS):
+        if milliseconds <= bound:
+            return index
+    return len(BUCKETS_MS)
+
+
+class QueryStats:
+    """Число, время и гистограмма запросов по представлениям."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}
+
+    def record(self, view, sql_fingerprint, duration):
+        milliseconds = duration * 1000
+        key = (view, sql_fingerprint)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {
+                    'view': view, 'fingerprint': sql_fingerprint,
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'buckets': [0] * (len(BUCKETS_MS) + 1),
+                }
+            entry['count'] += 1
+            entry['total_ms'] += milliseconds
+            entry['max_ms'] = max(entry['max_ms'], milliseconds)
+            entry['buckets'][bucket_index(milliseconds)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {**entry, 'buckets': list(entry['buckets'])}
+                for entry in self.entries.values()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+
+
+stats = QueryStats()
+_local = threading.local()
+_last_flush = monotonic()
+
+
+def query_origin():
+    """
+    Первая строка кода проекта в стеке вызова запроса.
+
+    Обёртки запросов (журнал, метрики, профилирование памяти) источником
+    не считаются, даже если стоят в стеке выше этой.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base_dir)
+            and filename not in INSTRUMENTATION
+            and 'site-packages' not in filename
+        ):
+            return f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+def log_slow_query(view, sql, duration):
+    record = {
+        'time': timezone.now().isoformat(),
+        'view': view,
+        'origin': query_origin(),
+        'duration_ms': round(duration * 1000, 3),
+        'sql': sql,
+    }
+    logger.warning(
+        'Медленный запрос %.1f мс в %s (%s): %s',
+        record['duration_ms'], view, record['origin'], sql,
+    )
+    directory = Path(settings.QUERY_LOG_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / SLOW_PATTERN.format(os.getpid()), 'a',
+              encoding='utf-8') as slow_log:
+        slow_log.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def instrument(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = perf_counter() - started
+        view = getattr(_local, 'view', None) or '-'
+        stats.record(view, fingerprint(sql), duration)
+        if duration >= settings.SLOW_QUERY_THRESHOLD:
+            log_slow_query(view, sql, duration)
+
+
+def write_report(directory=None):
+    """Сбрасывает статистику процесса в файл; запись атомарна."""
+    directory = Path(directory or settings.QUERY_LOG_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / REPORT_PATTERN.format(os.getpid())
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(stats.snapshot()), encoding='utf-8')
+    os.replace(temporary, path)
+
+
+def flush_if_due():
+    global _last_flush
+    now = monotonic()
+    if now - _last_flush >= settings.QUERY_LOG_FLUSH_INTERVAL:
+        _last_flush = now
+        write_report()
+
+
+def collect_report(directory=None):
+    """
+    Сводная статистика всех процессов, по убыванию суммарного времени.
+
+    Для текущего процесса берётся статистика из памяти, а не его файл.
+    """
+    directory = Path(directory or settings.QUERY_LOG_DIR)
+    reports = [stats.snapshot()]
+    own_report = REPORT_PATTERN.format(os.getpid())
+    for path in directory.glob(REPORT_PATTERN.format('*')):
+        if path.name == own_report:
+            continue
+        try:
+            reports.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            logger.warning('Пропущен повреждённый отчёт %s', path)
+    merged = {}
+    for report in reports:
+        for entry in report:
+            key = (entry['view'], entry['fingerprint'])
+            total = merged.get(key)
+            if total is None:
+                merged[key] = {**entry, 'buckets': list(entry['buckets'])}
+                continue
+            total['count'] += entry['count']
+            total['total_ms'] += entry['total_ms']
+            total['max_ms'] = max(total['max_ms'], entry['max_ms'])
+            total['buckets'] = [
+                left + right
+                for left, right in zip(total['buckets'], entry['buckets'])
+            ]
+    return sorted(
+        merged.values(), key=lambda entry: entry['total_ms'], reverse=True
+    )
+
+
+def read_slow_queries(directory=None, limit=None):
+    """Записи журналов медленных запросов всех процессов, новые первыми."""
+    directory = Path(directory or settings.QUERY_LOG_DIR)
+    records = []
+    for path in directory.glob(SLOW_PATTERN.format('*')):
+        with open(path, encoding='utf-8') as slow_log:
+            for line in slow_log:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    records.sort(key=lambda record: record['time'], reverse=True)
+    return records[:limit]
+
+
+def percentile_ms(entry, fraction):
+    """Верхняя граница корзины, в которую попадает заданная доля запросов."""
+    threshold = entry['count'] * fraction
+    seen = 0
+    for bound, count in zip(BUCKETS_MS, entry['buckets']):
+        seen += count
+        if seen >= threshold:
+            return bound
+    return None
+
+
+class QueryLogMiddleware:
+    """Учитывает запросы к базе, выполненные при обработке запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_LOG_ENABLED:
+            return self.get_response(request)
+        _local.view = None
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(instrument))
+            response = self.get_response(request)
+        _local.view = None
+        flush_if_due()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _local.view = request.resolver_match.view_name
+
+
+@atexit.register
+def write_report_on_exit():
+    if settings.configured and settings.QUERY_LOG_ENABLED and stats.entries:
+        try:
+            write_report()
+        except OSError:
+            pass
@@ -0,0 +1,141 @@
+"""
+История версий заметок.
+
+Каждое сохранение заметки с изменённым заголовком или текстом создаёт
+версию. Текст хранится правкой относительно предыдущей версии, а каждая
+NOTE_REVISION_SNAPSHOT_INTERVAL-я версия — целиком, поэтому для
+восстановления любой версии достаточно прочитать не больше
+NOTE_REVISION_SNAPSHOT_INTERVAL строк и применить столько же правок.
+
+Правка — список [начало, конец, текст]: токены предыдущей версии
+с начала по конец заменяются текстом. Токены — слова вместе со
+следующими за ними пробелами, так что небольшая правка длинного абзаца
+остаётся небольшой.
+"""
+import re
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Note, NoteRevision
+
+TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text)
+
+
+def make_delta(old, new):
+    """Правка, превращающая текст old в текст new."""
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    matcher = SequenceMatcher(None, old_tokens, new_tokens)
+    return [
+        [start, end, ''.join(new_tokens[new_start:new_end])]
+        for tag, start, end, new_start, new_end in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def apply_delta(text, delta):
+    tokens = tokenize(text)
+    parts = []
+    position = 0
+    for start, end, replacement in delta:
+        parts.extend(tokens[position:start])
+        parts.append(replacement)
+        position = end
+    parts.extend(tokens[position:])
+    return ''.join(parts)
+
+
+def load_chain(note, number=None):
+    """
+    Версии заметки от ближайшего полного снимка до версии number включительно.
+
+    Без number — до последней версии; пустой список, если версий нет.
+    """
+    revisions = note.revisions.all()
+    if number is not None:
+        revisions = revisions.filter(number__lte=number)
+    start = revisions.filter(snapshot__isnull=False).aggregate(
+        start=Max('number')
+    )['start']
+    if start is None:
+        return []
+    return list(revisions.filter(number__gte=start).order_by('number'))
+
+
+def reconstruct(chain):
+    """Текст последней версии цепочки, полученной из load_chain."""
+    text = chain[0].snapshot
+    for revision in chain[1:]:
+        text = apply_delta(text, revision.delta)
+    return text
+
+
+def record_revision(note):
+    """Сохраняет версию заметки, если она отличается от последней."""
+    chain = load_chain(note)
+    revision = NoteRevision(note=note, title=note.title)
+    if not chain:
+        revision.number = 1
+        revision.snapshot = note.text
+    else:
+        text = reconstruct(chain)
+        if text == note.text and chain[-1].title == note.title:
+            return None
+        revision.number = chain[-1].number + 1
+        if len(chain) >= settings.NOTE_REVISION_SNAPSHOT_INTERVAL:
+            revision.snapshot = note.text
+        else:
+            revision.delta = make_delta(text, note.text)
+    revision.save()
+    return revision
+
+
+def record_title_changes(notes):
+    """
+    Версии для заметок, у которых bulk_update поменял только заголовок.
+
+    Номера версий и длины цепочек читаются одним запросом, версии
+    создаются пачкой; правка текста в таких версиях пустая.
+    """
+    if not notes:
+        return
+    # Заметки одного автора лежат в одной базе (см. notes.routers).
+    revisions = NoteRevision.objects.using(notes[0]._state.db)
+    interval = settings.NOTE_REVISION_SNAPSHOT_INTERVAL
+    chains = {
+        row['note']: row
+        for row in revisions.filter(
+            note__in=[note.pk for note in notes]
+        ).values('note').annotate(
+            last=Max('number'),
+            start=Max('number', filter=Q(snapshot__isnull=False)),
+        )
+    }
+    new_revisions = []
+    for note in notes:
+        chain = chains.get(note.pk, {'last': 0, 'start': None})
+        revision = NoteRevision(
+            note=note, title=note.title, number=chain['last'] + 1
+        )
+        if (
+            chain['start'] is None
+            or revision.number - chain['start'] >= interval
+        ):
+            revision.snapshot = note.text
+        else:
+            revision.delta = []
+        new_revisions.append(revision)
+    revisions.bulk_create(new_revisions, batch_size=500)
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_revision(instance)
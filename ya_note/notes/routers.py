@@ -0,0 +1,65 @@
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+SHARDED_MODELS = ('note', 'noterevision')
+
+
+def shard_weight(alias, author_id):
+    digest = blake2b(f'{alias}:{author_id}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_for(author_id, shards=None):
+    """
+    База из NOTES_SHARDS, где хранятся заметки автора.
+
+    Выбор по наибольшему весу (rendezvous hashing): при добавлении или
+    удалении базы переезжают только авторы, для которых она стала или
+    перестала быть лучшей, — в среднем 1/N всех авторов.
+    """
+    shards = settings.NOTES_SHARDS if shards is None else shards
+    return max(shards, key=lambda alias: shard_weight(alias, author_id))
+
+
+def instance_shard(instance):
+    """База для заметки, версии или заметок пользователя instance."""
+    if instance._meta.model_name not in SHARDED_MODELS:
+        return shard_for(instance.pk)
+    if instance._state.db is not None:
+        return instance._state.db
+    if instance._meta.model_name == 'note':
+        return shard_for(instance.author_id)
+    note = instance._state.fields_cache.get('note')
+    return None if note is None else instance_shard(note)
+
+
+class NotesShardRouter:
+    """
+    Раскладывает заметки и их версии по базам NOTES_SHARDS по автору.
+
+    Запросы без объекта-подсказки (Note.objects.filter(...)) идут в
+    default, поэтому заметки автора выбираются через
+    Note.objects.for_author(). Остальные модели, в том числе
+    пользователи и реестр slug (NoteSlug), всегда в default; в
+    сегментах, кроме default, есть только таблицы заметок и версий.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'notes' or (
+            model._meta.model_name not in SHARDED_MODELS
+        ):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        return None if instance is None else instance_shard(instance)
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        return app_label == 'notes' and model_name in SHARDED_MODELS
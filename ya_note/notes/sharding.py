@@ -0,0 +1,107 @@
+"""
+Раскладка заметок по базам NOTES_SHARDS.
+
+Базы, кроме default, содержат только таблицы заметок и версий (см.
+notes.routers), поэтому внешние ключи на пользователей в них не
+проверяются. Ключи заметкам выдаёт реестр NoteSlug в default: они
+уникальны во всех базах и сохраняются при переезде.
+
+После изменения NOTES_SHARDS новые заметки сразу пишутся в новую базу
+автора, а старые переносит команда rebalance_notes. Пока заметки автора
+не перенесены, сайт их не показывает; перенос одного автора занимает
+две короткие транзакции.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+from .models import Note, NoteRevision, NoteSlug, raw_delete
+from .note_cache import forget_users
+from .routers import shard_for
+
+MOVE_BATCH_SIZE = 500
+
+
+def disable_foreign_keys(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+@receiver(connection_created)
+def shard_connected(sender, connection, **kwargs):
+    # Django включает проверку внешних ключей при каждом подключении.
+    if connection.alias != DEFAULT_DB_ALIAS:
+        disable_foreign_keys(connection)
+
+
+@receiver(post_migrate)
+def shard_migrated(sender, using, **kwargs):
+    # Миграции SQLite тоже включают проверку заново по завершении.
+    if using != DEFAULT_DB_ALIAS:
+        disable_foreign_keys(connections[using])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    NoteSlug.objects.filter(pk=instance.pk).delete()
+
+
+def note_databases():
+    """Все базы, в которых есть таблица заметок."""
+    return [
+        alias for alias in settings.DATABASES
+        if router.allow_migrate_model(alias, Note)
+    ]
+
+
+def detached_revisions(revisions):
+    # Ключи версий выдаёт каждая база сама, в target они могут быть заняты.
+    for revision in revisions.iterator(chunk_size=MOVE_BATCH_SIZE):
+        revision.pk = None
+        yield revision
+
+
+def move_author(author_id, source, target):
+    """
+    Переносит заметки автора с версиями из source в target.
+
+    Заметки, уже записанные в target прошлым прерванным переносом,
+    пропускаются вместе с версиями. Возвращает число заметок.
+    """
+    notes = list(Note.objects.using(source).filter(author_id=author_id))
+    pks = [note.pk for note in notes]
+    present = set(
+        Note.objects.using(target).filter(pk__in=pks).values_list(
+            'pk', flat=True
+        )
+    )
+    missing = [note.pk for note in notes if note.pk not in present]
+    revisions = NoteRevision.objects.using(source).filter(note__in=missing)
+    with transaction.atomic(using=target):
+        Note.objects.using(target).bulk_create(
+            [note for note in notes if note.pk not in present],
+            batch_size=MOVE_BATCH_SIZE,
+        )
+        NoteRevision.objects.using(target).bulk_create(
+            detached_revisions(revisions),
+            batch_size=MOVE_BATCH_SIZE,
+        )
+    with transaction.atomic(using=source):
+        raw_delete(NoteRevision.objects.using(source).filter(note__in=pks))
+        raw_delete(Note.objects.using(source).filter(pk__in=pks))
+    forget_users([author_id])
+    return len(notes)
+
+
+def misplaced_authors():
+    """Пары (автор, база, нужная база) для авторов не в своей базе."""
+    for alias in note_databases():
+        authors = Note.objects.using(alias).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True).distinct()
+        for author_id in authors:
+            target = shard_for(author_id)
+            if target != alias:
+                yield author_id, alias, target
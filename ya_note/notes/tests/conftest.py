@@ -0,0 +1,37 @@
+import pytest
+
+from django.core.cache import cache
+
+from notes import memprofile
+from notes.metrics import registry
+from notes.querylog import stats
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеш общий для процесса, а база откатывается после каждого теста."""
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def query_log(settings, tmp_path):
+    """Отчёты учёта запросов пишутся во временный каталог теста."""
+    settings.QUERY_LOG_DIR = tmp_path / 'querylog'
+    yield
+    stats.clear()
+
+
+@pytest.fixture(autouse=True)
+def metrics(settings, tmp_path):
+    """Файлы метрик пишутся во временный каталог теста."""
+    settings.METRICS_DIR = tmp_path / 'metrics'
+    yield
+    registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def memory_profile(settings, tmp_path):
+    """Замеры памяти пишутся во временный каталог теста."""
+    settings.MEMORY_PROFILE_DIR = tmp_path / 'memprofile'
+    yield
+    memprofile.clear()
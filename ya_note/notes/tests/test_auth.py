@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+User = get_user_model()
+
+
+class TestCachedAuthentication(TestCase):
+    """Тесты для кеширования пользователя по сессии."""
+    NOTES_LIST = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+
+    def setUp(self):
+        """Авторизация и первый запрос, заполняющий кеш."""
+        self.client.force_login(self.author)
+        self.client.get(self.NOTES_LIST)
+
+    def auth_queries(self):
+        """Повторный запрос и обращения к таблице пользователей."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.NOTES_LIST)
+        return response, [
+            query for query in queries.captured_queries
+            if 'auth_user' in query['sql']
+        ]
+
+    def test_no_auth_queries_in_steady_state(self):
+        """Тест: Повторный запрос не обращается к таблице пользователей."""
+        response, queries = self.auth_queries()
+
+        self.assertTrue(response.context['user'].is_authenticated)
+        self.assertEqual(queries, [])
+
+    def test_user_update_invalidates_cache(self):
+        """Тест: Изменение пользователя сбрасывает закешированную копию."""
+        self.author.username = 'Саня Пушкин'
+        self.author.save()
+
+        response, queries = self.auth_queries()
+
+        self.assertTrue(queries)
+        self.assertEqual(response.context['user'].username, 'Саня Пушкин')
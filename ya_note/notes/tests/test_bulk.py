@@ -0,0 +1,139 @@
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note, NoteRevision, NoteSlug
+
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_RATES={})
+class TestBulkNotes(TestCase):
+    """Тесты для действий над несколькими заметками."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.reader = User.objects.create(username='Читатель простой')
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {index}', text=f'Текст {index}',
+                author=cls.author,
+            )
+            for index in range(3)
+        ]
+        cls.foreign_note = Note.objects.create(
+            title='Чужая', text='Текст', slug='work-zametka-0',
+            author=cls.reader,
+        )
+        cls.bulk_url = reverse('notes:bulk')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def post(self, action, notes, **data):
+        return self.client.post(
+            self.bulk_url,
+            {'action': action, 'notes': [note.pk for note in notes], **data},
+        )
+
+    def test_bulk_delete_single_query(self):
+        """Тест: Выбранные заметки удаляются одним запросом DELETE."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('delete', self.notes[:2])
+
+        deletes = [
+            query for query in queries
+            if query['sql'].startswith('DELETE FROM "notes_note"')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertEqual(
+            list(Note.objects.filter(author=self.author)), self.notes[2:]
+        )
+
+    def test_foreign_notes_rejected(self):
+        """Тест: Чужая заметка в выборке отклоняет всё действие."""
+        response = self.post('delete', [self.notes[0], self.foreign_note])
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['form'].errors)
+        self.assertEqual(Note.objects.count(), 4)
+
+    def test_bulk_export_streams_selected(self):
+        """Тест: Выгрузка отдаёт потоком только выбранные заметки."""
+        response = self.post('export', self.notes[1:])
+
+        self.assertTrue(response.streaming)
+        exported = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [note['text'] for note in exported], ['Текст 1', 'Текст 2']
+        )
+
+    def test_bulk_prefix_regenerates_unique_slugs(self):
+        """
+        Тест: Префикс добавляется к заголовкам, slug пересоздаётся без
+        совпадений с чужими, в истории появляется версия.
+        """
+        self.post('prefix', self.notes[:2], prefix='[Work] ')
+
+        renamed = Note.objects.filter(author=self.author).order_by('pk')
+        self.assertEqual(
+            [(note.title, note.slug) for note in renamed],
+            [
+                ('[Work] Заметка 0', 'work-zametka-0-2'),
+                ('[Work] Заметка 1', 'work-zametka-1'),
+                ('Заметка 2', 'zametka-2'),
+            ],
+        )
+        self.assertEqual(
+            NoteRevision.objects.filter(
+                note=self.notes[0]
+            ).latest('number').title,
+            '[Work] Заметка 0',
+        )
+
+    def test_bulk_prefix_skips_taken_suffixes(self):
+        """Тест: slug с уже занятым суффиксом получает следующий суффикс."""
+        for slug in ('work-zametka-0-2', 'work-zametka-0-3'):
+            Note.objects.create(
+                title='Чужая', text='Текст', slug=slug, author=self.reader
+            )
+
+        response = self.post('prefix', self.notes[:1], prefix='[Work] ')
+
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertEqual(
+            Note.objects.for_author(self.author).get(pk=self.notes[0].pk).slug,
+            'work-zametka-0-4',
+        )
+
+    def test_bulk_prefix_race_leaves_shard_untouched(self):
+        """
+        Тест: Если slug занят между проверкой и записью, реестр и база
+        заметок не меняются.
+        """
+        def race(notes):
+            for note in notes:
+                note.slug = self.foreign_note.slug
+
+        with mock.patch('notes.bulk.unique_slugs', race):
+            response = self.post('prefix', self.notes[:1], prefix='[Work] ')
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['form'].non_field_errors())
+        note = Note.objects.for_author(self.author).get(pk=self.notes[0].pk)
+        self.assertEqual(
+            (note.title, note.slug), ('Заметка 0', self.notes[0].slug)
+        )
+        self.assertEqual(
+            NoteSlug.objects.get(pk=note.pk).slug, self.notes[0].slug
+        )
@@ -0,0 +1,56 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from notes.forms import WARNING
+from notes.models import Note
+
+
+User = get_user_model()
+
+
+class TestIdempotency(TestCase):
+    """Тесты для ключей идемпотентности формы заметки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.url = reverse('notes:add')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        self.form_data = {
+            'title': 'Заголовок',
+            'text': 'Текст',
+            'slug': 'note',
+            'idempotency_key': self.client.get(self.url).context[
+                'idempotency_key'
+            ],
+        }
+
+    def test_double_submit_creates_one_note(self):
+        """
+        Тест: Повтор формы с тем же ключом получает тот же редирект
+        вместо ошибки занятого slug.
+        """
+        first = self.client.post(self.url, self.form_data)
+        with self.assertNumQueries(0):
+            second = self.client.post(self.url, self.form_data)
+
+        self.assertEqual(second.status_code, HTTPStatus.FOUND)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_new_key_not_replayed(self):
+        """Тест: Форма с другим ключом обрабатывается заново."""
+        self.client.post(self.url, self.form_data)
+
+        response = self.client.post(
+            self.url, {**self.form_data, 'idempotency_key': 'other'}
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(response, 'form', 'slug', 'note' + WARNING)
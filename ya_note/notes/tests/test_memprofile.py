@@ -0,0 +1,62 @@
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.memprofile import read_samples
+from notes.models import Note
+
+
+User = get_user_model()
+
+
+@override_settings(MEMORY_PROFILING=True, MEMORY_PROFILE_SAMPLE_RATE=1)
+class TestMemoryProfile(TestCase):
+    """Тесты для профилирования памяти."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.staff = User.objects.create(username='Модератор', is_staff=True)
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}', text='Текст ' * 100,
+                slug=f'note-{index}', author=cls.author,
+            )
+            for index in range(50)
+        )
+
+    def test_list_sampled(self):
+        """Тест: Для списка заметок записываются память и места выделения."""
+        self.client.force_login(self.author)
+        self.client.get(reverse('notes:list'))
+
+        sample, = read_samples()
+        self.assertEqual(sample['view'], 'notes:list')
+        self.assertGreaterEqual(sample['peak_kb'], sample['net_kb'])
+        self.assertTrue(sample['sites'])
+
+    def test_report_for_staff_and_command(self):
+        """Тест: Сводка доступна только персоналу и выводится командой."""
+        self.client.force_login(self.author)
+        self.client.get(reverse('notes:list'))
+        url = reverse('notes:memory_stats')
+
+        with override_settings(MEMORY_PROFILING=False):
+            self.assertEqual(
+                self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+            )
+            self.client.force_login(self.staff)
+            response = self.client.get(url)
+        out = StringIO()
+        call_command('memory_report', '--view', 'notes:list', stdout=out)
+
+        self.assertEqual(
+            [entry['view'] for entry in response.json()['views']],
+            ['notes:list'],
+        )
+        self.assertIn('notes:list (/notes/)', out.getvalue())
@@ -0,0 +1,107 @@
+import json
+import os
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.metrics import (
+    EXITED_FILE, FILE_PATTERN, SharedFile, collect, read_shared, registry,
+    retire_on_exit, write_shared
+)
+from notes.models import Note
+
+
+User = get_user_model()
+DEAD_PID = 99999999
+
+
+@override_settings(METRICS_ENABLED=True)
+class TestMetrics(TestCase):
+    """Тесты для метрик Prometheus."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', author=cls.author, slug='taken'
+        )
+
+    def test_slug_collision_counted(self):
+        """Тест: Занятый slug и ответы попадают на страницу /metrics."""
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('notes:add'),
+            {'title': 'Другая', 'text': 'Текст', 'slug': 'taken'},
+        )
+        self.client.get(reverse('notes:list'))
+
+        text = self.client.get('/metrics').content.decode()
+
+        self.assertIn(
+            'form_errors_total{form="note",reason="slug_taken"} 1.0', text
+        )
+        self.assertIn(
+            'http_requests_total{view="notes:add",method="POST",status="200"}'
+            ' 1.0',
+            text,
+        )
+        self.assertIn('db_queries_total{view="notes:list"}', text)
+
+    def test_process_files_merged(self):
+        """Тест: Значения из файла другого процесса прибавляются к своим."""
+        self.client.force_login(self.author)
+        self.client.get(reverse('notes:list'))
+        write_shared()
+        own = settings.METRICS_DIR / FILE_PATTERN.format(os.getpid())
+        other = SharedFile(settings.METRICS_DIR / FILE_PATTERN.format(0))
+        other.write(read_shared(own))
+        # Файл растёт, если снимок не помещается.
+        other.write(json.dumps({'padding': 'x' * 100000}).encode())
+        other.write(read_shared(own))
+
+        requests = collect()['http_requests_total']
+
+        self.assertEqual(requests[('notes:list', 'GET', '200')], 2)
+
+    def test_exited_process_files_merged(self):
+        """
+        Тест: Файлы завершившихся процессов, упавшего и вышедшего штатно,
+        переносятся в общий файл и учитываются один раз.
+        """
+        self.client.force_login(self.author)
+        self.client.get(reverse('notes:list'))
+        write_shared()
+        own = settings.METRICS_DIR / FILE_PATTERN.format(os.getpid())
+        dead = settings.METRICS_DIR / FILE_PATTERN.format(DEAD_PID)
+        SharedFile(dead).write(read_shared(own))
+
+        collect()
+        retire_on_exit()
+        registry.clear()
+        requests = collect()['http_requests_total']
+
+        self.assertFalse(dead.exists())
+        self.assertFalse(own.exists())
+        self.assertTrue((settings.METRICS_DIR / EXITED_FILE).exists())
+        self.assertEqual(requests[('notes:list', 'GET', '200')], 2)
+
+    def test_scrape_restricted(self):
+        """
+        Тест: /metrics отвечает разрешённым адресам и персоналу, остальным —
+        403, а при выключенных метриках — 404.
+        """
+        remote = {'REMOTE_ADDR': '203.0.113.7'}
+        staff = User.objects.create(username='Модератор', is_staff=True)
+
+        response = self.client.get('/metrics', **remote)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.client.force_login(staff)
+        response = self.client.get('/metrics', **remote)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        with self.settings(METRICS_ENABLED=False):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
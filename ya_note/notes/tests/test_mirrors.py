@@ -0,0 +1,50 @@
+"""
+Модули, общие с проектом ya_news.
+
+ya_news и ya_note — независимые проекты: каждый запускается и проверяется
+из своего каталога, общего пакета на пути импорта у них нет. Поэтому
+одинаковые модули лежат в обоих приложениях копиями, а этот тест следит,
+чтобы копии не расходились. Исправление в одной копии переносится в другую
+в том же коммите.
+"""
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+OWN = settings.BASE_DIR / 'notes'
+SIBLING = settings.BASE_DIR.parent / 'ya_news' / 'news'
+MIRRORED = (
+    'metrics.py',
+    'management/commands/prune_sessions.py',
+    'auth.py',
+    'management/commands/warm_templates.py',
+    'lazy.py',
+    'management/commands/importtime_report.py',
+    'throttling.py',
+    'compression.py',
+    'streaming.py',
+    'querylog.py',
+    'management/commands/query_report.py',
+    'memprofile.py',
+    'management/commands/memory_report.py',
+    'idempotency.py',
+)
+
+
+def normalize(text):
+    """Текст копии из ya_note с именами ya_news."""
+    return text.replace('yanote', 'yanews').replace('notes', 'news')
+
+
+@skipUnless(SIBLING.is_dir(), 'Нет проекта ya_news.')
+class TestMirrors(SimpleTestCase):
+    """Тесты для модулей, общих с ya_news."""
+
+    def test_modules_match_sibling(self):
+        """Тест: Общие модули совпадают с копиями в ya_news."""
+        for module in MIRRORED:
+            with self.subTest(module=module):
+                own = (OWN / module).read_text(encoding='utf-8')
+                sibling = (SIBLING / module).read_text(encoding='utf-8')
+                self.assertEqual(normalize(own), sibling)
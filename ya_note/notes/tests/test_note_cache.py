@@ -0,0 +1,127 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note, NoteSlug
+from notes.note_cache import load_entry, notes_deleted
+
+
+User = get_user_model()
+
+
+class TestNoteCache(TestCase):
+    """Тесты для кеша заметок пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.notes = Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'note-{index}', author=cls.author)
+            for index in range(3)
+        )
+        cls.list_url = reverse('notes:list')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def listed_titles(self):
+        response = self.client.get(self.list_url)
+        return [note.title for note in response.context['notes']]
+
+    def test_repeated_reads_without_queries(self):
+        """Тест: Повторные список и заметка читаются без запросов к базе."""
+        urls = (self.list_url, reverse('notes:detail', args=('note-0',)))
+        for url in urls:
+            self.client.get(url)
+
+        for url in urls:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_cache_follows_create_update_delete(self):
+        """Тест: Создание, правка и удаление сразу видны через кеш."""
+        self.client.get(reverse('notes:detail', args=('note-1',)))
+        self.listed_titles()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('notes:add'),
+                {'title': 'Новая', 'text': 'Текст', 'slug': 'new'},
+            )
+            self.client.post(
+                reverse('notes:edit', args=('note-1',)),
+                {'title': 'Правка', 'text': 'Новый текст', 'slug': 'renamed'},
+            )
+            self.client.post(reverse('notes:delete', args=('note-2',)))
+
+        self.assertEqual(
+            self.listed_titles(), ['Заметка 0', 'Правка', 'Новая']
+        )
+        renamed = self.client.get(reverse('notes:detail', args=('renamed',)))
+        self.assertEqual(renamed.context['note'].text, 'Новый текст')
+        for slug in ('note-1', 'note-2'):
+            with self.subTest(slug=slug):
+                response = self.client.get(
+                    reverse('notes:detail', args=(slug,))
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(NOTES_CACHE_MAX_NOTES=2)
+    def test_notes_evicted_beyond_limit(self):
+        """
+        Тест: В записи пользователя хранится не больше двух заметок,
+        вытесняется давно не читанная.
+        """
+        for slug in ('note-0', 'note-1', 'note-0', 'note-2'):
+            self.client.get(reverse('notes:detail', args=(slug,)))
+
+        entry = load_entry(self.author.pk)
+        self.assertEqual(list(entry['notes']), ['note-0', 'note-2'])
+
+    def test_fill_does_not_overwrite_concurrent_write(self):
+        """
+        Тест: Заметка, загруженная до сквозной записи, которая её
+        удалила, не попадает в кеш.
+        """
+        note = self.notes[0]
+        db = Note.objects.for_author(self.author).db
+
+        def delete_meanwhile(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            with self.captureOnCommitCallbacks(execute=True):
+                notes_deleted(self.author.pk, [note.pk])
+            return result
+
+        with connections[db].execute_wrapper(delete_meanwhile):
+            self.client.get(reverse('notes:detail', args=(note.slug,)))
+
+        entry = load_entry(self.author.pk)
+        self.assertTrue(entry is None or note.slug not in entry['notes'])
+
+    def test_edit_of_note_deleted_elsewhere_not_resurrected(self):
+        """
+        Тест: Правка заметки, удалённой другим процессом, но оставшейся
+        в кеше, отвечает 404 и не создаёт заметку заново.
+        """
+        self.client.get(reverse('notes:detail', args=('note-0',)))
+        # Другой процесс удалил заметку; кеш этого процесса не обновился.
+        Note.objects.for_author(self.author).get(slug='note-0').delete()
+
+        response = self.client.post(
+            reverse('notes:edit', args=('note-0',)),
+            {'title': 'Правка', 'text': 'Текст', 'slug': 'note-0'},
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(
+            Note.objects.for_author(self.author).filter(
+                slug='note-0'
+            ).exists()
+        )
+        self.assertFalse(NoteSlug.objects.filter(slug='note-0').exists())
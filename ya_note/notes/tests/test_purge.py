@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from notes.models import Note, NoteRevision, NoteSlug, raw_delete
+from notes.purge import soft_delete_users
+
+
+User = get_user_model()
+
+
+class TestPurge(TestCase):
+    """Тесты для удаления пользователей в два шага."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.reader = User.objects.create(username='Читатель простой')
+        for index in range(3):
+            Note.objects.create(
+                title=f'Заметка {index}', text='Текст', author=cls.author
+            )
+        cls.kept = Note.objects.create(
+            title='Чужая', text='Текст', author=cls.reader
+        )
+
+    def test_soft_deleted_user_logged_out(self):
+        """Тест: Удалённый пользователь сразу теряет доступ к заметкам."""
+        self.client.force_login(self.author)
+        url = reverse('notes:list')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_users(User.objects.filter(pk=self.author.pk))
+
+        response = self.client.get(url)
+        self.assertRedirects(response, f'{reverse("users:login")}?next={url}')
+        self.assertEqual(Note.objects.filter(author=self.author).count(), 3)
+
+    def test_purge_command_deletes_in_batches(self):
+        """Тест: purge_deleted удаляет версии и заметки пачками с отчётом."""
+        soft_delete_users(User.objects.filter(pk=self.author.pk))
+        out = StringIO()
+
+        call_command('purge_deleted', batch_size=2, stdout=out)
+
+        output = out.getvalue()
+        for deleted in (2, 3, 5, 6):
+            self.assertIn(f'удалено заметок и версий {deleted} из 6', output)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Note.objects.all()), [self.kept])
+        self.assertEqual(NoteRevision.objects.count(), 1)
+
+    def test_raw_delete_single_query_without_signals(self):
+        """
+        Тест: raw_delete удаляет заметки одним запросом, без сигналов:
+        ключи в реестре освобождает вызывающий код.
+        """
+        notes = Note.objects.for_author(self.author)
+        # Зависимые версии удаляет вызывающий код.
+        raw_delete(NoteRevision.objects.using(notes.db).filter(note__in=notes))
+
+        with self.assertNumQueries(1, using=notes.db):
+            deleted = raw_delete(notes)
+
+        self.assertEqual(deleted, 3)
+        self.assertFalse(notes.exists())
+        self.assertEqual(
+            NoteSlug.objects.filter(author=self.author).count(), 3
+        )
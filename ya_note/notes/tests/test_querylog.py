@@ -0,0 +1,60 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note
+from notes.querylog import collect_report, read_slow_queries
+
+
+User = get_user_model()
+
+
+@override_settings(QUERY_LOG_ENABLED=True)
+class TestQueryLog(TestCase):
+    """Тесты для учёта SQL-запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.staff = User.objects.create(username='Модератор', is_staff=True)
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', author=cls.author
+        )
+        cls.stats_url = reverse('notes:query_stats')
+
+    @override_settings(
+        SLOW_QUERY_THRESHOLD=0, METRICS_ENABLED=True, MEMORY_PROFILING=True,
+        MEMORY_PROFILE_SAMPLE_RATE=1,
+    )
+    def test_queries_grouped_by_view(self):
+        """
+        Тест: Запросы учитываются по представлению и попадают в журнал
+        со строкой кода, из которой выполнены, а не со строкой обёрток.
+        """
+        self.client.force_login(self.author)
+        self.client.get(reverse('notes:detail', args=(self.note.slug,)))
+
+        views = {entry['view'] for entry in collect_report()}
+        self.assertIn('notes:detail', views)
+        files = {
+            record['origin'].partition(':')[0]
+            for record in read_slow_queries()
+        }
+        self.assertIn('notes/note_cache.py', files)
+        self.assertFalse(files & {
+            'notes/querylog.py', 'notes/metrics.py', 'notes/memprofile.py'
+        })
+
+    def test_stats_endpoint_for_staff_only(self):
+        """Тест: Сводка доступна только персоналу."""
+        for user, status in (
+            (self.author, HTTPStatus.FORBIDDEN),
+            (self.staff, HTTPStatus.OK),
+        ):
+            with self.subTest(user=user):
+                self.client.force_login(user)
+                response = self.client.get(self.stats_url)
+                self.assertEqual(response.status_code, status)
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note, NoteRevision
+from notes.revisions import apply_delta, make_delta
+
+
+User = get_user_model()
+
+
+@override_settings(NOTE_REVISION_SNAPSHOT_INTERVAL=3)
+class TestNoteRevisions(TestCase):
+    """Тесты для истории версий заметок."""
+
+    TEXTS = [
+        'Первая строка.\nВторая строка.',
+        'Первая строка.\nВторая, исправленная строка.',
+        'Новая первая строка.\nВторая, исправленная строка.',
+        'Новая первая строка.',
+        'Новая первая строка.\n\nИ ещё абзац.',
+        '',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.reader = User.objects.create(username='Читатель простой')
+        cls.note = Note.objects.create(
+            title='Заголовок', text=cls.TEXTS[0], author=cls.author
+        )
+        for text in cls.TEXTS[1:]:
+            cls.note.text = text
+            cls.note.save()
+
+    def test_delta_round_trip(self):
+        """Тест: Правка превращает предыдущий текст в новый."""
+        for old, new in zip(self.TEXTS, self.TEXTS[1:]):
+            with self.subTest(old=old, new=new):
+                self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+
+    def test_revisions_stored_as_deltas_with_snapshots(self):
+        """
+        Тест: Каждая третья версия хранится целиком, остальные правками;
+        сохранение без изменений версию не создаёт.
+        """
+        self.note.save()
+
+        revisions = NoteRevision.objects.filter(note=self.note)
+        self.assertEqual(
+            [revision.is_snapshot for revision in revisions],
+            [True, False, False, True, False, False],
+        )
+
+    def test_history_reconstructs_every_revision(self):
+        """Тест: Страница версии показывает текст этой версии."""
+        self.client.force_login(self.author)
+        for number, text in enumerate(self.TEXTS, start=1):
+            with self.subTest(number=number):
+                response = self.client.get(
+                    reverse('notes:revision', args=(self.note.slug, number))
+                )
+                self.assertEqual(response.context['revision_text'], text)
+
+    def test_history_hidden_from_other_users(self):
+        """Тест: Чужая история и несуществующая версия недоступны."""
+        slug = self.note.slug
+        urls = (
+            (self.reader, reverse('notes:history', args=(slug,))),
+            (self.author, reverse('notes:revision', args=(slug, 99))),
+        )
+        for user, url in urls:
+            with self.subTest(url=url):
+                self.client.force_login(user)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
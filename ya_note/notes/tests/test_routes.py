@@ -29,6 +29,8 @@ class TestRoutes(TestCase):
             ('notes:edit', (cls.note_author.slug,)),
             ('notes:detail', (cls.note_author.slug,)),
             ('notes:delete', (cls.note_author.slug,)),
+            ('notes:history', (cls.note_author.slug,)),
+            ('notes:revision', (cls.note_author.slug, 1)),
         )
 
     def test_pages_availability(self):
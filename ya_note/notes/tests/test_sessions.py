@@ -0,0 +1,68 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+
+User = get_user_model()
+
+
+class TestSessions(TestCase):
+    """Тесты для режимов хранения сессий."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.list_url = reverse('notes:list')
+
+    def test_cached_modes_skip_session_table(self):
+        """
+        Тест: В режимах cached_db и signed_cookies повторный запрос
+        не обращается к таблице сессий.
+        """
+        for mode in ('cached_db', 'signed_cookies'):
+            with self.subTest(mode=mode), override_settings(
+                SESSION_ENGINE=settings.SESSION_ENGINES[mode]
+            ):
+                client = Client()
+                client.force_login(self.author)
+                client.get(self.list_url)
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(self.list_url)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'django_session' in query['sql']
+                ])
+
+    def test_prune_sessions_deletes_only_expired(self):
+        """Тест: prune_sessions удаляет только просроченные сессии."""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f'expired{index}',
+                session_data='',
+                expire_date=now - timedelta(days=1)
+            )
+            for index in range(5)
+        )
+        Session.objects.create(
+            session_key='alive',
+            session_data='',
+            expire_date=now + timedelta(days=1)
+        )
+
+        call_command('prune_sessions', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive']
+        )
@@ -0,0 +1,101 @@
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from notes.forms import WARNING
+from notes.models import Note, NoteSlug
+from notes.routers import shard_for
+
+
+User = get_user_model()
+
+SHARDS = ['default', 'notes_1']
+
+
+class TestSharding(TransactionTestCase):
+    """
+    Тесты для раскладки заметок по базам.
+
+    Внешние ключи баз заметок ссылаются на отсутствующую в них таблицу
+    пользователей, и проверку ключей после теста, которую делает
+    TestCase, они не проходят. rebalance_notes просматривает все базы.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        """По автору на каждую базу из SHARDS."""
+        self.authors = {}
+        index = 0
+        while len(self.authors) < len(SHARDS):
+            author = User.objects.create(username=f'Автор {index}')
+            self.authors.setdefault(shard_for(author.pk, SHARDS), author)
+            index += 1
+
+    def create_note(self, author, slug):
+        self.client.force_login(author)
+        return self.client.post(
+            reverse('notes:add'),
+            {'title': 'Заметка', 'text': 'Текст', 'slug': slug},
+        )
+
+    @override_settings(NOTES_SHARDS=SHARDS)
+    def test_notes_stored_in_author_shard(self):
+        """Тест: Заметки и версии лежат в базе автора и видны ему."""
+        for shard, author in self.authors.items():
+            with self.subTest(shard=shard):
+                self.create_note(author, f'note-{shard}')
+                note = Note.objects.using(shard).get(author=author)
+                self.assertEqual(note.revisions.count(), 1)
+                response = self.client.get(reverse('notes:list'))
+                self.assertEqual(
+                    list(response.context['object_list']), [note]
+                )
+                self.client.post(reverse('notes:delete', args=(note.slug,)))
+                self.assertFalse(
+                    Note.objects.using(shard).filter(pk=note.pk).exists()
+                )
+                self.assertFalse(NoteSlug.objects.filter(pk=note.pk).exists())
+
+    @override_settings(NOTES_SHARDS=SHARDS)
+    def test_slug_unique_across_shards(self):
+        """Тест: Slug заметки из другой базы занят."""
+        first, second = self.authors.values()
+        self.create_note(first, 'shared')
+
+        response = self.create_note(second, 'shared')
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(response, 'form', 'slug', 'shared' + WARNING)
+        self.assertEqual(NoteSlug.objects.filter(slug='shared').count(), 1)
+
+    def test_rebalance_moves_notes(self):
+        """Тест: После добавления базы rebalance_notes переносит заметки."""
+        for shard, author in self.authors.items():
+            self.create_note(author, f'note-{shard}')
+            note = Note.objects.get(author=author)
+            note.text = 'Новый текст'
+            note.save()
+        moved = self.authors['notes_1']
+        out = StringIO()
+
+        with override_settings(NOTES_SHARDS=SHARDS):
+            self.client.force_login(moved)
+            response = self.client.get(reverse('notes:list'))
+            self.assertEqual(len(response.context['object_list']), 0)
+            call_command('rebalance_notes', stdout=out)
+            response = self.client.get(reverse('notes:list'))
+            call_command('rebalance_notes', stdout=out)
+
+        self.assertEqual(len(response.context['object_list']), 1)
+        self.assertIn(f'автор {moved.pk}: default -> notes_1', out.getvalue())
+        self.assertIn('Авторов: 0, заметок: 0', out.getvalue())
+        self.assertEqual(Note.objects.exclude(author=moved).count(), 1)
+        self.assertFalse(Note.objects.filter(author=moved).exists())
+        note = Note.objects.using('notes_1').get(author=moved)
+        self.assertEqual(
+            list(note.revisions.values_list('number', flat=True)), [1, 2]
+        )
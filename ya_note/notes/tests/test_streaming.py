@@ -0,0 +1,68 @@
+import zlib
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.compression import COMPRESSORS, choose_encoding
+from notes.models import Note
+
+
+User = get_user_model()
+
+
+@override_settings(
+    STREAMING_THRESHOLD=5, STREAMING_CHUNK_SIZE=2, NOTES_CACHE_MAX_SUMMARIES=5
+)
+class TestNotesStreaming(TestCase):
+    """Тесты для потоковой отдачи и сжатия списка заметок."""
+
+    NOTES_COUNT = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'note-{index}', author=cls.author)
+            for index in range(cls.NOTES_COUNT)
+        )
+        cls.list_url = reverse('notes:list')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_long_list_streamed(self):
+        """Тест: Длинный список отдаётся потоком и содержит все заметки."""
+        response = self.client.get(self.list_url)
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        for index in range(self.NOTES_COUNT):
+            self.assertIn(f'Заметка {index}<', content)
+
+    @override_settings(COMPRESSION_MIN_LENGTH=0)
+    def test_stream_compressed_incrementally(self):
+        """Тест: Каждая часть потока сжата и доступна до конца ответа."""
+        response = self.client.get(
+            self.list_url, HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        chunks = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(wbits=31)
+
+        head = decompressor.decompress(next(chunks)).decode()
+        self.assertIn('Список заметок', head)
+        self.assertNotIn('Заметка 0', head)
+        rest = b''.join(decompressor.decompress(chunk) for chunk in chunks)
+        self.assertIn(f'Заметка {self.NOTES_COUNT - 1}<', rest.decode())
+
+    def test_explicit_refusal_beats_wildcard(self):
+        """Тест: Кодировка с q=0 не выбирается даже при *."""
+        brotli = 'br' if 'br' in COMPRESSORS else None
+
+        self.assertEqual(choose_encoding('gzip;q=0, *'), brotli)
+        self.assertEqual(choose_encoding('*, br;q=0'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, br;q=0, *'))
@@ -0,0 +1,38 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note
+
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_RATES={'notes': {'user': '2/m', 'ip': '10/m'}})
+class TestNoteThrottling(TestCase):
+    """Тесты для ограничения частоты создания заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных для всех тестов в классе."""
+        cls.author = User.objects.create(username='Лев Толстой')
+        cls.add_url = reverse('notes:add')
+
+    def test_create_throttled_after_rate_exceeded(self):
+        """Тест: Третья заметка за минуту отклоняется с кодом 429."""
+        self.client.force_login(self.author)
+
+        responses = [
+            self.client.post(
+                self.add_url, {'title': f'Заметка {index}', 'text': 'Текст'}
+            )
+            for index in range(3)
+        ]
+
+        self.assertEqual(
+            responses[-1].status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+        self.assertIn('Retry-After', responses[-1])
+        self.assertEqual(Note.objects.count(), 2)
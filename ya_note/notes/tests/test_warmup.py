@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from django.urls import get_resolver
+
+from notes.warmup import preresolve_urls, warm_templates
+from yanote.settings_production import TEMPLATES
+
+
+@override_settings(TEMPLATES=TEMPLATES)
+class TestTemplateWarmup(SimpleTestCase):
+    """Тесты для прогрева шаблонов."""
+
+    def test_warm_templates_fills_cached_loader(self):
+        """Тест: Прогрев компилирует шаблоны в кеширующий загрузчик."""
+        loaded, errors = warm_templates()
+
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertEqual(errors, {})
+        self.assertIn('notes/list.html', loaded)
+        self.assertIn('notes/list.html', loader.get_template_cache)
+
+    def test_warm_templates_command(self):
+        """Тест: Команда warm_templates сообщает число шаблонов."""
+        stdout = StringIO()
+
+        call_command('warm_templates', stdout=stdout)
+
+        self.assertIn('Скомпилировано шаблонов', stdout.getvalue())
+
+    def test_preresolve_urls_builds_reverse_tables(self):
+        """Тест: Предварительное разрешение обходит все маршруты проекта."""
+        count = preresolve_urls()
+
+        self.assertGreater(count, 0)
+        self.assertIn('users', get_resolver().namespace_dict)
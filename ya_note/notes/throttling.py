@@ -0,0 +1,151 @@
+"""
+Ограничение частоты записей.
+
+Для каждой области (THROTTLE_RATES) ведутся две корзины токенов: на
+пользователя и на IP-адрес. Запрос проходит, если в обеих есть токен,
+иначе возвращается ответ 429 с заголовком Retry-After.
+"""
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from http import HTTPStatus
+from time import monotonic, time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Строку вида '20/m' превращает в (ёмкость, токенов в секунду)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / RATE_PERIODS[period[0]]
+
+
+def refill(tokens, updated, capacity, per_second, now):
+    return min(capacity, tokens + (now - updated) * per_second)
+
+
+class LocalMemoryBackend:
+    """Корзины в памяти процесса; каждый процесс считает отдельно."""
+    clock = staticmethod(monotonic)
+    max_buckets = 10000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, per_second):
+        """Забирает токен; возвращает 0 или секунды до следующего."""
+        now = self.clock()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = refill(tokens, updated, capacity, per_second, now)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / per_second
+            full_at = now + (capacity - tokens) / per_second
+            self._buckets[key] = (tokens, now, full_at)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        """
+        Убирает самые давно использованные корзины: наполнившиеся до краёв,
+        а если их мало — сверх max_buckets.
+        """
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if bucket[2] > now and len(self._buckets) <= self.max_buckets:
+                break
+            self._buckets.popitem(last=False)
+
+
+class CacheBackend:
+    """
+    Корзины в кеше Django, общие для всех процессов.
+
+    Чтение и запись не атомарны, поэтому при гонке запрос может
+    пройти лишний раз; для защиты от перегрузки этого достаточно.
+    """
+    clock = staticmethod(time)
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def consume(self, key, capacity, per_second):
+        now = self.clock()
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens = refill(tokens, updated, capacity, per_second, now)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0
+        else:
+            wait = (1 - tokens) / per_second
+        self.cache.set(
+            key, (tokens, now), math.ceil(capacity / per_second)
+        )
+        return wait
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.THROTTLE_BACKEND)()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting.startswith('THROTTLE_'):
+        _backend = None
+
+
+def throttle(request, scope):
+    """Секунды до разрешения запроса или 0, если запрос можно выполнить."""
+    rates = settings.THROTTLE_RATES.get(scope)
+    if not rates:
+        return 0
+    keys = {
+        'user': f'throttle:{scope}:user:{request.user.pk}',
+        'ip': f'throttle:{scope}:ip:{request.META.get("REMOTE_ADDR")}',
+    }
+    backend = get_backend()
+    wait = 0
+    for kind, rate in rates.items():
+        wait = max(wait, backend.consume(keys[kind], *parse_rate(rate)))
+    return wait
+
+
+class ThrottleMixin:
+    """Ограничивает частоту запросов изменяющими методами."""
+    throttle_scope = None
+    throttle_methods = ('POST',)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in self.throttle_methods:
+            wait = throttle(request, self.throttle_scope)
+            if wait:
+                response = HttpResponse(
+                    'Слишком много запросов, попробуйте позже.',
+                    status=HTTPStatus.TOO_MANY_REQUESTS,
+                )
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+        return super().dispatch(request, *args, **kwargs)
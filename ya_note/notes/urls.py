@@ -11,5 +11,14 @@ urlpatterns = [
     path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
     path('notes/', views.NotesList.as_view(), name='list'),
+    path('notes/bulk/', views.NoteBulk.as_view(), name='bulk'),
+    path('history/<slug:slug>/', views.NoteHistory.as_view(), name='history'),
+    path(
+        'history/<slug:slug>/<int:number>/',
+        views.NoteRevisionDetail.as_view(),
+        name='revision'
+    ),
     path('done/', views.NoteSuccess.as_view(), name='success'),
+    path('queries/', views.QueryStats.as_view(), name='query_stats'),
+    path('memory/', views.MemoryStats.as_view(), name='memory_stats'),
 ]
@@ -1,9 +1,20 @@
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import IntegrityError
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
+from .bulk import delete_notes, export_notes, prefix_notes
+from .forms import BulkNoteForm, NoteForm
+from .idempotency import IdempotencyMixin
+from .memprofile import read_samples, summarize
 from .models import Note
+from .note_cache import get_note, get_summaries
+from .querylog import collect_report, read_slow_queries
+from .revisions import load_chain, reconstruct
+from .streaming import StreamingTemplateMixin, stream_or_list
+from .throttling import ThrottleMixin
 
 
 class Home(generic.TemplateView):
@@ -23,13 +34,34 @@ class NoteBase(LoginRequiredMixin):
 
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
-
-
-class NoteCreate(NoteBase, generic.CreateView):
+        return self.model.objects.for_author(self.request.user)
+
+    def get_object(self, queryset=None):
+        """
+        Для чтения заметка берётся из кеша заметок пользователя.
+
+        Для изменения и удаления она загружается из базы: заметка из кеша
+        могла быть удалена в другом процессе, и её сохранение вставило бы
+        её заново.
+        """
+        if queryset is not None or self.request.method not in (
+            'GET', 'HEAD'
+        ):
+            return super().get_object(queryset)
+        note = get_note(self.request.user, self.kwargs['slug'])
+        if note is None:
+            raise Http404('Заметка не найдена.')
+        return note
+
+
+class NoteCreate(
+        NoteBase, IdempotencyMixin, ThrottleMixin, generic.CreateView
+):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
+    throttle_scope = 'notes'
+    idempotency_scope = 'notes'
 
     def form_valid(self, form):
         new_note = form.save(commit=False)
@@ -38,10 +70,11 @@ class NoteCreate(NoteBase, generic.CreateView):
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, ThrottleMixin, generic.UpdateView):
     """Редактирование заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
+    throttle_scope = 'notes'
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +82,124 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
+class NotesList(NoteBase, StreamingTemplateMixin, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    stream_template_name = 'notes/items.html'
+    stream_object_name = 'notes'
+
+    def get_context_data(self, **kwargs):
+        """
+        Шаблон выводит краткий список из кеша заметок пользователя.
+
+        object_list остаётся ленивым; он выполняется, только если список
+        слишком длинный для кеша, и тогда отдаётся потоком.
+        """
+        context = super().get_context_data(**kwargs)
+        context['bulk_form'] = BulkNoteForm(queryset=self.object_list)
+        summaries = get_summaries(self.request.user)
+        if summaries is not None:
+            context['notes'] = summaries
+            return context
+        notes, streamed = stream_or_list(
+            self.object_list.only('id', 'slug', 'title')
+        )
+        if streamed:
+            self.stream_queryset = notes
+        context['notes'] = notes
+        return context
 
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteHistory(NoteBase, generic.DetailView):
+    """Список версий заметки."""
+    template_name = 'notes/history.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['revisions'] = self.object.revisions.defer(
+            'snapshot', 'delta'
+        ).order_by('-number')
+        return context
+
+
+class NoteRevisionDetail(NoteBase, generic.DetailView):
+    """Версия заметки, восстановленная от ближайшего полного снимка."""
+    template_name = 'notes/revision.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        chain = load_chain(self.object, self.kwargs['number'])
+        if not chain or chain[-1].number != self.kwargs['number']:
+            raise Http404('Такой версии заметки нет.')
+        context['revision'] = chain[-1]
+        context['revision_text'] = reconstruct(chain)
+        return context
+
+
+class NoteBulk(NoteBase, ThrottleMixin, generic.FormView):
+    """Удаление, выгрузка и переименование нескольких заметок."""
+    template_name = 'notes/bulk.html'
+    form_class = BulkNoteForm
+    throttle_scope = 'notes'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['queryset'] = self.get_queryset()
+        return kwargs
+
+    def form_valid(self, form):
+        notes = form.cleaned_data['notes']
+        action = form.cleaned_data['action']
+        if action == form.EXPORT:
+            response = StreamingHttpResponse(
+                export_notes(notes),
+                content_type='application/json; charset=utf-8',
+            )
+            response['Content-Disposition'] = (
+                'attachment; filename="notes.json"'
+            )
+            return response
+        if action == form.DELETE:
+            delete_notes(self.request.user, notes)
+        else:
+            try:
+                prefix_notes(
+                    self.request.user, notes, form.cleaned_data['prefix']
+                )
+            except IntegrityError:
+                # slug успел занять другой запрос; заметки не изменены.
+                form.add_error(None, 'Новый slug уже занят, повторите.')
+                return self.form_invalid(form)
+        return redirect(self.success_url)
+
+
+class QueryStats(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Сводка SQL-запросов по отпечаткам для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            'queries': collect_report(),
+            'slow': read_slow_queries(limit=50),
+        }, json_dumps_params={'ensure_ascii': False})
+
+
+class MemoryStats(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Сводка профилирования памяти по представлениям для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        samples = read_samples()
+        return JsonResponse({
+            'views': summarize(samples),
+            'recent': samples[:50],
+        }, json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,58 @@
+"""Прогрев процесса перед приёмом первых запросов."""
+from pathlib import Path
+
+from django.template import TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def iter_project_templates(engine):
+    """Имена всех шаблонов из каталогов DIRS движка."""
+    for directory in engine.dirs:
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*')):
+            if path.is_file() and path.suffix in TEMPLATE_SUFFIXES:
+                yield path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """
+    Компилирует все шаблоны проекта.
+
+    С кеширующим загрузчиком скомпилированные шаблоны остаются в памяти
+    процесса, и первый запрос не тратит время на разбор. Возвращает
+    список загруженных шаблонов и словарь ошибок компиляции.
+    """
+    loaded, errors = [], {}
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in iter_project_templates(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors[name] = error
+            else:
+                loaded.append(name)
+    return loaded, errors
+
+
+def preresolve_urls(resolver=None):
+    """
+    Заранее компилирует шаблоны URL и таблицы reverse().
+
+    Иначе регулярные выражения и словари обратного разрешения строятся
+    на первом запросе. Возвращает количество обработанных маршрутов.
+    """
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += preresolve_urls(pattern)
+        else:
+            count += 1
+    return count
@@ -22,11 +22,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.metrics.MetricsMiddleware',
+    'notes.querylog.QueryLogMiddleware',
+    'notes.memprofile.MemoryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'notes.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'notes.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -51,14 +55,62 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
+# Прогрев при создании WSGI-приложения: компиляция всех шаблонов проекта
+# и построение таблиц URL (включены в yanote.settings_production).
+TEMPLATE_WARMUP = False
+URL_PRERESOLVE = False
+
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    **{
+        f'notes_{number}': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / f'notes_{number}.sqlite3',
+        }
+        for number in range(1, 4)
+    },
+}
+
+# Заметки и их версии раскладываются по базам NOTES_SHARDS по автору
+# (notes.routers): все заметки автора лежат в одной базе, и записи разных
+# авторов не ждут общую блокировку SQLite. Пользователи и реестр slug
+# остаются в default. После изменения списка заметки переносятся
+# командой rebalance_notes.
+DATABASE_ROUTERS = ['notes.routers.NotesShardRouter']
+NOTES_SHARDS = ['default']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'notes.metrics.MeteredLocMemCache',
     }
 }
 
+# Режимы хранения сессий: 'db' читает и пишет таблицу django_session
+# на каждый запрос, 'cached_db' читает из кеша и пишет в базу сквозной
+# записью, 'signed_cookies' хранит сессию в подписанной cookie без базы.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = 'cached_db'
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# Сколько секунд держать в кеше пользователя, найденного по сессии.
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Сколько просроченных сессий удаляет prune_sessions за одну транзакцию.
+SESSION_PRUNE_BATCH_SIZE = 500
+
+# Удалённые пользователи только блокируются; команда purge_deleted удаляет
+# их заметки и версии пачками по PURGE_BATCH_SIZE, каждая пачка в своей
+# транзакции (см. notes.purge).
+PURGE_BATCH_SIZE = 500
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +139,85 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Ключи идемпотентности (notes.idempotency): повтор POST формы с тем же
+# ключом в течение IDEMPOTENCY_TTL секунд получает исходный редирект без
+# записи в базу; повтор во время первого запроса ждёт его до
+# IDEMPOTENCY_WAIT секунд. LocalMemoryStore держит не больше
+# IDEMPOTENCY_MAX_KEYS ключей в процессе, notes.idempotency.CacheStore
+# хранит ключи в общем кеше процессов.
+IDEMPOTENCY_BACKEND = 'notes.idempotency.LocalMemoryStore'
+IDEMPOTENCY_TTL = 60 * 60
+IDEMPOTENCY_WAIT = 5
+IDEMPOTENCY_MAX_KEYS = 10000
+
+# Ограничение частоты записей: корзины токенов на пользователя и на IP
+# для каждой области. Пустое значение области отключает ограничение.
+# notes.throttling.CacheBackend хранит корзины в общем кеше процессов.
+THROTTLE_BACKEND = 'notes.throttling.LocalMemoryBackend'
+THROTTLE_RATES = {
+    'notes': {'user': '30/m', 'ip': '300/m'},
+}
+
+# Страницы, где список длиннее STREAMING_THRESHOLD элементов (список
+# заметок), отдаются потоком пачками по STREAMING_CHUNK_SIZE.
+# None отключает потоковую отдачу.
+STREAMING_THRESHOLD = 500
+STREAMING_CHUNK_SIZE = 200
+
+# Сжатие ответов: тела короче COMPRESSION_MIN_LENGTH байт не сжимаются,
+# потоковые ответы сжимаются по частям. Кодировка br используется при
+# установленном пакете brotli, иначе gzip.
+COMPRESSION_MIN_LENGTH = 1024
+COMPRESSION_LEVEL = 6
+
+# Учёт SQL-запросов (notes.querylog): отпечатки запросов с числом и
+# гистограммой времени по представлениям. Процесс раз в
+# QUERY_LOG_FLUSH_INTERVAL секунд сбрасывает отчёт в QUERY_LOG_DIR, туда же
+# пишется журнал запросов дольше SLOW_QUERY_THRESHOLD секунд. По умолчанию
+# учёт выключен, в боевом окружении его включает settings_production.
+QUERY_LOG_ENABLED = False
+QUERY_LOG_DIR = BASE_DIR / 'querylog'
+QUERY_LOG_FLUSH_INTERVAL = 10
+SLOW_QUERY_THRESHOLD = 0.1
+
+# Метрики для Prometheus (notes.metrics) по адресу /metrics: запросы, SQL,
+# чтения кеша и отклонённые формы. Процесс раз в METRICS_FLUSH_INTERVAL
+# секунд копирует свои значения в отображённый в память файл в
+# METRICS_DIR, а /metrics складывает файлы всех процессов. По умолчанию
+# метрики выключены, в боевом окружении их включает settings_production.
+# /metrics отвечает адресам из METRICS_ALLOWED_IPS и персоналу; за обратным
+# прокси REMOTE_ADDR — адрес прокси, и доступ к /metrics извне нужно
+# закрыть на нём.
+METRICS_ENABLED = False
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# Профилирование памяти (notes.memprofile) включается явно: доля
+# MEMORY_PROFILE_SAMPLE_RATE запросов выполняется под tracemalloc с
+# глубиной стека MEMORY_PROFILE_FRAMES. Для них записываются пик и остаток
+# памяти и MEMORY_PROFILE_TOP мест выделения; последние
+# MEMORY_PROFILE_HISTORY замеров процесса хранятся в MEMORY_PROFILE_DIR.
+MEMORY_PROFILING = False
+MEMORY_PROFILE_SAMPLE_RATE = 0.01
+MEMORY_PROFILE_FRAMES = 10
+MEMORY_PROFILE_TOP = 10
+MEMORY_PROFILE_HISTORY = 200
+MEMORY_PROFILE_DIR = BASE_DIR / 'memprofile'
+
+# История заметок: версии хранятся правками относительно предыдущей,
+# каждая NOTE_REVISION_SNAPSHOT_INTERVAL-я — полным текстом. Чем больше
+# интервал, тем меньше места и дольше восстановление старой версии.
+NOTE_REVISION_SNAPSHOT_INTERVAL = 20
+
+# Кеш заметок пользователя (notes.note_cache): сколько секунд живёт запись,
+# сколько заметок целиком хранится в записи и до какой длины кешируется
+# краткий список заметок.
+NOTES_CACHE_TIMEOUT = 300
+NOTES_CACHE_MAX_NOTES = 50
+NOTES_CACHE_MAX_SUMMARIES = 500
+
+# Форма действий над несколькими заметками передаёт по полю на каждую
+# отмеченную заметку; стандартного предела в 1000 полей для неё мало.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
@@ -0,0 +1,32 @@
+"""
+Облегчённые боевые настройки для процессов, обслуживающих пользователей.
+
+Статику отдаёт веб-сервер, flash-сообщения проект не использует,
+а админка обслуживается отдельными процессами с yanote.settings_production.
+Без этих приложений процесс стартует быстрее: не импортируются модули
+админки и не строятся её маршруты.
+"""
+from copy import deepcopy
+
+from .settings_production import *  # noqa: F401,F403
+from .settings_production import INSTALLED_APPS, MIDDLEWARE
+from .settings_production import TEMPLATES as PRODUCTION_TEMPLATES
+
+LEAN_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in LEAN_EXCLUDED_APPS
+]
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if not middleware.startswith('django.contrib.messages.')
+]
+TEMPLATES = deepcopy(PRODUCTION_TEMPLATES)
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+    if not processor.startswith('django.contrib.messages.')
+]
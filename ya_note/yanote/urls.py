@@ -1,31 +1,40 @@
-from django.contrib import admin
-from django.contrib.auth import views as auth_views
-from django.contrib.auth.forms import UserCreationForm
+from django.apps import apps
 from django.urls import include, path
-from django.views.generic import CreateView
+
+from notes.lazy import lazy_view
+from notes.metrics import metrics_view
 
 urlpatterns = [
     path('', include('notes.urls')),
-    path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
+
 auth_urls = ([
     path(
         'login/',
-        auth_views.LoginView.as_view(),
+        lazy_view('django.contrib.auth.views.LoginView'),
         name='login',
     ),
     path(
         'logout/',
-        auth_views.LogoutView.as_view(
+        lazy_view(
+            'django.contrib.auth.views.LogoutView',
             template_name='registration/logout.html'
         ),
         name='logout',
     ),
     path(
         'signup/',
-        CreateView.as_view(
-            form_class=UserCreationForm,
+        lazy_view(
+            'django.views.generic.CreateView',
+            imports={
+                'form_class': 'django.contrib.auth.forms.UserCreationForm',
+            },
             success_url='/',
             template_name='registration/signup.html',
         ),